@@ -1,7 +1,12 @@
-import os
+import os,sys
 from dotenv import load_dotenv
 import groq
 
+#Make the shared code in src/ (LLM response cache) importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from llm_cache import cached_chat_completion
+
 # Load environment variables
 load_dotenv()
 
@@ -9,8 +14,11 @@ load_dotenv()
 client = groq.Client(api_key=os.getenv("GROQ_API_KEY"))
 
 # Simple function to test the setup
+# Identical requests (same model, temperature and messages) are answered from the
+# persistent response cache in llm_cache instead of calling the API again
 def get_response(prompt):
-    chat_completion = client.chat.completions.create(
+    return cached_chat_completion(
+        client,
         messages=[
             {
                 "role": "user",
@@ -20,7 +28,6 @@ def get_response(prompt):
         model="deepseek-r1-distill-llama-70b-specdec",
         temperature=0.7,
     )
-    return chat_completion.choices[0].message.content
 
 # Test the setup
 if __name__ == "__main__":
@@ -0,0 +1,206 @@
+"""
+Render CRS reflectivity/Doppler quicklooks for every catalogued granule
+without any prompts
+
+Example (from the src directory):
+    python batch_quicklooks.py data/ --campaign impacts --date 2020-01-25 --workers 4
+"""
+import os
+import sys
+import logging
+import argparse
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Optional, Tuple
+
+import dask
+import matplotlib
+matplotlib.use('Agg')  # No display in batch runs or in the worker processes
+
+import matplotlib.pyplot as plt
+
+from ipynb.fs.full.CRS_Recipe_Functions import plot_CRS2D
+from data_sources.crs_catalog import CAMPAIGNS, CRSGranule, get_catalog
+from data_sources.crs_dataset import open_crs_dataset
+from data_sources.crs_subset import subset_by_time
+from data_sources.pyramid import build_pyramid
+from data_sources.time_axis import to_datetime
+
+logger = logging.getLogger(__name__)
+
+# Horizontal pixels of a quicklook (12 in figure at 100 dpi)
+QUICKLOOK_WIDTH = 1200
+
+def quicklook_path(granule: CRSGranule, out_dir: str, start: Optional[datetime] = None,
+                   end: Optional[datetime] = None) -> str:
+    """
+    Output image path of a granule: <out_dir>/<campaign>/<file stem>[_<start>_<end>].png
+    The window is part of the name so windowed and full-file images do not overwrite each other
+    """
+    stem = os.path.splitext(os.path.basename(granule.path))[0]
+    if start is not None or end is not None:
+        stem += '_{}_{}'.format(start.strftime('%Y%m%dT%H%M%S') if start else 'start',
+                                end.strftime('%Y%m%dT%H%M%S') if end else 'end')
+    return os.path.join(out_dir, granule.campaign, stem + '.png')
+
+def is_up_to_date(granule: CRSGranule, out_path: str) -> bool:
+    """True if the image exists and is newer than its source file"""
+    # Stat the source rather than trusting the catalog: it may have been
+    # rewritten since the catalog was refreshed
+    try:
+        return os.path.getmtime(out_path) >= os.path.getmtime(granule.path)
+    except OSError:
+        return False
+
+def render_quicklook(path: str, campaign: str, out_path: str, start: Optional[datetime] = None,
+                     end: Optional[datetime] = None, decimate: str = 'mean',
+                     pyramid_dir: Optional[str] = None) -> Optional[str]:
+    """
+    Render the quicklook of one granule (optionally limited to [start, end]) to out_path
+
+    With pyramid_dir, the granule's decimation pyramid is built there (once)
+    and the image is drawn from the coarsest level that still fills it.
+
+    Returns:
+        out_path, or None if the granule has no data in the window
+    """
+    # Read on this thread: this runs in forked pool workers, where dask's
+    # threaded scheduler would wait forever on pool threads the fork did not copy
+    with dask.config.set(scheduler='synchronous'):
+        if pyramid_dir:
+            pyramid = build_pyramid(path, campaign, pyramid_dir, decimate)
+            times, ref = pyramid.read('reflectivity', start, end, pixel_width=QUICKLOOK_WIDTH)
+            if len(times) == 0:
+                return None
+            _, dop = pyramid.read('doppler_velocity', start, end, pixel_width=QUICKLOOK_WIDTH)
+            datap, range_km = {'Ref': ref, 'DopV': dop}, pyramid.range_km
+        else:
+            with open_crs_dataset(path, campaign) as ds:
+                cs = subset_by_time(ds, start, end, time_name='time')
+                if cs.sizes['time'] == 0:
+                    return None
+                times = cs['time'].values
+                datap = {'Ref': cs['reflectivity'].values, 'DopV': cs['doppler_velocity'].values}
+                range_km = cs['range'].values
+    fig = plot_CRS2D(datap, times, range_km, to_datetime(times[0]), to_datetime(times[-1]),
+                     reverseZ=True, render='raster', decimate=decimate, show=False)
+
+    # Write next to the target and rename, so an interrupted run never leaves
+    # a partial image that looks up to date
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    tmp_path = out_path + '.part.png'
+    try:
+        fig.savefig(tmp_path, dpi=100, bbox_inches='tight')
+        os.replace(tmp_path, out_path)
+    finally:
+        plt.close(fig)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return out_path
+
+def plan_quicklooks(data_dir: str, out_dir: str, campaign: Optional[str] = None, flight_date: Optional[str] = None,
+                    start: Optional[datetime] = None, end: Optional[datetime] = None,
+                    force: bool = False) -> Tuple[List[Tuple[CRSGranule, str]], int]:
+    """
+    Find the granules matching the filters and decide which images need rendering
+
+    Returns:
+        Tuple of ([(granule, output path)] to render, number of up to date images skipped)
+    """
+    granules = get_catalog(data_dir).query(campaign, start, end, flight_date)
+    todo, skipped = [], 0
+    for granule in granules:
+        out_path = quicklook_path(granule, out_dir, start, end)
+        if not force and is_up_to_date(granule, out_path):
+            skipped += 1
+            continue
+        todo.append((granule, out_path))
+    return todo, skipped
+
+def run_batch(data_dir: str, out_dir: str, campaign: Optional[str] = None, flight_date: Optional[str] = None,
+              start: Optional[datetime] = None, end: Optional[datetime] = None, workers: Optional[int] = None,
+              decimate: str = 'mean', force: bool = False, pyramid_dir: Optional[str] = None) -> int:
+    """
+    Render all missing or stale quicklooks, in parallel if workers > 1
+
+    Returns:
+        Number of granules that failed to render
+    """
+    todo, skipped = plan_quicklooks(data_dir, out_dir, campaign, flight_date, start, end, force)
+    logger.info(f"{len(todo)} quicklooks to render, {skipped} up to date")
+
+    rendered = empty = failed = 0
+
+    def record(granule: CRSGranule, result: Optional[str]):
+        nonlocal rendered, empty
+        if result is None:
+            empty += 1
+            logger.info(f"No data in the requested window for {granule.path}")
+        else:
+            rendered += 1
+            logger.info(f"Saved {result}")
+
+    if workers and workers > 1 and len(todo) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(render_quicklook, granule.path, granule.campaign, out_path, start, end,
+                                decimate, pyramid_dir): granule
+                for granule, out_path in todo
+            }
+            for future in as_completed(futures):
+                granule = futures[future]
+                try:
+                    record(granule, future.result())
+                except Exception as e:
+                    failed += 1
+                    logger.error(f"Error rendering {granule.path}: {str(e)}")
+    else:
+        for granule, out_path in todo:
+            try:
+                record(granule, render_quicklook(granule.path, granule.campaign, out_path, start, end,
+                                                 decimate, pyramid_dir))
+            except Exception as e:
+                failed += 1
+                logger.error(f"Error rendering {granule.path}: {str(e)}")
+
+    logger.info(f"Done: {rendered} rendered, {skipped} up to date, {empty} without data, {failed} failed")
+    return failed
+
+def _parse_datetime(value: str) -> datetime:
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid date/time {value!r}, expected YYYY-MM-DDThh:mm:ss")
+
+def _parse_date(value: str) -> str:
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date().isoformat()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid date {value!r}, expected YYYY-MM-DD")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Render CRS reflectivity/Doppler quicklooks for all matching granules")
+    parser.add_argument('data_dir', help="Directory holding the CRS data files (searched recursively)")
+    parser.add_argument('--out-dir', default='quicklooks', help="Where images are written (default: quicklooks)")
+    parser.add_argument('--campaign', choices=sorted(CAMPAIGNS), help="Only this campaign")
+    parser.add_argument('--date', type=_parse_date, help="Only this flight date (YYYY-MM-DD)")
+    parser.add_argument('--start', type=_parse_datetime, help="Window start (YYYY-MM-DDThh:mm:ss UTC)")
+    parser.add_argument('--end', type=_parse_datetime, help="Window end (YYYY-MM-DDThh:mm:ss UTC)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help="Number of rendering processes (default: number of CPUs)")
+    parser.add_argument('--decimate', choices=('mean', 'max', 'min'), default='mean',
+                        help="How samples are combined into one pixel column (default: mean)")
+    parser.add_argument('--force', action='store_true', help="Re-render images that are up to date")
+    parser.add_argument('--pyramid-dir', help="Build each granule's decimation pyramid here and render from it")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    failed = run_batch(args.data_dir, args.out_dir, args.campaign, args.date, args.start, args.end,
+                       args.workers, args.decimate, args.force, args.pyramid_dir)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
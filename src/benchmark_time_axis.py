@@ -0,0 +1,101 @@
+"""
+Time the per-sample `t0 + timedelta` time axis conversion against the
+vectorized datetime64 one (time_axis.campaign_time_axis) on a full flight
+
+Uses the TimeUTC array of an IMPACTS file when one is given, otherwise a
+synthetic 8-hour, 10 Hz flight (288,000 samples).
+
+Example (from the src directory):
+    python benchmark_time_axis.py --file data/IMPACTS_CRS_L1B_RevA_20200125T054037_to_20200125T110413.h5
+"""
+import sys
+import time
+import argparse
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+import h5py
+import numpy as np
+
+from data_sources.impacts_reader import TIME_PATH
+from data_sources.time_axis import campaign_time_axis, to_datetime
+
+# Synthetic flight: 8 hours at 10 Hz, starting 2020-01-25 05:40 UTC
+SYNTHETIC_HOURS = 8.0
+SYNTHETIC_RATE_HZ = 10.0
+SYNTHETIC_START = datetime(2020, 1, 25, 5, 40)
+
+def loop_epoch_seconds(seconds: np.ndarray) -> List[datetime]:
+    """The old IMPACTS conversion: one datetime per sample"""
+    t0 = datetime(1970, 1, 1)
+    return [t0 + timedelta(seconds=float(s)) for s in seconds]
+
+def loop_hours_after(hours: np.ndarray, base_date: datetime) -> List[datetime]:
+    """The old GOES-R PLT / OLYMPEX / IPHEX conversion: one datetime per sample"""
+    return [base_date + timedelta(hours=float(h)) for h in hours]
+
+def _best_of(fn: Callable[[], Any], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def synthetic_epoch_seconds(hours: float = SYNTHETIC_HOURS, rate_hz: float = SYNTHETIC_RATE_HZ) -> np.ndarray:
+    start = (SYNTHETIC_START - datetime(1970, 1, 1)).total_seconds()
+    return start + np.arange(int(hours * 3600 * rate_hz)) / rate_hz
+
+def benchmark(seconds: np.ndarray, repeat: int = 3) -> Dict[str, Dict[str, float]]:
+    """
+    Best-of-repeat time of both conversions for each campaign encoding
+
+    The hour-based campaigns are timed on the same instants expressed as
+    hours after the flight's base date.
+
+    Returns:
+        Per encoding ('epoch_seconds', 'hours_after'): loop_s, vectorized_s and speedup
+    """
+    first = to_datetime(campaign_time_axis('impacts', seconds[:1])[0])
+    base_date = datetime(first.year, first.month, first.day)
+    hours = (seconds - (base_date - datetime(1970, 1, 1)).total_seconds()) / 3600.0
+
+    # Both sides must agree before their timings mean anything
+    expected = np.array(loop_epoch_seconds(seconds[:1000]), dtype='datetime64[ns]')
+    if np.abs(campaign_time_axis('impacts', seconds[:1000]) - expected).max() > np.timedelta64(1, 'us'):
+        raise AssertionError("Vectorized and per-sample time axes differ")
+
+    cases = {
+        'epoch_seconds': (lambda: loop_epoch_seconds(seconds), lambda: campaign_time_axis('impacts', seconds)),
+        'hours_after': (lambda: loop_hours_after(hours, base_date),
+                        lambda: campaign_time_axis('goesrplt', hours, base_date))
+    }
+    results = {}
+    for name, (loop, vectorized) in cases.items():
+        loop_s = _best_of(loop, repeat)
+        vectorized_s = _best_of(vectorized, repeat)
+        results[name] = {'loop_s': loop_s, 'vectorized_s': vectorized_s, 'speedup': loop_s / vectorized_s}
+    return results
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark per-sample vs vectorized CRS time axis conversion")
+    parser.add_argument('--file', help="IMPACTS CRS HDF5 file whose TimeUTC is converted (default: synthetic flight)")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per measurement, best is kept (default: 3)")
+    args = parser.parse_args(argv)
+
+    if args.file:
+        with h5py.File(args.file, 'r') as f:
+            seconds = f[TIME_PATH][:].astype(np.float64)
+        source = args.file
+    else:
+        seconds = synthetic_epoch_seconds()
+        source = f"synthetic {SYNTHETIC_HOURS:g} h flight at {SYNTHETIC_RATE_HZ:g} Hz"
+
+    print(f"{len(seconds):,} samples ({source})")
+    for name, result in benchmark(seconds, args.repeat).items():
+        print(f"{name:>14}: loop {result['loop_s'] * 1000:9.1f} ms, "
+              f"vectorized {result['vectorized_s'] * 1000:7.2f} ms, speedup {result['speedup']:.0f}x")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
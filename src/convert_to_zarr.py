@@ -0,0 +1,171 @@
+"""
+Rewrite a CRS archive (IMPACTS HDF5, GOES-R PLT/OLYMPEX/IPHEX netCDF-3)
+into one Zarr store chunked for time-window reads, and benchmark window
+reads before and after
+
+Example (from the src directory):
+    python convert_to_zarr.py data/ --archive crs.zarr --codec blosc-zstd --workers 4 --benchmark 20
+"""
+import os
+import sys
+import random
+import logging
+import argparse
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from data_sources.crs_catalog import CAMPAIGNS, CRSGranule, get_catalog
+from data_sources.crs_dataset import open_crs_dataset
+from data_sources.crs_subset import time_index_window
+from data_sources.zarr_archive import (
+    ZARR_CODECS, DEFAULT_CHUNK_BYTES, convert_granule, consolidate_archive, granule_group, open_archive_granule
+)
+
+logger = logging.getLogger(__name__)
+
+def convert_archive(granules: List[CRSGranule], archive: str, codec: str = 'blosc-zstd', level: int = 3,
+                    chunk_bytes: int = DEFAULT_CHUNK_BYTES, workers: Optional[int] = None,
+                    force: bool = False) -> int:
+    """
+    Convert granules into the archive (each into its own group) and consolidate its metadata
+
+    Returns:
+        Number of granules that failed to convert
+    """
+    converted = skipped = failed = 0
+
+    def record(summary: Dict[str, Any]):
+        nonlocal converted, skipped
+        if summary['skipped']:
+            skipped += 1
+        else:
+            converted += 1
+            logger.info(f"Converted {summary['group']} in {summary['seconds']:.1f}s")
+
+    if workers and workers > 1 and len(granules) > 1:
+        # Each worker writes its own group, so no coordination is needed
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(convert_granule, granule.path, archive, granule.campaign, codec, level,
+                                chunk_bytes, force): granule
+                for granule in granules
+            }
+            for future in as_completed(futures):
+                try:
+                    record(future.result())
+                except Exception as e:
+                    failed += 1
+                    logger.error(f"Error converting {futures[future].path}: {str(e)}")
+    else:
+        for granule in granules:
+            try:
+                record(convert_granule(granule.path, archive, granule.campaign, codec, level, chunk_bytes, force))
+            except Exception as e:
+                failed += 1
+                logger.error(f"Error converting {granule.path}: {str(e)}")
+
+    if os.path.isdir(archive):
+        consolidate_archive(archive)
+    logger.info(f"Done: {converted} converted, {skipped} up to date, {failed} failed")
+    return failed
+
+def _directory_bytes(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+def _percentile(values: List[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else float('nan')
+
+def benchmark(granules: List[CRSGranule], archive: str, n_windows: int = 20, window_minutes: float = 10.0,
+              variable: str = 'reflectivity', seed: int = 0) -> Dict[str, Any]:
+    """
+    Latency of reading random time windows from the source files and from the archive
+
+    Each measurement opens the granule and reads one window of the variable,
+    as a one-off query would. Both sides are read once before timing, so
+    the page cache is equally warm for the two.
+
+    Returns:
+        Median / p95 latency in ms of both, the speedup and the size of both
+    """
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(n_windows):
+        granule = rng.choice(granules)
+        if granule.start_time is None or granule.end_time is None:
+            continue
+        span = (granule.end_time - granule.start_time).total_seconds()
+        offset = rng.uniform(0, max(0.0, span - window_minutes * 60))
+        start = np.datetime64(granule.start_time, 'ns') + np.timedelta64(int(offset * 1e9), 'ns')
+        queries.append((granule, start, start + np.timedelta64(int(window_minutes * 60e9), 'ns')))
+
+    def read_source(granule, t1, t2):
+        with open_crs_dataset(granule.path, granule.campaign) as ds:
+            return ds[variable].isel(time=time_index_window(ds['time'].values, t1, t2)).values
+
+    def read_archive(granule, t1, t2):
+        with open_archive_granule(archive, granule_group(granule.path, granule.campaign)) as ds:
+            return ds[variable].isel(time=time_index_window(ds['time'].values, t1, t2)).values
+
+    results = {}
+    for name, read in (('source', read_source), ('zarr', read_archive)):
+        for granule in {query[0].path: query[0] for query in queries}.values():
+            read(granule, None, None)
+        latencies = []
+        for granule, t1, t2 in queries:
+            started = time.perf_counter()
+            read(granule, t1, t2)
+            latencies.append((time.perf_counter() - started) * 1000)
+        results[name] = {'median_ms': round(statistics.median(latencies), 2) if latencies else None,
+                         'p95_ms': round(_percentile(latencies, 95), 2)}
+
+    source_bytes = sum(granule.size for granule in granules)
+    archive_bytes = _directory_bytes(archive)
+    if results['source']['median_ms'] and results['zarr']['median_ms']:
+        results['speedup'] = round(results['source']['median_ms'] / results['zarr']['median_ms'], 2)
+    results.update({'windows': len(queries), 'window_minutes': window_minutes,
+                    'source_mb': round(source_bytes / 2**20, 1), 'zarr_mb': round(archive_bytes / 2**20, 1)})
+    return results
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Convert CRS granules to a time-chunked, compressed Zarr archive")
+    parser.add_argument('data_dir', help="Directory holding the CRS data files (searched recursively)")
+    parser.add_argument('--archive', default='crs.zarr', help="Zarr archive to write (default: crs.zarr)")
+    parser.add_argument('--campaign', choices=sorted(CAMPAIGNS), help="Only this campaign")
+    parser.add_argument('--codec', choices=ZARR_CODECS, default='blosc-zstd',
+                        help="Compression codec (default: blosc-zstd)")
+    parser.add_argument('--level', type=int, default=3, help="Compression level (default: 3)")
+    parser.add_argument('--chunk-mb', type=float, default=DEFAULT_CHUNK_BYTES / 2**20,
+                        help="Uncompressed size of a full-range time chunk in MB (default: 4)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help="Number of conversion processes (default: number of CPUs)")
+    parser.add_argument('--force', action='store_true', help="Rewrite granules that are up to date")
+    parser.add_argument('--benchmark', type=int, default=0, metavar='N',
+                        help="Afterwards, time N random window reads from the sources and from the archive")
+    parser.add_argument('--window-minutes', type=float, default=10.0,
+                        help="Length of the benchmark windows (default: 10)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    granules = get_catalog(args.data_dir).query(args.campaign)
+    if not granules:
+        logger.error(f"No CRS files found in {args.data_dir}")
+        return 1
+    failed = convert_archive(granules, args.archive, args.codec, args.level, int(args.chunk_mb * 2**20),
+                             args.workers, args.force)
+    if args.benchmark:
+        results = benchmark(granules, args.archive, args.benchmark, args.window_minutes)
+        print(f"Window reads ({results['windows']} x {results['window_minutes']:g} min): "
+              f"source median {results['source']['median_ms']} ms (p95 {results['source']['p95_ms']}), "
+              f"zarr median {results['zarr']['median_ms']} ms (p95 {results['zarr']['p95_ms']}), "
+              f"speedup {results.get('speedup')}x; size {results['source_mb']} MB -> {results['zarr_mb']} MB")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
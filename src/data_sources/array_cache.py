@@ -0,0 +1,291 @@
+import os
+import json
+import time
+import shutil
+import sqlite3
+import hashlib
+import logging
+import tempfile
+from contextlib import closing
+from datetime import date
+from typing import Dict, Optional, Sequence, Union
+
+import numpy as np
+import xarray as xr
+import dask
+import dask.array as da
+
+from data_sources.crs_dataset import open_crs_dataset, stitch_segments, DEFAULT_TIME_CHUNK
+
+# Arrays stored per granule, in the standardized layout of open_crs_dataset
+CACHED_ARRAYS = ('times', 'range_km', 'reflectivity', 'doppler_velocity')
+DEFAULT_MAX_BYTES = 5 * 2**30
+# Source rows decoded per step while filling a cache entry
+FILL_BLOCK_ROWS = 16384
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    bytes INTEGER NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+"""
+
+def default_cache_dir() -> str:
+    return os.path.join(os.path.expanduser('~'), '.cache', 'crs_arrays')
+
+class ArrayCache:
+    """
+    Decoded CRS granules as uncompressed, memory-mapped .npy files
+
+    The first open of a granule decodes it once into times, range_km,
+    reflectivity and doppler_velocity .npy files. Later opens map those
+    files read-only with np.load(mmap_mode='r'), so no decompression and no
+    copy happen. Only the pages that are actually touched are read.
+    An entry is tied to the source's size and mtime and is rebuilt when
+    either changes. Once the cache exceeds max_bytes, the least recently
+    opened entries are removed.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.db_path = os.path.join(self.cache_dir, 'index.sqlite')
+        with closing(self._connect()) as conn, conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    @staticmethod
+    def key(path: str) -> str:
+        return hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()
+
+    def _directory(self, path: str) -> str:
+        return os.path.join(self.cache_dir, self.key(path))
+
+    def get(self, path: str) -> Optional[Dict[str, np.ndarray]]:
+        """Memory-mapped arrays of a granule, or None if not cached or the source changed"""
+        directory = self._directory(path)
+        try:
+            with open(os.path.join(directory, 'meta.json')) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        stat = os.stat(path)
+        if meta['size'] != stat.st_size or meta['mtime'] != stat.st_mtime:
+            logging.info(f"Cached arrays of {path} are stale, rebuilding")
+            self._remove(self.key(path))
+            return None
+        with closing(self._connect()) as conn, conn:
+            conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), self.key(path)))
+        arrays = {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r') for name in CACHED_ARRAYS}
+        arrays['meta'] = meta
+        return arrays
+
+    def open(self, path: str, campaign: Optional[str] = None,
+             base_date: Optional[Union[date, str]] = None) -> Dict[str, np.ndarray]:
+        """
+        Memory-mapped arrays of a granule, decoding it into the cache first if needed
+
+        Args:
+            path: CRS file in any campaign format understood by open_crs_dataset
+            campaign: Campaign name; inferred from the filename if omitted
+            base_date: Flight base date for the hour-based campaigns
+
+        Returns:
+            Dict of read-only arrays (times, range_km, reflectivity,
+            doppler_velocity) plus the entry's 'meta' dict
+        """
+        arrays = self.get(path)
+        if arrays is None:
+            self.fill(path, campaign, base_date)
+            arrays = self.get(path)
+            if arrays is None:
+                raise OSError(f"Cache entry of {path} disappeared right after it was built")
+        return arrays
+
+    def fill(self, path: str, campaign: Optional[str] = None, base_date: Optional[Union[date, str]] = None):
+        """Decode a granule into a new cache entry"""
+        stat = os.stat(path)
+        key = self.key(path)
+        directory = self._directory(path)
+        # Build in a scratch directory and rename it into place, so concurrent
+        # readers and interrupted runs never see a partial entry
+        tmp_dir = tempfile.mkdtemp(prefix='.building-', dir=self.cache_dir)
+        try:
+            # Blocks are read one at a time on this thread. fill also runs in
+            # forked pool workers, where dask's threaded scheduler would wait
+            # forever on pool threads the fork did not copy
+            with open_crs_dataset(path, campaign, base_date) as ds, dask.config.set(scheduler='synchronous'):
+                times = ds['time'].values
+                np.save(os.path.join(tmp_dir, 'times.npy'), times)
+                np.save(os.path.join(tmp_dir, 'range_km.npy'), ds['range'].values)
+                for name in ('reflectivity', 'doppler_velocity'):
+                    field = ds[name]
+                    out = np.lib.format.open_memmap(os.path.join(tmp_dir, f'{name}.npy'), mode='w+',
+                                                    dtype=field.dtype, shape=field.shape)
+                    for i0 in range(0, len(times), FILL_BLOCK_ROWS):
+                        out[i0:i0 + FILL_BLOCK_ROWS] = field[i0:i0 + FILL_BLOCK_ROWS].values
+                    out.flush()
+                    del out
+                meta = {
+                    'source': os.path.abspath(path),
+                    'campaign': ds.attrs['campaign'],
+                    'source_file': ds.attrs['source_file'],
+                    'size': stat.st_size,
+                    'mtime': stat.st_mtime,
+                    'n_time': len(times),
+                    'n_range': ds.sizes['range']
+                }
+            with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+                json.dump(meta, f, indent=1)
+            n_bytes = sum(os.path.getsize(os.path.join(tmp_dir, name)) for name in os.listdir(tmp_dir))
+
+            # Move a previous entry aside rather than deleting it first, so the
+            # new one is swapped in with a single rename
+            stale_dir = None
+            if os.path.isdir(directory):
+                stale_dir = tempfile.mkdtemp(prefix='.stale-', dir=self.cache_dir)
+                try:
+                    os.rename(directory, os.path.join(stale_dir, 'entry'))
+                except FileNotFoundError:
+                    pass
+            try:
+                os.rename(tmp_dir, directory)
+            except OSError:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                # Fine if another process finished the same entry first; anything else is an error
+                if self.get(path) is None:
+                    raise
+                return
+            finally:
+                if stale_dir is not None:
+                    shutil.rmtree(stale_dir, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        with closing(self._connect()) as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO entries (key, source, bytes, accessed) VALUES (?, ?, ?, ?)",
+                         (key, os.path.abspath(path), n_bytes, time.time()))
+        self.evict(keep=key)
+
+    def evict(self, keep: Optional[str] = None) -> int:
+        """Remove least recently opened entries until the cache fits max_bytes"""
+        removed = 0
+        with closing(self._connect()) as conn:
+            total = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return 0
+            rows = conn.execute("SELECT key, bytes FROM entries ORDER BY accessed").fetchall()
+        for key, n_bytes in rows:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            self._remove(key)
+            total -= n_bytes
+            removed += 1
+        return removed
+
+    def _remove(self, key: str):
+        # Mapped arrays stay valid after their files are unlinked on POSIX
+        shutil.rmtree(os.path.join(self.cache_dir, key), ignore_errors=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def clear(self):
+        with closing(self._connect()) as conn:
+            keys = [row[0] for row in conn.execute("SELECT key FROM entries")]
+        for key in keys:
+            self._remove(key)
+
+_caches: Dict[str, ArrayCache] = {}
+
+def get_array_cache() -> Optional[ArrayCache]:
+    """
+    Shared cache configured from the environment, or None when it is off
+
+    The cache writes an uncompressed copy of every granule it opens, so it
+    is opt-in: CRS_ARRAY_CACHE=1 enables it, CRS_ARRAY_CACHE_DIR sets where
+    (default ~/.cache/crs_arrays) and CRS_ARRAY_CACHE_MAX_GB its size
+    (default 5).
+    """
+    if os.getenv('CRS_ARRAY_CACHE', '0') != '1':
+        return None
+    cache_dir = os.getenv('CRS_ARRAY_CACHE_DIR', default_cache_dir())
+    if cache_dir not in _caches:
+        max_gb = os.getenv('CRS_ARRAY_CACHE_MAX_GB')
+        max_bytes = int(float(max_gb) * 2**30) if max_gb else DEFAULT_MAX_BYTES
+        _caches[cache_dir] = ArrayCache(cache_dir, max_bytes)
+        logging.info(f"CRS array cache enabled: decoded granules are written to {cache_dir} "
+                     f"(up to {max_bytes / 2**30:g} GB)")
+    return _caches[cache_dir]
+
+def open_cached_crs_dataset(path: str, campaign: Optional[str] = None,
+                            base_date: Optional[Union[date, str]] = None,
+                            time_chunk: int = DEFAULT_TIME_CHUNK,
+                            cache: Optional[ArrayCache] = None) -> xr.Dataset:
+    """
+    open_crs_dataset backed by the array cache
+
+    Returns a Dataset with the same layout and attributes as
+    open_crs_dataset. Its fields are dask arrays over the memory-mapped
+    cache files rather than over the source file. Falls back to
+    open_crs_dataset when the cache is off (see get_array_cache).
+    """
+    cache = cache or get_array_cache()
+    if cache is None:
+        return open_crs_dataset(path, campaign, base_date, time_chunk)
+    return _mapped_dataset(cache.open(path, campaign, base_date), time_chunk)
+
+def _mapped_dataset(arrays: Dict[str, np.ndarray], time_chunk: int = DEFAULT_TIME_CHUNK) -> xr.Dataset:
+    """Standardized Dataset over the memory-mapped arrays of a cache entry"""
+    meta = arrays['meta']
+    return xr.Dataset(
+        {
+            # Memory maps are safe to read from several threads, no lock needed
+            'reflectivity': (('time', 'range'), da.from_array(arrays['reflectivity'], chunks=(time_chunk, -1)),
+                             {'units': 'dBZ'}),
+            'doppler_velocity': (('time', 'range'),
+                                 da.from_array(arrays['doppler_velocity'], chunks=(time_chunk, -1)),
+                                 {'units': 'm/s'})
+        },
+        coords={
+            'time': ('time', np.asarray(arrays['times'])),
+            'range': ('range', np.asarray(arrays['range_km']), {'units': 'km'})
+        },
+        attrs={'campaign': meta['campaign'], 'source_file': meta['source_file']}
+    )
+
+def open_cached_crs_flight(paths: Sequence[str], campaign: Optional[str] = None,
+                           time_chunk: int = DEFAULT_TIME_CHUNK,
+                           cache: Optional[ArrayCache] = None) -> xr.Dataset:
+    """
+    All segment files of a flight as one virtual Dataset with a single time axis
+
+    Segments already in the array cache are memory-mapped from it; all
+    others are opened lazily with open_crs_dataset and are not decoded into
+    the cache, so opening a flight reads only time and range. The segments
+    are stitched with stitch_segments, and a whole-flight or cross-segment
+    window reads only the chunks of the segments it overlaps. A single file
+    is opened with open_cached_crs_dataset as before.
+    """
+    cache = cache or get_array_cache()
+    if len(paths) == 1:
+        return stitch_segments([open_cached_crs_dataset(paths[0], campaign, time_chunk=time_chunk, cache=cache)])
+    datasets = []
+    try:
+        for path in paths:
+            arrays = cache.get(path) if cache is not None else None
+            datasets.append(open_crs_dataset(path, campaign, time_chunk=time_chunk) if arrays is None
+                            else _mapped_dataset(arrays, time_chunk))
+        return stitch_segments(datasets)
+    except Exception:
+        for ds in datasets:
+            ds.close()
+        raise
@@ -0,0 +1,333 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import logging
+from contextlib import closing
+from datetime import datetime, timedelta, date
+from fnmatch import fnmatch
+from typing import Dict, List, Optional, Union
+
+import h5py
+from pydantic import BaseModel
+
+from data_sources.impacts_reader import EPOCH, TIME_PATH, RANGE_PATH, REFLECTIVITY_PATH, VELOCITY_PATH
+
+# Filename patterns and variable names of the CRS campaign datasets
+CAMPAIGNS = {
+    'impacts': {'pattern': 'IMPACTS*_CRS_L1B_*.h5', 'time': TIME_PATH, 'range': RANGE_PATH,
+                'ref': REFLECTIVITY_PATH, 'dop': VELOCITY_PATH},
+    'goesrplt': {'pattern': 'GOESR_CRS_L1B_*.nc', 'time': 'time', 'range': 'range', 'ref': 'ref', 'dop': 'dop'},
+    'olympex': {'pattern': 'olympex_CRS_*.nc', 'time': 'timed', 'range': 'range', 'ref': 'zku', 'dop': 'dopcorr'},
+    'iphex': {'pattern': 'IPHEX_CRS_L1B_*.nc', 'time': 'timed', 'range': 'range', 'ref': 'zku', 'dop': 'dopcorr'},
+}
+
+_DATE_RE = re.compile(r'(?<!\d)(\d{8})')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS granules (
+    path TEXT PRIMARY KEY,
+    directory TEXT NOT NULL,
+    campaign TEXT NOT NULL,
+    flight_date TEXT NOT NULL,
+    start_time TEXT,
+    end_time TEXT,
+    n_times INTEGER,
+    n_range INTEGER,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS granules_campaign_time ON granules (campaign, start_time, end_time);
+CREATE INDEX IF NOT EXISTS granules_directory ON granules (directory);
+CREATE TABLE IF NOT EXISTS directories (
+    path TEXT PRIMARY KEY,
+    parent TEXT,
+    mtime REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS directories_parent ON directories (parent);
+"""
+
+class CRSGranule(BaseModel):
+    """Catalog entry for a single CRS data file"""
+    path: str
+    campaign: str
+    flight_date: date
+    start_time: Optional[datetime]
+    end_time: Optional[datetime]
+    n_times: Optional[int]
+    n_range: Optional[int]
+    size: int
+    mtime: float
+
+def campaign_for_filename(filename: str) -> Optional[str]:
+    """Return the campaign whose filename pattern matches, if any"""
+    for campaign, info in CAMPAIGNS.items():
+        if fnmatch(filename, info['pattern']):
+            return campaign
+    return None
+
+def flight_date_from_filename(filename: str) -> Optional[date]:
+    """Extract the flight date (first yyyymmdd group) from a CRS filename"""
+    match = _DATE_RE.search(filename)
+    if not match:
+        return None
+    try:
+        return datetime.strptime(match.group(1), '%Y%m%d').date()
+    except ValueError:
+        return None
+
+class CRSCatalog:
+    """
+    Persistent SQLite catalog of the CRS files under a data directory
+
+    Records campaign, flight date, exact start/end time, array shape, file
+    size and mtime for every granule. refresh() only lists directories whose
+    mtime changed since the previous refresh, and in those only files whose
+    size or mtime changed are opened, so an unchanged archive costs one stat
+    per directory. A file rewritten in place does not change its directory's
+    mtime; refresh(full=True) re-lists everything and picks it up. Files
+    that could not be read are kept with an unknown shape (n_times NULL) and
+    read again on every refresh until they succeed.
+    """
+
+    def __init__(self, data_dir: str, db_path: Optional[str] = None):
+        self.data_dir = os.path.abspath(data_dir)
+        if db_path is None:
+            # Keep the database out of the data tree: writing it there would
+            # bump the directory mtime on every commit
+            digest = hashlib.sha1(self.data_dir.encode('utf-8')).hexdigest()[:16]
+            cache_dir = os.path.join(os.path.expanduser('~'), '.cache', 'crs_catalog')
+            os.makedirs(cache_dir, exist_ok=True)
+            db_path = os.path.join(cache_dir, f'{digest}.sqlite')
+        self.db_path = db_path
+        with closing(self._connect()) as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def refresh(self, full: bool = False) -> int:
+        """
+        Bring the catalog up to date with the data directory
+
+        Args:
+            full: Re-list every directory, not only those whose mtime changed
+                (also notices files rewritten in place)
+
+        Returns:
+            Number of granules that were added or re-indexed
+        """
+        if not os.path.isdir(self.data_dir):
+            logging.warning(f"CRS data directory {self.data_dir} does not exist")
+            return 0
+
+        updated = 0
+        with closing(self._connect()) as conn, conn:
+            known_dirs = dict(conn.execute("SELECT path, mtime FROM directories"))
+            stack = [(self.data_dir, None)]
+            while stack:
+                directory, parent = stack.pop()
+                try:
+                    dir_mtime = os.stat(directory).st_mtime
+                except FileNotFoundError:
+                    self._forget_directory(conn, directory)
+                    continue
+
+                if not full and known_dirs.get(directory) == dir_mtime:
+                    # Unchanged listing: retry unreadable granules and reuse the known subdirectories
+                    updated += self._retry_unreadable(conn, directory)
+                    children = [row[0] for row in conn.execute(
+                        "SELECT path FROM directories WHERE parent = ?", (directory,))]
+                    stack.extend((child, directory) for child in children)
+                    continue
+
+                updated += self._scan_directory(conn, directory, stack)
+                conn.execute(
+                    "INSERT OR REPLACE INTO directories (path, parent, mtime) VALUES (?, ?, ?)",
+                    (directory, parent, dir_mtime))
+        return updated
+
+    def _retry_unreadable(self, conn: sqlite3.Connection, directory: str) -> int:
+        """Re-inspect the granules of an unchanged directory whose last read failed"""
+        updated = 0
+        for path, campaign in conn.execute(
+                "SELECT path, campaign FROM granules WHERE directory = ? AND n_times IS NULL",
+                (directory,)).fetchall():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                conn.execute("DELETE FROM granules WHERE path = ?", (path,))
+                continue
+            record = self._inspect(path, campaign, stat)
+            if record is not None:
+                self._store(conn, directory, record)
+                updated += 1
+        return updated
+
+    def _scan_directory(self, conn: sqlite3.Connection, directory: str, stack: list) -> int:
+        """Re-list one directory, re-indexing new, changed or unreadable granules"""
+        # Granules whose last read failed (n_times NULL) never count as known
+        known = {row[0]: (row[1], row[2]) if row[3] is not None else None for row in conn.execute(
+            "SELECT path, size, mtime, n_times FROM granules WHERE directory = ?", (directory,))}
+        known_children = {row[0] for row in conn.execute(
+            "SELECT path FROM directories WHERE parent = ?", (directory,))}
+
+        seen, children, updated = set(), set(), 0
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    children.add(entry.path)
+                    stack.append((entry.path, directory))
+                    continue
+                campaign = campaign_for_filename(entry.name)
+                if campaign is None or not entry.is_file():
+                    continue
+                stat = entry.stat()
+                seen.add(entry.path)
+                if known.get(entry.path) == (stat.st_size, stat.st_mtime):
+                    continue
+                record = self._inspect(entry.path, campaign, stat)
+                if record is not None:
+                    self._store(conn, directory, record)
+                    updated += 1
+
+        for path in set(known) - seen:
+            conn.execute("DELETE FROM granules WHERE path = ?", (path,))
+        for child in known_children - children:
+            self._forget_directory(conn, child)
+        return updated
+
+    def _forget_directory(self, conn: sqlite3.Connection, directory: str):
+        """Drop a removed directory and everything catalogued below it"""
+        prefix = os.path.join(directory, '')
+        conn.execute("DELETE FROM granules WHERE directory = ? OR directory LIKE ?",
+                     (directory, prefix + '%'))
+        conn.execute("DELETE FROM directories WHERE path = ? OR path LIKE ?",
+                     (directory, prefix + '%'))
+
+    def _store(self, conn: sqlite3.Connection, directory: str, record: CRSGranule):
+        conn.execute(
+            "INSERT OR REPLACE INTO granules (path, directory, campaign, flight_date, start_time, "
+            "end_time, n_times, n_range, size, mtime) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (record.path, directory, record.campaign, record.flight_date.isoformat(),
+             record.start_time.isoformat() if record.start_time else None,
+             record.end_time.isoformat() if record.end_time else None,
+             record.n_times, record.n_range, record.size, record.mtime))
+
+    def _inspect(self, path: str, campaign: str, stat: os.stat_result) -> Optional[CRSGranule]:
+        """Read the exact time span and array shape of a granule (shape None if the file could not be read)"""
+        flight_date = flight_date_from_filename(os.path.basename(path))
+        if flight_date is None:
+            logging.warning(f"Could not parse flight date from {path}")
+            return None
+
+        start_time = end_time = n_times = n_range = None
+        info = CAMPAIGNS[campaign]
+        try:
+            if campaign == 'impacts':
+                with h5py.File(path, 'r') as f:
+                    time_ds = f[info['time']]
+                    n_times, n_range = f[info['ref']].shape
+                    if n_times:
+                        start_time = EPOCH + timedelta(seconds=float(time_ds[0]))
+                        end_time = EPOCH + timedelta(seconds=float(time_ds[-1]))
+            else:
+                import xarray as xr
+                with xr.open_dataset(path, decode_cf=False) as ds:
+                    hours = ds[info['time']]
+                    n_times, n_range = ds[info['ref']].shape
+                    if n_times:
+                        t0 = datetime.combine(flight_date, datetime.min.time())
+                        start_time = t0 + timedelta(hours=float(hours[0]))
+                        end_time = t0 + timedelta(hours=float(hours[-1]))
+        except Exception as e:
+            logging.warning(f"Could not read time span of {path}, will retry: {str(e)}")
+            start_time = end_time = n_times = n_range = None
+
+        return CRSGranule(
+            path=path,
+            campaign=campaign,
+            flight_date=flight_date,
+            start_time=start_time,
+            end_time=end_time,
+            n_times=n_times,
+            n_range=n_range,
+            size=stat.st_size,
+            mtime=stat.st_mtime
+        )
+
+    def query(self, campaign: Optional[str] = None, start: Optional[datetime] = None,
+              end: Optional[datetime] = None, flight_date: Optional[Union[date, str]] = None) -> List[CRSGranule]:
+        """
+        Find catalogued granules
+
+        Args:
+            campaign: Campaign name ('impacts', 'goesrplt', 'olympex', 'iphex')
+            start: Only granules with data at or after this time
+            end: Only granules with data at or before this time
+            flight_date: Only granules of this flight date
+
+        Returns:
+            Matching granules ordered by start time
+        """
+        clauses, params = [], []
+        if campaign is not None:
+            clauses.append("campaign = ?")
+            params.append(campaign)
+        if start is not None:
+            clauses.append("end_time >= ?")
+            params.append(start.isoformat())
+        if end is not None:
+            clauses.append("start_time <= ?")
+            params.append(end.isoformat())
+        if flight_date is not None:
+            clauses.append("flight_date = ?")
+            params.append(flight_date if isinstance(flight_date, str) else flight_date.isoformat())
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT path, campaign, flight_date, start_time, end_time, n_times, n_range, size, mtime "
+                f"FROM granules {where} ORDER BY start_time, path", params).fetchall()
+        return [
+            CRSGranule(path=row[0], campaign=row[1], flight_date=row[2], start_time=row[3],
+                       end_time=row[4], n_times=row[5], n_range=row[6], size=row[7], mtime=row[8])
+            for row in rows
+        ]
+
+    def flight_dates(self, campaign: str) -> List[str]:
+        """Distinct flight dates ('yyyy-mm-dd') available for a campaign"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT DISTINCT flight_date FROM granules WHERE campaign = ? ORDER BY flight_date",
+                (campaign,)).fetchall()
+        return [row[0] for row in rows]
+
+    def files_for_date(self, campaign: str, flight_date: Union[date, str]) -> List[str]:
+        """Paths of a campaign's granules for one flight date, ordered by start time"""
+        return [granule.path for granule in self.query(campaign, flight_date=flight_date)]
+
+# Seconds a process trusts its last refresh of a catalog before get_catalog refreshes again
+REFRESH_INTERVAL = 60.0
+
+_catalogs: Dict[str, CRSCatalog] = {}
+_refreshed: Dict[str, float] = {}
+
+def get_catalog(data_dir: str, max_age: float = REFRESH_INTERVAL) -> CRSCatalog:
+    """
+    Return the shared catalog for a data directory
+
+    The catalog is refreshed incrementally when this process has not
+    refreshed it within max_age seconds, so repeated lookups (every
+    connector read, every notebook selector) do not walk the tree each
+    time. Pass max_age=0 to force a refresh.
+    """
+    key = os.path.abspath(data_dir)
+    if key not in _catalogs:
+        _catalogs[key] = CRSCatalog(key)
+    now = time.monotonic()
+    if key not in _refreshed or now - _refreshed[key] >= max_age:
+        _catalogs[key].refresh()
+        _refreshed[key] = now
+    return _catalogs[key]
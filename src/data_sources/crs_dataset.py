@@ -0,0 +1,175 @@
+import os
+from datetime import date
+from typing import Optional, Sequence, Union
+
+import h5py
+import numpy as np
+import xarray as xr
+import dask.array as da
+
+from data_sources.crs_catalog import CAMPAIGNS, campaign_for_filename, flight_date_from_filename
+from data_sources.time_axis import campaign_time_axis
+
+# Rows per dask chunk; a 4096 x 500 float32 block is ~8 MB
+DEFAULT_TIME_CHUNK = 4096
+# Largest difference between the range gates of two segments that are still treated as the same gates
+GATE_TOLERANCE_KM = 0.001
+
+def open_crs_dataset(path: str, campaign: Optional[str] = None, base_date: Optional[Union[date, str]] = None,
+                     time_chunk: int = DEFAULT_TIME_CHUNK) -> xr.Dataset:
+    """
+    Open a CRS granule of any campaign as a lazily loaded, standardized Dataset
+
+    Every campaign is exposed with the same layout:
+    - time: datetime64[ns] coordinate
+    - range: range from radar in km coordinate
+    - reflectivity: (time, range) dask array in dBZ
+    - doppler_velocity: (time, range) dask array in m/s
+
+    Only the 1-D time and range coordinates are read when the file is
+    opened; the 2-D fields are read chunk by chunk when a slice is computed.
+
+    Args:
+        path: Path to the CRS file
+        campaign: 'impacts', 'goesrplt', 'olympex' or 'iphex'; inferred
+            from the filename if omitted
+        base_date: Flight base date for the hour-based campaigns; parsed
+            from the filename if omitted
+        time_chunk: Number of time rows per dask chunk
+
+    Returns:
+        Standardized xarray Dataset; close it (or use it as a context
+        manager) to release the underlying file
+    """
+    campaign = campaign or campaign_for_filename(os.path.basename(path))
+    if campaign not in CAMPAIGNS:
+        raise ValueError(f"Cannot tell which CRS campaign {path} belongs to")
+    names = CAMPAIGNS[campaign]
+
+    if campaign == 'impacts':
+        f = h5py.File(path, 'r')
+        try:
+            times = campaign_time_axis(campaign, f[names['time']][:])
+            range_km = f[names['range']][:] / 1000.0
+            # h5py is not thread safe, so dask must serialize reads
+            fields = {
+                name: da.from_array(f[names[key]], chunks=(time_chunk, -1), lock=True)
+                for name, key in (('reflectivity', 'ref'), ('doppler_velocity', 'dop'))
+            }
+        except Exception:
+            f.close()
+            raise
+        close = f.close
+    else:
+        if base_date is None:
+            base_date = flight_date_from_filename(os.path.basename(path))
+        raw = xr.open_dataset(path, decode_cf=False, chunks={})
+        try:
+            time_dim = raw[names['time']].dims[0]
+            range_dim = raw[names['range']].dims[0]
+            times = campaign_time_axis(campaign, raw[names['time']].values, base_date)
+            range_km = raw[names['range']].values / 1000.0
+            fields = {
+                name: raw[names[key]].transpose(time_dim, range_dim).data.rechunk((time_chunk, -1))
+                for name, key in (('reflectivity', 'ref'), ('doppler_velocity', 'dop'))
+            }
+        except Exception:
+            raw.close()
+            raise
+        close = raw.close
+
+    ds = xr.Dataset(
+        {
+            'reflectivity': (('time', 'range'), fields['reflectivity'], {'units': 'dBZ'}),
+            'doppler_velocity': (('time', 'range'), fields['doppler_velocity'], {'units': 'm/s'})
+        },
+        coords={
+            'time': ('time', times),
+            'range': ('range', range_km, {'units': 'km'})
+        },
+        attrs={'campaign': campaign, 'source_file': os.path.basename(path)}
+    )
+    ds.set_close(close)
+    return ds
+
+def stitch_segments(datasets: Sequence[xr.Dataset], gate_tolerance_km: float = GATE_TOLERANCE_KM) -> xr.Dataset:
+    """
+    Stitch standardized granule Datasets into one lazy Dataset along time
+
+    Segments are ordered by their first time stamp. Rows of a segment that
+    do not come after the end of the previous one (overlapping segment
+    edges) are dropped, so the stitched time axis stays strictly increasing
+    and can still be binary-searched. Nothing is read or copied: every field
+    stays a dask array over the segments' own chunks, so a window only reads
+    the segments and chunks it touches.
+
+    All segments must have the same range gates. Gates that differ by at
+    most gate_tolerance_km (rounding in the files) are snapped onto the
+    first segment's gates; anything else raises ValueError rather than
+    joining the gate axes, which would interleave the gates and fill half
+    of every profile with NaN.
+
+    The result records source_files and segment_starts (first row of each
+    segment on the stitched axis), and closing it closes every segment.
+    """
+    datasets = sorted(datasets, key=lambda ds: ds['time'].values[0] if ds.sizes['time'] else np.datetime64('NaT'))
+    segments = []
+    last = None
+    for ds in datasets:
+        if ds.sizes['time'] == 0:
+            continue
+        if last is not None:
+            first_new = int(np.searchsorted(ds['time'].values, last, side='right'))
+            if first_new >= ds.sizes['time']:
+                continue
+            ds = ds.isel(time=slice(first_new, None))
+        if segments:
+            gates, reference = ds['range'].values, segments[0]['range'].values
+            if gates.shape != reference.shape or not np.allclose(gates, reference, rtol=0, atol=gate_tolerance_km):
+                raise ValueError(f"Range gates of {ds.attrs['source_file']} do not match those of "
+                                 f"{segments[0].attrs['source_file']}")
+            ds = ds.assign_coords(range=segments[0]['range'])
+        segments.append(ds)
+        last = ds['time'].values[-1]
+
+    if len(segments) == 1:
+        combined = segments[0].copy()
+    elif segments:
+        combined = xr.concat(segments, dim='time', join='exact', combine_attrs='drop_conflicts')
+    else:
+        combined = datasets[0].copy() if datasets else xr.Dataset()
+    combined.attrs['source_files'] = [ds.attrs['source_file'] for ds in segments]
+    combined.attrs['segment_starts'] = [int(n) for n in np.cumsum([0] + [ds.sizes['time'] for ds in segments[:-1]])]
+
+    def close():
+        for ds in datasets:
+            ds.close()
+
+    combined.set_close(close)
+    return combined
+
+def open_crs_flight(paths: Sequence[str], campaign: Optional[str] = None,
+                    time_chunk: int = DEFAULT_TIME_CHUNK) -> xr.Dataset:
+    """
+    Open several CRS granules as one lazy Dataset concatenated along time
+
+    Granules are ordered by their first time stamp. Works across flights
+    and campaigns as long as the range gates match; see stitch_segments.
+
+    Args:
+        paths: CRS files to combine
+        campaign: Campaign of all files; inferred per file if omitted
+        time_chunk: Number of time rows per dask chunk
+
+    Returns:
+        Standardized xarray Dataset spanning all granules
+    """
+    datasets = []
+    try:
+        for path in paths:
+            datasets.append(open_crs_dataset(path, campaign, time_chunk=time_chunk))
+        return stitch_segments(datasets)
+    except Exception:
+        for ds in datasets:
+            ds.close()
+        raise
@@ -0,0 +1,95 @@
+from datetime import datetime
+from typing import Optional, Union
+
+import numpy as np
+
+TimeBound = Optional[Union[str, float, int, np.floating]]
+
+def clock_to_hours(value: str) -> float:
+    """
+    Convert an 'hh:mm:ss' string to fractional hours
+
+    Raises:
+        ValueError: If the string is not a valid time
+    """
+    t = datetime.strptime(value, '%H:%M:%S').time()
+    return t.hour + t.minute / 60 + t.second / 3600
+
+def _as_hours(value: TimeBound) -> Optional[float]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return clock_to_hours(value)
+    return float(value)
+
+def _as_bound(value, times: np.ndarray):
+    """
+    Express a subset bound in the units of the time coordinate
+
+    Clock times and hours count from the day of the first sample, like the
+    hours-after-base-date encoding of the raw files. On a flight that
+    crosses midnight, a bound that would fall before the first sample is
+    taken to mean the next day.
+    """
+    if value is None:
+        return None
+    if np.issubdtype(times.dtype, np.datetime64):
+        if isinstance(value, (datetime, np.datetime64)):
+            return np.datetime64(value, 'ns')
+        day = times[0].astype('datetime64[D]').astype('datetime64[ns]')
+        bound = day + np.timedelta64(int(round(_as_hours(value) * 3600e9)), 'ns')
+        one_day = np.timedelta64(1, 'D')
+        if len(times) and bound < times[0] and times[-1] >= day + one_day:
+            bound += one_day
+        return bound
+    hours = _as_hours(value)
+    if len(times) and hours < times[0] and times[-1] >= 24.0:
+        hours += 24.0
+    return hours
+
+def time_index_window(times: np.ndarray, t1=None, t2=None) -> slice:
+    """
+    Resolve the closed interval [t1, t2] to an index slice of a monotonic
+    time coordinate with searchsorted
+
+    Args:
+        times: Monotonically increasing 1-D time values
+        t1: Interval start (inclusive); None means the first sample
+        t2: Interval end (inclusive); None means the last sample
+
+    Returns:
+        Index slice; empty if the interval misses the data
+    """
+    i0 = 0 if t1 is None else int(np.searchsorted(times, t1, side='left'))
+    i1 = len(times) if t2 is None else int(np.searchsorted(times, t2, side='right'))
+    return slice(i0, max(i0, i1))
+
+def subset_by_time(ds, t1: TimeBound = None, t2: TimeBound = None, time_name: str = 'timed'):
+    """
+    Subset a CRS netCDF dataset to the time interval [t1, t2]
+
+    Non-interactive counterpart of the CRSsubset notebook prompts. The
+    interval is located with searchsorted on the (monotonic) time variable
+    and returned as an isel view, so no mask is broadcast across the
+    variables and nothing is copied or upcast until values are read.
+
+    Args:
+        ds: xarray Dataset opened with decode_cf=False, or a standardized
+            dataset from open_crs_dataset
+        t1: Start as 'hh:mm:ss' string, hours UTC or datetime; None for
+            flight start
+        t2: End as 'hh:mm:ss' string, hours UTC or datetime; None for
+            flight end
+        time_name: Time variable ('timed' for OLYMPEX/IPHEX, 'time' for
+            GOES-R PLT and standardized datasets)
+
+    Returns:
+        Dataset view covering the interval (empty along time if no data)
+
+    Raises:
+        ValueError: If t1 or t2 is not a valid time string
+    """
+    time_var = ds[time_name]
+    times = time_var.values
+    window = time_index_window(times, _as_bound(t1, times), _as_bound(t2, times))
+    return ds.isel({time_var.dims[0]: window})
@@ -0,0 +1,54 @@
+from typing import Tuple
+
+import numpy as np
+
+DECIMATION_METHODS = ('mean', 'max', 'min')
+
+def bin_edges(n_samples: int, n_bins: int) -> np.ndarray:
+    """Start indices of n_bins near-equal runs covering n_samples (plus the end)"""
+    return np.linspace(0, n_samples, n_bins + 1).astype(np.int64)
+
+def decimate_curtain(times: np.ndarray, field: np.ndarray, n_bins: int,
+                     method: str = 'mean') -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Reduce a (time, range) curtain to at most n_bins time columns
+
+    Consecutive time samples are grouped into n_bins near-equal runs and
+    each run is reduced per range gate, ignoring NaNs. Used to bring a
+    curtain down to the number of horizontal pixels it is drawn on.
+
+    Args:
+        times: 1-D time axis, shape (n_time,)
+        field: 2-D data, shape (n_time, n_range); any array that can be
+            sliced by rows (numpy, h5py, dask), read one bin at a time
+        n_bins: Number of output columns (e.g. the axes width in pixels)
+        method: 'mean', 'max' or 'min' per bin
+
+    Returns:
+        Tuple of (bin center times, binned field of shape (n_bins, n_range));
+        the inputs are returned unchanged if they already fit
+    """
+    if method not in DECIMATION_METHODS:
+        raise ValueError(f"Unknown decimation method {method!r}; use one of {DECIMATION_METHODS}")
+    n_time = len(times)
+    if n_bins <= 0 or n_time <= n_bins:
+        return times, field
+
+    edges = bin_edges(n_time, n_bins)
+    centers = times[(edges[:-1] + edges[1:] - 1) // 2]
+    binned = np.empty((n_bins,) + field.shape[1:], dtype=np.float64)
+    # One contiguous block of rows per output column: far faster than
+    # ufunc.reduceat along axis 0 and reads array-likes block by block
+    for i, (i0, i1) in enumerate(zip(edges[:-1], edges[1:])):
+        block = np.asarray(field[i0:i1])
+        if method == 'mean':
+            valid = ~np.isnan(block)
+            counts = valid.sum(axis=0)
+            sums = np.where(valid, block, 0).sum(axis=0, dtype=np.float64)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                binned[i] = np.where(counts > 0, sums / counts, np.nan)
+        else:
+            # fmax/fmin skip NaNs; an all-NaN bin stays NaN
+            reducer = np.fmax if method == 'max' else np.fmin
+            binned[i] = reducer.reduce(block, axis=0)
+    return centers, binned
@@ -0,0 +1,131 @@
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Dict, Optional, Union
+
+import h5py
+import numpy as np
+
+EPOCH = datetime(1970, 1, 1)  # TimeUTC reference used by IMPACTS CRS files
+
+TIME_PATH = 'Time/Data/TimeUTC'
+RANGE_PATH = 'Products/Information/Range'
+REFLECTIVITY_PATH = 'Products/Data/dBZe'
+VELOCITY_PATH = 'Products/Data/Velocity_corrected'
+
+TimeLike = Union[datetime, np.datetime64, float, int]
+
+class _DatasetSequence:
+    """
+    Read-only sequence view over a 1-D HDF5 dataset
+
+    Lets bisect probe individual elements so that a binary search only
+    touches O(log n) values instead of reading the whole dataset.
+    """
+
+    def __init__(self, dataset: h5py.Dataset):
+        self.dataset = dataset
+
+    def __len__(self) -> int:
+        return self.dataset.shape[0]
+
+    def __getitem__(self, index: int) -> float:
+        return float(self.dataset[index])
+
+def to_epoch_seconds(value: TimeLike) -> float:
+    """Convert a naive UTC datetime, datetime64 or number to seconds since epoch"""
+    if isinstance(value, np.datetime64):
+        return float((value - np.datetime64('1970-01-01T00:00:00', 'ns')) / np.timedelta64(1, 's'))
+    if isinstance(value, datetime):
+        return (value - EPOCH).total_seconds()
+    return float(value)
+
+def find_time_window(time_ds: h5py.Dataset, start: Optional[TimeLike] = None,
+                     end: Optional[TimeLike] = None) -> slice:
+    """
+    Binary-search a monotonic TimeUTC dataset for the rows inside [start, end]
+
+    Args:
+        time_ds: Time/Data/TimeUTC dataset (seconds since epoch)
+        start: Window start (inclusive); None means start of file
+        end: Window end (inclusive); None means end of file
+
+    Returns:
+        Row slice covering the window; empty if the window misses the file
+    """
+    seq = _DatasetSequence(time_ds)
+    i0 = 0 if start is None else bisect_left(seq, to_epoch_seconds(start))
+    i1 = len(seq) if end is None else bisect_right(seq, to_epoch_seconds(end))
+    return slice(i0, max(i0, i1))
+
+def memmap_dataset(dataset: h5py.Dataset) -> Optional[np.memmap]:
+    """
+    Map an HDF5 dataset read-only straight from its file, without copying
+
+    Only possible when the dataset's raw bytes are one contiguous block of
+    the file: contiguous layout (never chunked, hence never compressed or
+    filtered), stored in the file itself rather than external files, space
+    already allocated, a fixed-size numeric dtype, and the file opened with
+    the default driver from a path on disk.
+
+    Returns:
+        Read-only np.memmap with the dataset's shape and dtype, or None if the
+        dataset cannot be mapped and has to be read normally
+    """
+    try:
+        if dataset.chunks is not None or dataset.file.driver != 'sec2':
+            return None
+        dcpl = dataset.id.get_create_plist()
+        if dcpl.get_layout() != h5py.h5d.CONTIGUOUS or dcpl.get_external_count() > 0:
+            return None
+        if dataset.dtype.kind not in 'biuf' or dataset.size == 0:
+            return None
+        # Absolute byte offset of the raw data in the file; None until written
+        offset = dataset.id.get_offset()
+        if offset is None:
+            return None
+        return np.memmap(dataset.file.filename, dtype=dataset.dtype, mode='r', offset=offset,
+                         shape=dataset.shape)
+    except (OSError, ValueError, TypeError):
+        return None
+
+def read_impacts_rows(h5file: h5py.File, window: slice, mmap: bool = False) -> Dict[str, np.ndarray]:
+    """
+    Read a contiguous block of rows from an IMPACTS CRS file
+
+    Args:
+        h5file: Open IMPACTS CRS HDF5 file
+        window: Row slice, e.g. from find_time_window
+        mmap: Return dBZe and Velocity_corrected as read-only memory-mapped
+            views when they are stored contiguous and uncompressed, so only
+            the pages that are touched are read and nothing is copied.
+            Chunked or compressed fields are read normally.
+
+    Returns:
+        Dictionary with the row slice and the windowed TimeUTC, Range (m),
+        dBZe and Velocity_corrected arrays
+    """
+    rows = {
+        'window': window,
+        'time_utc': h5file[TIME_PATH][window],
+        'range': h5file[RANGE_PATH][:]
+    }
+    for name, path in (('dBZe', REFLECTIVITY_PATH), ('Velocity_corrected', VELOCITY_PATH)):
+        mapped = memmap_dataset(h5file[path]) if mmap else None
+        rows[name] = mapped[window] if mapped is not None else h5file[path][window, :]
+    return rows
+
+def read_impacts_window(h5file: h5py.File, start: Optional[TimeLike] = None,
+                        end: Optional[TimeLike] = None, mmap: bool = False) -> Dict[str, np.ndarray]:
+    """
+    Read only the rows of an IMPACTS CRS file that fall inside [start, end]
+
+    Args:
+        h5file: Open IMPACTS CRS HDF5 file
+        start: Window start (inclusive); None means start of file
+        end: Window end (inclusive); None means end of file
+        mmap: Memory-map contiguous, uncompressed fields (see read_impacts_rows)
+
+    Returns:
+        Same dictionary as read_impacts_rows
+    """
+    return read_impacts_rows(h5file, find_time_window(h5file[TIME_PATH], start, end), mmap)
@@ -1,12 +1,23 @@
 import os
+import shutil
+import tempfile
 import pandas as pd
 import numpy as np
 import h5py
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
-from pydantic import BaseModel
+from typing import Any, Dict, Iterator, List, Optional
+from pydantic import BaseModel, ConfigDict, Field
 import logging
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from data_sources.impacts_reader import (
+    read_impacts_window, find_time_window, memmap_dataset, TIME_PATH, RANGE_PATH, REFLECTIVITY_PATH, VELOCITY_PATH
+)
+from data_sources.crs_catalog import get_catalog
+from data_sources.crs_subset import time_index_window
+from data_sources.array_cache import ArrayCache, get_array_cache
+from data_sources.time_axis import epoch_seconds_to_datetime64, to_datetime
+from data_sources.stats import RunningStats, REFLECTIVITY_BINS, VELOCITY_BINS
 
 class SatelliteData(BaseModel):
     timestamp: datetime
@@ -16,63 +27,173 @@ class SatelliteData(BaseModel):
     source: str
     metadata: Dict[str, str]
 
+class CRSCurtain(BaseModel):
+    """
+    Columnar time-height curtain of CRS measurements from a single file
+
+    Arrays are stored once per file instead of once per range gate:
+    - times: datetime64[ns] array, shape (n_time,)
+    - range_km: range from radar (km), shape (n_range,)
+    - reflectivity: dBZe, shape (n_time, n_range)
+    - doppler_velocity: Velocity_corrected (m/s), shape (n_time, n_range)
+    """
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    times: np.ndarray
+    range_km: np.ndarray
+    reflectivity: np.ndarray
+    doppler_velocity: Optional[np.ndarray] = None
+    source: str = 'NASA Cloud Radar System (CRS)'
+    filepath: Optional[str] = None
+    metadata: Dict[str, Any] = Field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    @property
+    def n_gates(self) -> int:
+        """Number of (time, range) gates in the curtain"""
+        return int(self.reflectivity.size)
+
+    @property
+    def start(self) -> datetime:
+        return to_datetime(self.times[0])
+
+    @property
+    def end(self) -> datetime:
+        return to_datetime(self.times[-1])
+
+    def iter_records(self) -> Iterator[SatelliteData]:
+        """
+        Lazily yield one SatelliteData record per (time, range) gate
+
+        Only intended for callers that still need per-gate objects; prefer
+        working with the arrays directly.
+        """
+        location_base = {
+            'latitude': self.metadata.get('latitude', 0.0),
+            'longitude': self.metadata.get('longitude', 0.0)
+        }
+        record_metadata = {
+            'instrument': 'CRS',
+            'processing_level': self.metadata.get('processing_level', 'L1B'),
+            'quality': self.metadata.get('quality', 'Good'),
+            'flight_info': self.metadata.get('flight_info', '')
+        }
+        times = self.times.astype('datetime64[us]').tolist()
+        heights = self.range_km.tolist()
+        for i, timestamp in enumerate(times):
+            dbz_row = self.reflectivity[i].tolist()
+            vel_row = self.doppler_velocity[i].tolist() if self.doppler_velocity is not None else None
+            for j, height in enumerate(heights):
+                yield SatelliteData(
+                    timestamp=timestamp,
+                    reflectivity=dbz_row[j],
+                    doppler_velocity=vel_row[j] if vel_row is not None else None,
+                    location={'height': height, **location_base},
+                    source=self.source,
+                    metadata=dict(record_metadata)
+                )
+
+    def statistics(self) -> Dict[str, RunningStats]:
+        """Single-pass statistics of each field, histogrammed on the fixed CRS bins"""
+        statistics = {'reflectivity_dbz': RunningStats.from_array(self.reflectivity, REFLECTIVITY_BINS)}
+        if self.doppler_velocity is not None:
+            statistics['doppler_velocity_ms'] = RunningStats.from_array(self.doppler_velocity, VELOCITY_BINS)
+        return statistics
+
+    def summary(self, statistics: Optional[Dict[str, RunningStats]] = None) -> Dict[str, Any]:
+        """
+        Compact per-file summary used by the report pipeline
+
+        Args:
+            statistics: Result of statistics(), if the caller already computed it
+        """
+        statistics = statistics or self.statistics()
+        summary = {
+            'file': os.path.basename(self.filepath) if self.filepath else None,
+            'start': self.start.isoformat(),
+            'end': self.end.isoformat(),
+            'n_times': len(self.times),
+            'n_range_gates': len(self.range_km),
+            'height_range_km': [float(np.nanmin(self.range_km)), float(np.nanmax(self.range_km))],
+            'flight_info': self.metadata.get('flight_info', '')
+        }
+        for name, stats in statistics.items():
+            # Histograms are left to the merged, dataset-wide statistics
+            summary[name] = {key: value for key, value in stats.to_dict().items() if key != 'histogram'}
+        return summary
+
 class NASADataConnector:
     """Connector for NASA CRS (Cloud Radar System) Data"""
     
-    def __init__(self, data_dir: Optional[str] = None):
+    def __init__(self, data_dir: Optional[str] = None, max_workers: Optional[int] = None,
+                 array_cache: Optional[ArrayCache] = None):
         self.data_dir = data_dir or os.path.join(os.getcwd(), 'data', 'crs')
+        self.max_workers = max_workers
+        # Decoded granules are memory-mapped from the array cache (opt-in with CRS_ARRAY_CACHE=1)
+        self.array_cache = array_cache if array_cache is not None else get_array_cache()
         os.makedirs(self.data_dir, exist_ok=True)
         
-    def get_cloud_radar_data(self, start_date: datetime, end_date: datetime) -> List[SatelliteData]:
+    def get_cloud_radar_data(self, start_date: datetime, end_date: datetime,
+                             max_workers: Optional[int] = None) -> List[CRSCurtain]:
         """
         Read CRS reflectivity and Doppler velocity data
         
         Args:
             start_date: Start date for data collection
             end_date: End date for data collection
+            max_workers: Number of processes used to decode files in parallel;
+                defaults to the connector's max_workers (serial if unset)
             
         Returns:
-            List of SatelliteData objects containing the measurements
+            List of CRSCurtain objects, one per matching file, ordered by time
         """
         try:
-            # List available HDF5 files in the directory
-            data_files = [f for f in os.listdir(self.data_dir) if f.endswith('.h5')]
+            # Look up IMPACTS granules overlapping the window in the file catalog
+            granules = get_catalog(self.data_dir).query('impacts', start_date, end_date)
             
-            if not data_files:
-                logging.warning(f"No CRS HDF5 files found in {self.data_dir}")
+            if not granules:
+                logging.warning(f"No CRS HDF5 files found in {self.data_dir} for {start_date} - {end_date}")
                 return []
                 
-            results = []
-            for file in data_files:
-                file_date = self._parse_date_from_filename(file)
-                if start_date <= file_date <= end_date:
-                    data = self._read_crs_file(os.path.join(self.data_dir, file))
-                    results.extend(data)
+            paths = [granule.path for granule in granules]
+            max_workers = self.max_workers if max_workers is None else max_workers
+            results = None
+            if max_workers and max_workers > 1 and len(paths) > 1:
+                if self.array_cache is not None:
+                    # Decode missing cache entries in parallel; the reads below are then just mappings
+                    self._fill_array_cache_parallel(paths, max_workers)
+                else:
+                    results = self._read_crs_files_parallel(paths, start_date, end_date, max_workers)
+                
+            if results is None:
+                results = []
+                for path in paths:
+                    curtain = self.read_crs_file(path, start_date, end_date)
+                    if curtain is not None:
+                        results.append(curtain)
             
-            return results
+            # Same order whichever way the files were read
+            return sorted(results, key=lambda curtain: curtain.times[0])
             
         except Exception as e:
             logging.error(f"Error reading CRS data: {str(e)}")
             return []
 
-    def get_latest_data(self) -> List[SatelliteData]:
+    def get_latest_data(self) -> List[CRSCurtain]:
         """
         Get the most recent week of data
         
         Returns:
-            List of SatelliteData objects from the past week
+            List of CRSCurtain objects from the past week
         """
         end_date = datetime.now()
         start_date = end_date - timedelta(days=7)
         return self.get_cloud_radar_data(start_date, end_date)
 
-    def _parse_date_from_filename(self, filename: str) -> datetime:
-        """Extract date from CRS filename format"""
-        # Example filename format: IMPACTS_CRS_L1B_YYYYMMDD_[flight_number].h5
-        date_str = filename.split('_')[3]
-        return datetime.strptime(date_str, '%Y%m%d')
-
-    def _read_crs_file(self, filepath: str) -> List[SatelliteData]:
+    def read_crs_file(self, filepath: str, start_date: Optional[datetime] = None,
+                      end_date: Optional[datetime] = None) -> Optional[CRSCurtain]:
         """
         Read and parse CRS HDF5 file for IMPACTS campaign
         
@@ -81,53 +202,186 @@ class NASADataConnector:
         - Products/Information/Range: Range/height values (m)
         - Products/Data/dBZe: Radar Reflectivity (dBZ)
         - Products/Data/Velocity_corrected: Doppler Velocity (m/s)
+        
+        Only the rows between start_date and end_date are read from disk; the
+        window is located by binary search on the monotonic TimeUTC dataset.
+        Fields stored contiguous and uncompressed are memory-mapped straight
+        from the file instead of copied. Otherwise, with the array cache
+        enabled, the arrays are memory-mapped views of the decoded granule.
+        Returns None if the file has no data inside the window.
         """
         try:
-            results = []
-            t0 = datetime.fromisoformat('1970-01-01T00:00:00')  # Epoch time reference
-            
             with h5py.File(filepath, 'r') as f:
                 # Get metadata
                 metadata = self._extract_hdf5_metadata(f)
                 
-                # Get datasets using correct paths
-                time_utc = f['Time']['Data']['TimeUTC'][:]  # seconds since epoch
-                range_data = f['Products']['Information']['Range'][:] / 1000.0  # Convert from m to km
-                dbz = f['Products']['Data']['dBZe'][:]  # Reflectivity
-                velocity = f['Products']['Data']['Velocity_corrected'][:]  # Corrected Doppler velocity
+                if self.array_cache is not None and not self._is_mappable(f):
+                    return self._read_cached_crs_file(filepath, metadata, start_date, end_date)
+                
+                # Read only the rows inside the requested time window
+                data = read_impacts_window(f, start_date, end_date, mmap=True)
+                
+            if len(data['time_utc']) == 0:
+                return None
                 
-                # Convert times to datetime objects
-                times = [t0 + timedelta(seconds=float(s)) for s in time_utc]
+            time_utc = data['time_utc']  # seconds since epoch
+            range_data = data['range'] / 1000.0  # Convert from m to km
+            dbz = data['dBZe']  # Reflectivity
+            velocity = data['Velocity_corrected']  # Corrected Doppler velocity
                 
-                # Process each time step
-                for i, timestamp in enumerate(times):
-                    # Process each range bin
-                    for j, height in enumerate(range_data):
-                        results.append(
-                            SatelliteData(
-                                timestamp=timestamp,
-                                reflectivity=float(dbz[i, j]),
-                                doppler_velocity=float(velocity[i, j]) if velocity is not None else None,
-                                location={
-                                    'height': float(height),
-                                    'latitude': metadata.get('latitude', 0.0),
-                                    'longitude': metadata.get('longitude', 0.0)
-                                },
-                                source='NASA Cloud Radar System (CRS)',
-                                metadata={
-                                    'instrument': 'CRS',
-                                    'processing_level': metadata.get('processing_level', 'L1B'),
-                                    'quality': metadata.get('quality', 'Good'),
-                                    'flight_info': metadata.get('flight_info', '')
-                                }
-                            )
-                        )
-            return results
+            # Convert epoch seconds to datetime64 in one vectorized step
+            times = epoch_seconds_to_datetime64(time_utc)
+            
+            return CRSCurtain(
+                times=times,
+                range_km=range_data,
+                reflectivity=dbz,
+                doppler_velocity=velocity,
+                filepath=filepath,
+                metadata=metadata
+            )
             
         except Exception as e:
             logging.error(f"Error parsing CRS file {filepath}: {str(e)}")
             logging.error(f"File structure: {self._print_hdf5_structure(filepath)}")
-            return []
+            return None
+            
+    def _read_cached_crs_file(self, filepath: str, metadata: Dict[str, Any], start_date: Optional[datetime] = None,
+                              end_date: Optional[datetime] = None) -> Optional[CRSCurtain]:
+        """read_crs_file through the array cache: the curtain's arrays are read-only memory maps"""
+        arrays = self.array_cache.open(filepath, 'impacts')
+        window = time_index_window(arrays['times'],
+                                   None if start_date is None else np.datetime64(start_date, 'ns'),
+                                   None if end_date is None else np.datetime64(end_date, 'ns'))
+        if window.stop <= window.start:
+            return None
+        return CRSCurtain(
+            times=np.asarray(arrays['times'][window]),
+            range_km=np.asarray(arrays['range_km']),
+            reflectivity=arrays['reflectivity'][window],
+            doppler_velocity=arrays['doppler_velocity'][window],
+            filepath=filepath,
+            metadata=metadata
+        )
+
+    @staticmethod
+    def _is_mappable(h5file: h5py.File) -> bool:
+        """Whether both fields of an open file can be memory-mapped from it directly (nothing to decode or cache)"""
+        return all(memmap_dataset(h5file[path]) is not None for path in (REFLECTIVITY_PATH, VELOCITY_PATH))
+
+    def _cache_crs_file(self, filepath: str):
+        """Worker side of _fill_array_cache_parallel: decode a file into the array cache unless it is mappable"""
+        with h5py.File(filepath, 'r') as f:
+            if self._is_mappable(f):
+                return
+        self.array_cache.fill(filepath, 'impacts')
+
+    def _fill_array_cache_parallel(self, paths: List[str], max_workers: int):
+        """Decode the granules that are not in the array cache yet in a process pool"""
+        missing = [path for path in paths if self.array_cache.get(path) is None]
+        if not missing:
+            return
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(self._cache_crs_file, path) for path in missing]
+            for path, future in zip(missing, futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    logging.error(f"Error caching CRS file {path}: {str(e)}")
+
+    def _read_crs_files_parallel(self, paths: List[str], start_date: datetime, end_date: datetime,
+                                 max_workers: int) -> List[CRSCurtain]:
+        """
+        Decode CRS files in a process pool
+        
+        Each worker reads its file's window straight into memory-mapped .npy
+        files in a scratch directory and returns only their paths and the file
+        metadata, so no array data is pickled back to this process. The
+        curtains returned here are read-only views onto those files. Fields
+        that can be memory-mapped straight from their source file are not
+        copied at all: the worker returns their location and this process
+        maps the window's rows. Curtains are in the order the files were given.
+        """
+        results = []
+        spill_dir = tempfile.mkdtemp(prefix='crs_ingest_')
+        try:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                futures = [
+                    executor.submit(self._spill_crs_file, path, start_date, end_date, spill_dir, index)
+                    for index, path in enumerate(paths)
+                ]
+                for path, future in zip(paths, futures):
+                    try:
+                        spilled = future.result()
+                    except Exception as e:
+                        logging.error(f"Error parsing CRS file {path}: {str(e)}")
+                        continue
+                    if spilled is None:
+                        continue
+                    arrays = {name: self._map_spilled(path, spilled_array)
+                              for name, spilled_array in spilled['arrays'].items()}
+                    results.append(CRSCurtain(filepath=path, metadata=spilled['metadata'], **arrays))
+        finally:
+            # Mapped arrays stay valid after their files are unlinked on POSIX;
+            # elsewhere the scratch files are left for the temp directory cleanup
+            if os.name == 'posix':
+                shutil.rmtree(spill_dir, ignore_errors=True)
+                
+        return results
+
+    @staticmethod
+    def _map_spilled(filepath: str, spilled) -> np.ndarray:
+        """Read-only view of an array returned by _spill_crs_file: a .npy path or a mappable source field"""
+        if isinstance(spilled, str):
+            return np.load(spilled, mmap_mode='r')
+        field = np.memmap(filepath, dtype=np.dtype(spilled['dtype']), mode='r', offset=spilled['offset'],
+                          shape=tuple(spilled['shape']))
+        return field[spilled['start']:spilled['stop']]
+
+    def _spill_crs_file(self, filepath: str, start_date: Optional[datetime], end_date: Optional[datetime],
+                        spill_dir: str, index: int) -> Optional[Dict[str, Any]]:
+        """
+        Worker side of _read_crs_files_parallel: read one file's time window
+        directly into .npy files under spill_dir
+        
+        Returns:
+            Dictionary with the file metadata and, for each CRSCurtain array,
+            its .npy path or, for a field that can be memory-mapped from the
+            source file, its byte offset, dtype, shape and row window. None if
+            the file has no data in the window
+        """
+        prefix = os.path.join(spill_dir, f"{index:05d}")
+        with h5py.File(filepath, 'r') as f:
+            metadata = self._extract_hdf5_metadata(f)
+            window = find_time_window(f[TIME_PATH], start_date, end_date)
+            n_rows = window.stop - window.start
+            if n_rows == 0:
+                return None
+                
+            arrays = {
+                'times': f"{prefix}_times.npy",
+                'range_km': f"{prefix}_range_km.npy",
+                'reflectivity': f"{prefix}_reflectivity.npy",
+                'doppler_velocity': f"{prefix}_doppler_velocity.npy"
+            }
+            np.save(arrays['times'], epoch_seconds_to_datetime64(f[TIME_PATH][window]))
+            np.save(arrays['range_km'], f[RANGE_PATH][:] / 1000.0)
+            for name, path in (('reflectivity', REFLECTIVITY_PATH), ('doppler_velocity', VELOCITY_PATH)):
+                dataset = f[path]
+                mapped = memmap_dataset(dataset)
+                if mapped is not None:
+                    # Contiguous and uncompressed: nothing to decode, the caller maps the rows itself
+                    arrays[name] = {'offset': int(mapped.offset), 'dtype': mapped.dtype.str,
+                                    'shape': list(mapped.shape), 'start': window.start, 'stop': window.stop}
+                    del mapped
+                    continue
+                out = np.lib.format.open_memmap(arrays[name], mode='w+', dtype=dataset.dtype,
+                                                shape=(n_rows,) + dataset.shape[1:])
+                dataset.read_direct(out, source_sel=np.s_[window.start:window.stop])
+                out.flush()
+                del out
+                
+        return {'metadata': metadata, 'arrays': arrays}
             
     def _print_hdf5_structure(self, filepath: str) -> str:
         """Helper function to print HDF5 file structure for debugging"""
@@ -0,0 +1,236 @@
+import os
+import json
+import shutil
+import sqlite3
+import hashlib
+import tempfile
+from contextlib import closing
+from datetime import datetime
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+
+from data_sources.crs_dataset import open_crs_dataset
+from data_sources.crs_subset import time_index_window
+from data_sources.decimation import DECIMATION_METHODS
+
+PYRAMID_VARIABLES = ('reflectivity', 'doppler_velocity')
+# Coarsest level kept: no point decimating below a screen's worth of columns
+MIN_LEVEL_SIZE = 1024
+# Source rows read per step while building (rounded up to the coarsest factor)
+BUILD_BLOCK_ROWS = 65536
+
+TimeLike = Optional[Union[datetime, np.datetime64]]
+
+def default_cache_dir() -> str:
+    return os.path.join(os.path.expanduser('~'), '.cache', 'crs_pyramids')
+
+def source_hash(path: str, cache_dir: Optional[str] = None) -> str:
+    """
+    SHA-1 of a source file's contents
+
+    Hashes are remembered per (path, size, mtime) in the cache directory so
+    an unchanged file is only read once.
+    """
+    cache_dir = cache_dir or default_cache_dir()
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    with closing(sqlite3.connect(os.path.join(cache_dir, 'sources.sqlite'), timeout=30)) as conn, conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS sources "
+                     "(path TEXT PRIMARY KEY, size INTEGER, mtime REAL, sha1 TEXT)")
+        row = conn.execute("SELECT size, mtime, sha1 FROM sources WHERE path = ?", (path,)).fetchone()
+        if row and row[0] == stat.st_size and row[1] == stat.st_mtime:
+            return row[2]
+
+        sha1 = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 22), b''):
+                sha1.update(block)
+        digest = sha1.hexdigest()
+        conn.execute("INSERT OR REPLACE INTO sources (path, size, mtime, sha1) VALUES (?, ?, ?, ?)",
+                     (path, stat.st_size, stat.st_mtime, digest))
+    return digest
+
+def level_factors(n_time: int) -> List[int]:
+    """Decimation factors 1, 2, 4, ... down to about MIN_LEVEL_SIZE samples"""
+    factors = [1]
+    while n_time // (factors[-1] * 2) >= MIN_LEVEL_SIZE:
+        factors.append(factors[-1] * 2)
+    return factors
+
+def _level_times(times: np.ndarray, factor: int) -> np.ndarray:
+    """Center sample time of every bin of a level (same convention as decimate_curtain)"""
+    starts = np.arange(0, len(times), factor)
+    sizes = np.minimum(factor, len(times) - starts)
+    return times[starts + (sizes - 1) // 2]
+
+def _halve(values: np.ndarray, counts: Optional[np.ndarray], method: str):
+    """Combine pairs of consecutive rows (a trailing odd row is kept on its own)"""
+    if len(values) % 2:
+        pad = np.full((1,) + values.shape[1:], np.nan if counts is None else 0, dtype=values.dtype)
+        values = np.concatenate([values, pad])
+        if counts is not None:
+            counts = np.concatenate([counts, np.zeros_like(counts[:1])])
+    pairs = values.reshape((-1, 2) + values.shape[1:])
+    if method == 'mean':
+        # values hold NaN-free sums, combined exactly with the valid counts
+        return pairs.sum(axis=1), counts.reshape((-1, 2) + counts.shape[1:]).sum(axis=1)
+    reducer = np.fmax if method == 'max' else np.fmin
+    return reducer.reduce(pairs, axis=1), None
+
+class CurtainPyramid:
+    """
+    Precomputed time-decimated levels of one CRS granule
+
+    Level i holds the curtain decimated by factor 2**i along time; level 0
+    is the source file itself. Levels are stored as .npy files and memory
+    mapped, so reading a window only touches the rows that are displayed.
+
+    The pyramid is shared by every copy of a file with the same contents, so
+    level 0 is read from the path it was opened for (source), which defaults
+    to the file it was first built from.
+    """
+
+    def __init__(self, directory: str, source: Optional[str] = None):
+        self.directory = directory
+        with open(os.path.join(directory, 'meta.json')) as f:
+            self.meta = json.load(f)
+        self.source = os.path.abspath(source) if source else self.meta['source']
+        self.factors: List[int] = self.meta['factors']
+        self.range_km = np.load(os.path.join(directory, 'range.npy'))
+        self._times = [np.load(os.path.join(directory, f'time_{i}.npy'), mmap_mode='r')
+                       for i in range(len(self.factors))]
+
+    def level_for(self, t1: TimeLike = None, t2: TimeLike = None, pixel_width: Optional[int] = None) -> int:
+        """
+        Coarsest level that still has at least pixel_width samples in [t1, t2]
+
+        Returns 0 (full resolution) if pixel_width is None or the window is
+        too narrow for any decimated level.
+        """
+        if not pixel_width:
+            return 0
+        window = time_index_window(self._times[0], _as_datetime64(t1), _as_datetime64(t2))
+        n_samples = window.stop - window.start
+        level = 0
+        while level + 1 < len(self.factors) and n_samples // self.factors[level + 1] >= pixel_width:
+            level += 1
+        return level
+
+    def read(self, variable: str, t1: TimeLike = None, t2: TimeLike = None,
+             pixel_width: Optional[int] = None, level: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Read a variable over [t1, t2] at the resolution that fits pixel_width
+
+        Args:
+            variable: 'reflectivity' or 'doppler_velocity'
+            t1: Window start (None for the start of the granule)
+            t2: Window end (None for the end of the granule)
+            pixel_width: Horizontal pixels available; picks the level with level_for()
+            level: Explicit level, overrides pixel_width
+
+        Returns:
+            Tuple of (datetime64 times, values of shape (n_time, n_range))
+        """
+        if variable not in self.meta['variables']:
+            raise ValueError(f"Variable {variable!r} is not in the pyramid; use one of {self.meta['variables']}")
+        if level is None:
+            level = self.level_for(t1, t2, pixel_width)
+        times = self._times[level]
+        window = time_index_window(times, _as_datetime64(t1), _as_datetime64(t2))
+        if level == 0:
+            with open_crs_dataset(self.source, self.meta['campaign']) as ds:
+                values = ds[variable].isel(time=window).values
+        else:
+            data = np.load(os.path.join(self.directory, f'{variable}_{level}.npy'), mmap_mode='r')
+            values = np.array(data[window])
+        return np.array(times[window]), values
+
+def _as_datetime64(value: TimeLike):
+    return None if value is None else np.datetime64(value, 'ns')
+
+def build_pyramid(path: str, campaign: Optional[str] = None, cache_dir: Optional[str] = None,
+                  method: str = 'mean') -> CurtainPyramid:
+    """
+    Build (or load, if already built) the pyramid of a CRS granule
+
+    The source is streamed in blocks, and each block is halved repeatedly to
+    fill every level, so the whole file is read once and never held in
+    memory. Pyramids are stored under <cache_dir>/<source sha1>-<method>, so
+    a changed file gets a new pyramid and a copied file reuses the old one.
+
+    Args:
+        path: CRS file in any campaign format understood by open_crs_dataset
+        campaign: Campaign name; inferred from the filename if omitted
+        cache_dir: Root of the pyramid cache (default ~/.cache/crs_pyramids)
+        method: How samples are combined, 'mean', 'max' or 'min'
+
+    Returns:
+        The granule's CurtainPyramid, reading full resolution from path
+    """
+    if method not in DECIMATION_METHODS:
+        raise ValueError(f"Unknown decimation method {method!r}; use one of {DECIMATION_METHODS}")
+    cache_dir = cache_dir or default_cache_dir()
+    directory = os.path.join(cache_dir, f'{source_hash(path, cache_dir)}-{method}')
+    if os.path.exists(os.path.join(directory, 'meta.json')):
+        return CurtainPyramid(directory, path)
+
+    # Build in a scratch directory and rename it into place, so concurrent
+    # builders and interrupted runs never expose a partial pyramid
+    tmp_dir = tempfile.mkdtemp(prefix='.building-', dir=cache_dir)
+    try:
+        with open_crs_dataset(path, campaign) as ds:
+            times = ds['time'].values
+            factors = level_factors(len(times))
+            np.save(os.path.join(tmp_dir, 'range.npy'), ds['range'].values)
+            for i, factor in enumerate(factors):
+                np.save(os.path.join(tmp_dir, f'time_{i}.npy'), _level_times(times, factor))
+
+            block_rows = -(-BUILD_BLOCK_ROWS // factors[-1]) * factors[-1]
+            for variable in PYRAMID_VARIABLES:
+                n_range = ds.sizes['range']
+                outputs = [
+                    np.lib.format.open_memmap(
+                        os.path.join(tmp_dir, f'{variable}_{i}.npy'), mode='w+', dtype=np.float32,
+                        shape=(-(-len(times) // factor), n_range))
+                    for i, factor in enumerate(factors) if i > 0
+                ]
+                for i0 in range(0, len(times), block_rows):
+                    block = np.asarray(ds[variable][i0:i0 + block_rows].values, dtype=np.float64)
+                    counts = None
+                    if method == 'mean':
+                        valid = ~np.isnan(block)
+                        block, counts = np.where(valid, block, 0.0), valid.astype(np.int32)
+                    for out, factor in zip(outputs, factors[1:]):
+                        block, counts = _halve(block, counts, method)
+                        row = i0 // factor
+                        if method == 'mean':
+                            with np.errstate(invalid='ignore', divide='ignore'):
+                                out[row:row + len(block)] = np.where(counts > 0, block / counts, np.nan)
+                        else:
+                            out[row:row + len(block)] = block
+                for out in outputs:
+                    out.flush()
+                del outputs
+
+            meta = {
+                'source': os.path.abspath(path),
+                'campaign': ds.attrs['campaign'],
+                'method': method,
+                'factors': factors,
+                'variables': list(PYRAMID_VARIABLES),
+                'n_time': len(times),
+                'n_range': ds.sizes['range'],
+            }
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=1)
+        try:
+            os.rename(tmp_dir, directory)
+        except OSError:
+            # Another process finished the same pyramid first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return CurtainPyramid(directory, path)
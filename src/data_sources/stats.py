@@ -0,0 +1,175 @@
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Rows per step when summarizing arrays that are not in memory (h5py, memmap, dask)
+DEFAULT_CHUNK_ROWS = 4096
+
+# Fixed histogram bins used for the CRS fields
+REFLECTIVITY_BINS = np.arange(-40, 62, 2)
+VELOCITY_BINS = np.arange(-20, 21, 1)
+
+class RunningStats:
+    """
+    Single-pass, mergeable statistics of a stream of array chunks
+
+    Chunks are (n_time, ...) blocks of the same field; everything after the
+    first axis (typically the range gates) is tracked separately, which
+    gives per-gate profiles for free. Mean and variance are combined with the
+    parallel form of Welford's algorithm, so chunks can be summarized in any
+    order, in different processes, and merged afterwards without ever holding
+    the whole field in memory. NaNs are counted and otherwise ignored.
+    """
+
+    def __init__(self, bins: Optional[Sequence[float]] = None):
+        """
+        Args:
+            bins: Fixed histogram bin edges; no histogram is kept if None
+        """
+        self.edges = None if bins is None else np.asarray(bins, dtype=np.float64)
+        self.hist = None if bins is None else np.zeros(len(self.edges) - 1, dtype=np.int64)
+        self.below = 0
+        self.above = 0
+        self.nan_count = 0
+        # Per-gate state, allocated from the first chunk
+        self._n = None
+        self._mean = None
+        self._m2 = None
+        self._min = None
+        self._max = None
+
+    def update(self, chunk) -> 'RunningStats':
+        """Add a chunk of values (any array-like whose first axis is time)"""
+        values = np.asarray(chunk, dtype=np.float64)
+        if values.ndim == 0:
+            values = values.reshape(1)
+        if len(values) == 0:
+            return self
+        valid = ~np.isnan(values)
+        n = valid.sum(axis=0)
+        self.nan_count += int(values.size - n.sum())
+        if self.edges is not None:
+            finite = values[valid]
+            self.hist += np.histogram(finite, self.edges)[0]
+            self.below += int(np.count_nonzero(finite < self.edges[0]))
+            self.above += int(np.count_nonzero(finite > self.edges[-1]))
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(valid, values, 0.0).sum(axis=0) / n
+            m2 = np.where(valid, values - mean, 0.0)
+        m2 = (m2 * m2).sum(axis=0)
+        mean = np.where(n > 0, mean, 0.0)
+        self._combine(n, mean, m2, np.fmin.reduce(values, axis=0), np.fmax.reduce(values, axis=0))
+        return self
+
+    def merge(self, other: 'RunningStats') -> 'RunningStats':
+        """Fold in the statistics of another accumulator (other chunks, files or processes)"""
+        if other._n is None:
+            self.nan_count += other.nan_count
+            return self
+        if other.edges is not None:
+            if self.edges is None or not np.array_equal(self.edges, other.edges):
+                raise ValueError("Cannot merge statistics with different histogram bins")
+            self.hist += other.hist
+            self.below += other.below
+            self.above += other.above
+        self.nan_count += other.nan_count
+        self._combine(other._n, other._mean, other._m2, other._min, other._max)
+        return self
+
+    def _combine(self, n, mean, m2, vmin, vmax):
+        if self._n is None:
+            self._n, self._mean, self._m2 = n.astype(np.int64), mean, m2
+            self._min, self._max = vmin, vmax
+            return
+        if np.shape(n) != np.shape(self._n):
+            raise ValueError(f"Chunk gate shape {np.shape(n)} does not match {np.shape(self._n)}")
+        total = self._n + n
+        delta = mean - self._mean
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self._mean = np.where(total > 0, self._mean + delta * n / total, 0.0)
+            self._m2 = self._m2 + m2 + np.where(total > 0, delta * delta * self._n * n / total, 0.0)
+        self._n = total
+        self._min = np.fmin(self._min, vmin)
+        self._max = np.fmax(self._max, vmax)
+
+    @classmethod
+    def from_array(cls, data, bins: Optional[Sequence[float]] = None,
+                   chunk_rows: int = DEFAULT_CHUNK_ROWS) -> 'RunningStats':
+        """Summarize an array, reading chunk_rows rows at a time"""
+        stats = cls(bins)
+        for i0 in range(0, len(data), chunk_rows):
+            stats.update(data[i0:i0 + chunk_rows])
+        return stats
+
+    @property
+    def count(self) -> int:
+        """Number of valid (non-NaN) values"""
+        return 0 if self._n is None else int(self._n.sum())
+
+    def _overall(self) -> Tuple[float, float]:
+        """Mean and M2 over all gates"""
+        n = self.count
+        if n == 0:
+            return float('nan'), float('nan')
+        mean = float((self._n * self._mean).sum() / n)
+        m2 = float(self._m2.sum() + (self._n * (self._mean - mean) ** 2).sum())
+        return mean, m2
+
+    @property
+    def mean(self) -> float:
+        return self._overall()[0]
+
+    @property
+    def variance(self) -> float:
+        """Population variance of the valid values"""
+        n = self.count
+        return self._overall()[1] / n if n else float('nan')
+
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(self.variance))
+
+    @property
+    def min(self) -> float:
+        return float(np.nanmin(self._min)) if self.count else float('nan')
+
+    @property
+    def max(self) -> float:
+        return float(np.nanmax(self._max)) if self.count else float('nan')
+
+    def gate_profile(self) -> Dict[str, np.ndarray]:
+        """Per-gate count, mean, std, min and max (NaN where a gate has no valid values)"""
+        if self._n is None:
+            return {}
+        with np.errstate(invalid='ignore', divide='ignore'):
+            has_data = self._n > 0
+            return {
+                'count': self._n.copy(),
+                'mean': np.where(has_data, self._mean, np.nan),
+                'std': np.where(has_data, np.sqrt(self._m2 / self._n), np.nan),
+                'min': self._min.copy(),
+                'max': self._max.copy()
+            }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-friendly summary (None for statistics of an empty field)"""
+        def _value(x: float) -> Optional[float]:
+            return None if np.isnan(x) else float(x)
+
+        summary = {
+            'min': _value(self.min),
+            'max': _value(self.max),
+            'mean': _value(self.mean),
+            'std': _value(self.std),
+            'valid_count': self.count,
+            'nan_count': self.nan_count
+        }
+        if self.edges is not None:
+            summary['histogram'] = {
+                'edges': self.edges.tolist(),
+                'counts': self.hist.tolist(),
+                'below': self.below,
+                'above': self.above
+            }
+        return summary
@@ -0,0 +1,85 @@
+from datetime import datetime, date
+from typing import Optional, Set, Tuple, Union
+
+import numpy as np
+
+EPOCH64 = np.datetime64('1970-01-01T00:00:00', 'ns')
+
+_NS_PER_SECOND = 1e9
+_NS_PER_HOUR = 3600 * 1e9
+
+def _float_to_timedelta64(values, scale: float) -> np.ndarray:
+    """Scale float offsets to integer nanoseconds without a Python loop; NaN/inf become NaT"""
+    values = np.asarray(values, dtype=np.float64)
+    finite = np.isfinite(values)
+    # Fill values of missing samples would otherwise cast to arbitrary int64 offsets
+    values = np.where(finite, values, 0.0)
+    # Split off the whole part first: epoch seconds * 1e9 exceeds float64 precision
+    whole = np.floor(values)
+    ns = whole.astype(np.int64) * np.int64(scale) + np.round((values - whole) * scale).astype(np.int64)
+    return np.where(finite, ns.astype('timedelta64[ns]'), np.timedelta64('NaT', 'ns'))
+
+def epoch_seconds_to_datetime64(seconds) -> np.ndarray:
+    """
+    Convert seconds since 1970-01-01 (IMPACTS TimeUTC) to datetime64[ns]
+
+    Args:
+        seconds: Array-like of seconds since epoch
+
+    Returns:
+        datetime64[ns] array of the same shape
+    """
+    return EPOCH64 + _float_to_timedelta64(seconds, _NS_PER_SECOND)
+
+def hours_after_to_datetime64(hours, base_date: Union[datetime, date, str]) -> np.ndarray:
+    """
+    Convert hours after a base date (GOES-R PLT, OLYMPEX and IPHEX time
+    fields) to datetime64[ns]
+
+    Args:
+        hours: Array-like of (fractional) hours after base_date
+        base_date: Flight base date as datetime, date or 'yyyymmdd' string
+
+    Returns:
+        datetime64[ns] array of the same shape
+    """
+    if isinstance(base_date, str):
+        base_date = datetime.strptime(base_date, '%Y%m%d')
+    base = np.datetime64(base_date, 'ns')
+    return base + _float_to_timedelta64(hours, _NS_PER_HOUR)
+
+def campaign_time_axis(campaign: str, values, base_date: Optional[Union[datetime, date, str]] = None) -> np.ndarray:
+    """
+    Build the datetime64[ns] time axis for a campaign's native time encoding
+
+    Args:
+        campaign: 'impacts', 'goesrplt', 'olympex' or 'iphex'
+        values: Raw time field values read from the file
+        base_date: Flight base date, required for the hour-based campaigns
+
+    Returns:
+        datetime64[ns] array
+    """
+    if campaign == 'impacts':
+        return epoch_seconds_to_datetime64(values)
+    if campaign in ('goesrplt', 'olympex', 'iphex'):
+        if base_date is None:
+            raise ValueError(f"{campaign} time axis needs the flight base date")
+        return hours_after_to_datetime64(values, base_date)
+    raise ValueError(f"Unknown CRS campaign: {campaign}")
+
+def to_datetime(value: np.datetime64) -> datetime:
+    """Convert a single datetime64 value to a (naive, UTC) datetime"""
+    return np.datetime64(value, 'us').item()
+
+def clock_and_date_strings(times: np.ndarray) -> Tuple[Set[str], Set[str]]:
+    """
+    Distinct 'hh:mm:ss' and 'yyyy-mm-dd' strings present in a time axis
+
+    Used to validate interactive time/date entries without formatting a
+    string per sample.
+    """
+    seconds = np.unique(times.astype('datetime64[s]'))
+    clock = np.char.partition(np.datetime_as_string(seconds, unit='s'), 'T')[:, 2]
+    dates = np.datetime_as_string(np.unique(seconds.astype('datetime64[D]')), unit='D')
+    return set(clock.tolist()), set(dates.tolist())
@@ -0,0 +1,171 @@
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import xarray as xr
+
+from data_sources.crs_catalog import CAMPAIGNS, campaign_for_filename
+from data_sources.crs_dataset import open_crs_dataset
+from data_sources.crs_subset import time_index_window
+
+ZARR_CODECS = ('blosc-zstd', 'blosc-lz4', 'zstd', 'none')
+# Target size of one uncompressed (time, range) chunk
+DEFAULT_CHUNK_BYTES = 4 * 2**20
+
+def _zarr():
+    try:
+        import zarr
+    except ImportError:
+        raise ImportError("Converting CRS data to Zarr requires zarr (pip install zarr)")
+    return zarr
+
+def time_chunk_rows(n_range: int, itemsize: int, chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> int:
+    """
+    Rows per chunk for time-slab reads
+
+    A chunk always spans every range gate, so a time window reads only whole
+    chunks of consecutive rows and never a partial profile.
+    """
+    return max(1, chunk_bytes // max(1, n_range * itemsize))
+
+def field_encoding(codec: str = 'blosc-zstd', level: int = 3) -> Dict[str, Any]:
+    """
+    Zarr encoding entry (compressor settings) for a codec name
+
+    Supports both zarr 2 (numcodecs compressors) and zarr 3 (codec objects).
+    """
+    if codec not in ZARR_CODECS:
+        raise ValueError(f"Unknown codec {codec!r}; use one of {ZARR_CODECS}")
+    zarr = _zarr()
+    if int(zarr.__version__.split('.')[0]) >= 3:
+        from zarr.codecs import BloscCodec, ZstdCodec
+        compressors = {
+            'blosc-zstd': lambda: BloscCodec(cname='zstd', clevel=level, shuffle='bitshuffle'),
+            'blosc-lz4': lambda: BloscCodec(cname='lz4', clevel=level, shuffle='bitshuffle'),
+            'zstd': lambda: ZstdCodec(level=level),
+            'none': lambda: None
+        }
+        compressor = compressors[codec]()
+        return {'compressors': () if compressor is None else (compressor,)}
+    from numcodecs import Blosc, Zstd
+    compressors = {
+        'blosc-zstd': lambda: Blosc(cname='zstd', clevel=level, shuffle=Blosc.BITSHUFFLE),
+        'blosc-lz4': lambda: Blosc(cname='lz4', clevel=level, shuffle=Blosc.BITSHUFFLE),
+        'zstd': lambda: Zstd(level=level),
+        'none': lambda: None
+    }
+    return {'compressor': compressors[codec]()}
+
+def granule_group(path: str, campaign: Optional[str] = None) -> str:
+    """Group of a granule inside an archive: <campaign>/<file name without extension>"""
+    name = os.path.basename(path)
+    campaign = campaign or campaign_for_filename(name)
+    return f"{campaign}/{os.path.splitext(name)[0]}"
+
+def convert_granule(path: str, archive: str, campaign: Optional[str] = None, codec: str = 'blosc-zstd',
+                    level: int = 3, chunk_bytes: int = DEFAULT_CHUNK_BYTES, force: bool = False) -> Dict[str, Any]:
+    """
+    Write one CRS granule into a Zarr archive in the standardized layout
+
+    The group holds time, range, reflectivity and doppler_velocity as
+    produced by open_crs_dataset. Fields are chunked as full-range slabs of
+    about chunk_bytes along time. Group attributes record the campaign,
+    the source file with its size and mtime, the time span and the
+    campaign's original variable names.
+
+    Args:
+        path: CRS file in any campaign format understood by open_crs_dataset
+        archive: Path of the Zarr archive (directory store)
+        campaign: Campaign name; inferred from the filename if omitted
+        codec: One of ZARR_CODECS
+        level: Compression level
+        chunk_bytes: Target uncompressed chunk size
+        force: Rewrite the group even if it is up to date
+
+    Returns:
+        Summary dict: group, skipped, seconds, source_bytes
+    """
+    campaign = campaign or campaign_for_filename(os.path.basename(path))
+    group = granule_group(path, campaign)
+    stat = os.stat(path)
+    if not force and _is_up_to_date(archive, group, stat):
+        return {'group': group, 'skipped': True, 'seconds': 0.0, 'source_bytes': stat.st_size}
+
+    started = time.perf_counter()
+    with open_crs_dataset(path, campaign) as ds:
+        n_range = ds.sizes['range']
+        rows = time_chunk_rows(n_range, ds['reflectivity'].dtype.itemsize, chunk_bytes)
+        out = ds.chunk({'time': rows, 'range': -1})
+        names = CAMPAIGNS[campaign]
+        out.attrs.update({
+            'campaign': campaign,
+            'source_file': os.path.basename(path),
+            'source_size': stat.st_size,
+            'source_mtime': stat.st_mtime,
+            'start': str(ds['time'].values[0]) if ds.sizes['time'] else None,
+            'end': str(ds['time'].values[-1]) if ds.sizes['time'] else None,
+            'n_time': ds.sizes['time'],
+            'n_range': n_range,
+            'source_variables': {'time': names['time'], 'range': names['range'],
+                                 'reflectivity': names['ref'], 'doppler_velocity': names['dop']}
+        })
+        encoding = {name: {**field_encoding(codec, level), 'chunks': (rows, n_range)}
+                    for name in ('reflectivity', 'doppler_velocity')}
+        out.to_zarr(archive, group=group, mode='w', encoding=encoding, consolidated=False)
+    return {'group': group, 'skipped': False, 'seconds': time.perf_counter() - started,
+            'source_bytes': stat.st_size}
+
+def _is_up_to_date(archive: str, group: str, stat: os.stat_result) -> bool:
+    if not os.path.isdir(archive):
+        return False
+    zarr = _zarr()
+    try:
+        attrs = zarr.open_group(archive, path=group, mode='r').attrs
+    except Exception:
+        return False
+    return attrs.get('source_size') == stat.st_size and attrs.get('source_mtime') == stat.st_mtime
+
+def consolidate_archive(archive: str):
+    """Write the consolidated metadata index of the whole archive (one document at the root)"""
+    _zarr().consolidate_metadata(archive)
+
+def archive_index(archive: str, campaign: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Granules in an archive with their time span, read from the consolidated metadata only
+
+    Returns:
+        One dict per granule (group plus its attributes), ordered by start time
+    """
+    zarr = _zarr()
+    root = zarr.open_consolidated(archive, mode='r')
+    granules = []
+    for campaign_name, campaign_group in root.groups():
+        if campaign and campaign_name != campaign:
+            continue
+        for name, group in campaign_group.groups():
+            granules.append({'group': f"{campaign_name}/{name}", **dict(group.attrs)})
+    return sorted(granules, key=lambda granule: granule.get('start') or '')
+
+def open_archive_granule(archive: str, group: str) -> xr.Dataset:
+    """Open one granule of an archive as a lazily loaded standardized Dataset"""
+    return xr.open_zarr(archive, group=group, consolidated=False)
+
+def read_archive_window(archive: str, start: datetime, end: datetime,
+                        campaign: Optional[str] = None, variable: str = 'reflectivity') -> List[xr.DataArray]:
+    """
+    Read a variable over [start, end] from every archived granule that overlaps it
+
+    Overlapping granules are found from the consolidated index, and within
+    each one only the time chunks covering the window are read.
+    """
+    t1, t2 = np.datetime64(start, 'ns'), np.datetime64(end, 'ns')
+    pieces = []
+    for granule in archive_index(archive, campaign):
+        if granule.get('start') is None or np.datetime64(granule['end']) < t1 or np.datetime64(granule['start']) > t2:
+            continue
+        ds = open_archive_granule(archive, granule['group'])
+        window = time_index_window(ds['time'].values, t1, t2)
+        pieces.append(ds[variable].isel(time=window).load())
+    return pieces
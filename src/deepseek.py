@@ -1,39 +1,148 @@
 import os
+import asyncio
 from dotenv import load_dotenv
 import groq
+import httpx
 from pathlib import Path
+from digest import RadarDigest, DEFAULT_TOKEN_BUDGET, truncate_to_budget
+from llm_cache import (cached_chat_completion, cached_chat_completion_async, cached_chat_stream,
+                       cached_chat_stream_async)
+from llm_scheduler import LLMScheduler, INTERACTIVE, BATCH
 
 # Find the root directory and load environment variables from there
 root_dir = Path(__file__).resolve().parent.parent
 dotenv_path = os.path.join(root_dir, '.env')
 load_dotenv(dotenv_path)
 
-# Initialize Groq client
-client = groq.Client(api_key=os.getenv("GROQ_API_KEY"))
+MODEL = "deepseek-r1-distill-llama-70b-specdec"
+TEMPERATURE = 0.7
+
+# Maximum number of requests analyze_many() keeps in flight
+DEFAULT_CONCURRENCY = int(os.getenv("GROQ_CONCURRENCY", "8"))
+
+# Account rate limits the scheduler paces requests against (Groq free tier by default)
+RPM_LIMIT = float(os.getenv("GROQ_RPM", "30"))
+TPM_LIMIT = float(os.getenv("GROQ_TPM", "6000"))
+
+def make_async_client():
+    """
+    AsyncGroq client with a pooled httpx client that keeps connections alive
+    across requests instead of opening one per call. Retries are left to the
+    scheduler (max_retries=0) so that backoff is coordinated across requests
+    """
+    return groq.AsyncGroq(
+        api_key=os.getenv("GROQ_API_KEY"),
+        max_retries=0,
+        http_client=httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max(DEFAULT_CONCURRENCY, 10),
+                                max_keepalive_connections=max(DEFAULT_CONCURRENCY, 10)),
+            timeout=httpx.Timeout(120.0, connect=10.0)
+        )
+    )
+
+# Every API call of this process goes through one scheduler, so the CLI,
+# the web app and batch analyses share the RPM/TPM budgets; interactive
+# calls are served before queued batch calls
+scheduler = LLMScheduler(make_async_client, rpm=RPM_LIMIT, tpm=TPM_LIMIT)
 
 # Simple function to test the setup
-def get_response(prompt):
-    chat_completion = client.chat.completions.create(
+# Identical requests (same model, temperature and messages) are answered from the
+# persistent response cache in llm_cache instead of calling the API again
+def get_response(prompt, priority=INTERACTIVE):
+    return cached_chat_completion(
+        scheduler,
+        messages=[
+            {
+                "role": "user",
+                "content": prompt,
+            }
+        ],
+        model=MODEL,
+        temperature=TEMPERATURE,
+        priority=priority,
+    )
+
+async def get_response_async(prompt, priority=BATCH):
+    return await cached_chat_completion_async(
+        scheduler,
         messages=[
             {
                 "role": "user",
                 "content": prompt,
             }
         ],
-        model="deepseek-r1-distill-llama-70b-specdec",
-        temperature=0.7,
+        model=MODEL,
+        temperature=TEMPERATURE,
+        priority=priority,
     )
-    return chat_completion.choices[0].message.content
 
-def analyze_weather_data(data):
-    weather_prompt = f"""
+# Streaming variants yield the response text as it is generated, so callers can
+# show output long before a reasoning model has finished its completion
+def stream_response(prompt, priority=INTERACTIVE):
+    return cached_chat_stream(
+        scheduler,
+        messages=[{"role": "user", "content": prompt}],
+        model=MODEL,
+        temperature=TEMPERATURE,
+        priority=priority,
+    )
+
+def stream_response_async(prompt, priority=INTERACTIVE):
+    return cached_chat_stream_async(
+        scheduler,
+        messages=[{"role": "user", "content": prompt}],
+        model=MODEL,
+        temperature=TEMPERATURE,
+        priority=priority,
+    )
+
+def weather_prompt(data, budget_tokens=DEFAULT_TOKEN_BUDGET):
+    # Prompt size drives latency and cost, so radar data is passed as a fixed-size
+    # digest (see digest.build_digest) and pasted text is cut to the token budget
+    if isinstance(data, RadarDigest):
+        data = data.text
+    else:
+        data = truncate_to_budget(str(data), budget_tokens)
+    return f"""
     Analyze this weather radar data in 2-3 sentences maximum:
     {data}
     
     Focus on: wind speed trends, precipitation levels (dBZ), and give a one-line weather summary.
     Be very concise and direct.
     """
-    return get_response(weather_prompt)
+
+def analyze_weather_data(data, budget_tokens=DEFAULT_TOKEN_BUDGET):
+    return get_response(weather_prompt(data, budget_tokens))
+
+async def analyze_weather_data_async(data, budget_tokens=DEFAULT_TOKEN_BUDGET, priority=BATCH):
+    return await get_response_async(weather_prompt(data, budget_tokens), priority)
+
+def stream_weather_analysis(data, budget_tokens=DEFAULT_TOKEN_BUDGET):
+    return stream_response(weather_prompt(data, budget_tokens))
+
+def stream_weather_analysis_async(data, budget_tokens=DEFAULT_TOKEN_BUDGET):
+    return stream_response_async(weather_prompt(data, budget_tokens))
+
+async def analyze_many(segments, concurrency=DEFAULT_CONCURRENCY, budget_tokens=DEFAULT_TOKEN_BUDGET,
+                       return_exceptions=False):
+    """
+    Analyze many flight segments (digests or text) concurrently
+    At most `concurrency` requests are in flight at a time; results are returned
+    in the order of the segments. With return_exceptions=True a failed segment
+    yields its exception instead of cancelling the batch
+    Requests run at batch priority under the shared rate-limit scheduler, so
+    they back off on 429s and yield to interactive calls
+
+    Example: results = asyncio.run(analyze_many(digests, concurrency=16))
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def analyze(segment):
+        async with semaphore:
+            return await analyze_weather_data_async(segment, budget_tokens)
+
+    return await asyncio.gather(*(analyze(segment) for segment in segments),
+                                return_exceptions=return_exceptions)
 
 if __name__ == "__main__":
     print("Welcome to the Weather Analysis Interface!")
@@ -57,7 +166,10 @@ if __name__ == "__main__":
             
         weather_data = '\n'.join(lines)
         try:
-            response = analyze_weather_data(weather_data)
-            print("\nWeather Analysis:", response)
+            # Print the analysis as it streams in instead of waiting for all of it
+            print("\nWeather Analysis:", end=" ", flush=True)
+            for chunk in stream_weather_analysis(weather_data):
+                print(chunk, end="", flush=True)
+            print()
         except Exception as e:
             print(f"An error occurred: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,401 @@
+import os
+import math
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from pydantic import BaseModel
+
+from data_sources.crs_catalog import campaign_for_filename
+from data_sources.stats import RunningStats
+from data_sources.time_axis import to_datetime
+
+# Default size of the radar part of an LLM prompt
+DEFAULT_TOKEN_BUDGET = 600
+
+# Reflectivity at or above which a gate counts as echo for echo tops
+ECHO_THRESHOLD_DBZ = -10.0
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+# Fine accumulation grids; the digest is coarsened from these to fit the budget
+_REFLECTIVITY_BINS = np.arange(-60.0, 70.5, 0.5)
+_VELOCITY_BINS = np.arange(-30.0, 30.25, 0.25)
+_BAND_KM = 0.25
+_MAX_RANGE_KM = 40.0
+
+# Detail levels tried from richest to leanest: (time bins, height bands)
+_DETAIL_LEVELS = [(48, 16), (24, 12), (16, 8), (12, 6), (8, 4), (6, 4), (4, 3), (3, 2), (0, 2), (0, 0)]
+
+_ROW_CHUNK = 4096
+
+# Per-profile values are kept in at most this many time bins; the width
+# starts at one second and doubles whenever more bins are occupied
+MAX_TIME_BINS = 256
+_BASE_BIN_NS = 10**9
+# Echo top histograms: fine for the overall percentiles, coarse per time bin
+_ECHO_TOP_BINS = np.arange(0.0, _MAX_RANGE_KM + 0.05, 0.05)
+_TREND_TOP_BINS = np.arange(0.0, _MAX_RANGE_KM + _BAND_KM, _BAND_KM)
+# Columns of a time bin, followed by its echo top histogram
+_COLUMNS = {'profiles': 0, 'ref_sum': 1, 'ref_n': 2, 'ref_max': 3, 'dop_sum': 4, 'dop_n': 5}
+_PROFILES, _REF_SUM, _REF_N, _REF_MAX, _DOP_SUM, _DOP_N = range(6)
+_ECHO_HIST = len(_COLUMNS)
+_N_COLUMNS = _ECHO_HIST + len(_TREND_TOP_BINS) - 1
+
+# Version of the DigestBuilder state; pickled builders of another version are not reused
+STATE_VERSION = 3
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of English/numeric text (about 4 characters per token)"""
+    return math.ceil(len(text) / 4)
+
+def truncate_to_budget(text: str, budget_tokens: int = DEFAULT_TOKEN_BUDGET) -> str:
+    """Cut free text down to the token budget, noting how much was dropped (the note counts too)"""
+    limit = budget_tokens * 4
+    if len(text) <= limit:
+        return text
+    note = f"\n[... {len(text)} more characters omitted]"
+    if len(note) >= limit:
+        return text[:limit]
+    keep = limit - len(note)
+    return text[:keep] + f"\n[... {len(text) - keep} more characters omitted]"
+
+def histogram_percentiles(stats: RunningStats, percentiles=PERCENTILES) -> Dict[str, Optional[float]]:
+    """Percentiles interpolated from the fixed-bin histogram of a RunningStats"""
+    total = stats.hist.sum() + stats.below + stats.above
+    if total == 0:
+        return {f'p{p}': None for p in percentiles}
+    cumulative = stats.below + np.cumsum(stats.hist)
+    result = {}
+    for p in percentiles:
+        target = total * p / 100
+        if target <= stats.below:
+            result[f'p{p}'] = stats.min
+            continue
+        if target > cumulative[-1]:
+            result[f'p{p}'] = stats.max
+            continue
+        i = int(np.searchsorted(cumulative, target))
+        before = cumulative[i - 1] if i else stats.below
+        fraction = (target - before) / max(stats.hist[i], 1)
+        result[f'p{p}'] = float(stats.edges[i] + fraction * (stats.edges[i + 1] - stats.edges[i]))
+    return result
+
+class RadarDigest(BaseModel):
+    """Fixed-size summary of CRS data for LLM prompts"""
+    text: str
+    data: Dict[str, Any]
+    tokens: int
+
+class DigestBuilder:
+    """
+    Accumulates CRS curtains (any number of files, in chunks) into the
+    statistics behind a RadarDigest
+
+    Memory use and build time are fixed, whatever the number of gates or
+    the length of the flight: fields are reduced to histograms and
+    height-band sums, and per-profile values are folded into at most
+    MAX_TIME_BINS fixed-width time bins as they stream in. Whenever more
+    bins are occupied, the bin width doubles and neighbouring bins are
+    combined, so builders of different files merge on the same grid.
+    """
+
+    def __init__(self, echo_threshold: float = ECHO_THRESHOLD_DBZ):
+        self.state_version = STATE_VERSION
+        self.echo_threshold = echo_threshold
+        self.reflectivity = RunningStats(_REFLECTIVITY_BINS)
+        self.doppler_velocity = RunningStats(_VELOCITY_BINS)
+        self.echo_top = RunningStats(_ECHO_TOP_BINS)
+        n_bands = int(_MAX_RANGE_KM / _BAND_KM)
+        self._band_sum = {name: np.zeros(n_bands) for name in ('ref', 'dop')}
+        self._band_n = {name: np.zeros(n_bands, dtype=np.int64) for name in ('ref', 'dop')}
+        # Time bins: key = time in ns // bin width; one row of _COLUMNS per occupied bin
+        self.bin_width_ns = _BASE_BIN_NS
+        self._bin_keys = np.zeros(0, dtype=np.int64)
+        self._bins = np.zeros((0, _N_COLUMNS))
+        self._start_ns: Optional[int] = None
+        self._end_ns: Optional[int] = None
+        self.campaigns = set()
+        self.n_files = 0
+
+    @property
+    def profiles(self) -> int:
+        return int(self._bins[:, _PROFILES].sum())
+
+    def add_curtain(self, curtain, campaign: Optional[str] = None) -> 'DigestBuilder':
+        """Add a CRSCurtain; campaign is inferred from its metadata or filename if omitted"""
+        self.n_files += 1
+        campaign = campaign or curtain.metadata.get('campaign')
+        if not campaign and curtain.filepath:
+            campaign = campaign_for_filename(os.path.basename(curtain.filepath))
+        if campaign:
+            self.campaigns.add(campaign)
+        return self.update(curtain.times, curtain.range_km, curtain.reflectivity, curtain.doppler_velocity)
+
+    def add_dataset(self, ds) -> 'DigestBuilder':
+        """Add a standardized dataset (or subset) from open_crs_dataset, read chunk by chunk"""
+        self.n_files += 1
+        if 'campaign' in ds.attrs:
+            self.campaigns.add(ds.attrs['campaign'])
+        return self.update(ds['time'].values, ds['range'].values, ds['reflectivity'].data,
+                           ds['doppler_velocity'].data)
+
+    def update(self, times: np.ndarray, range_km: np.ndarray, reflectivity,
+               doppler_velocity=None) -> 'DigestBuilder':
+        """
+        Add a (time, range) curtain
+
+        Args:
+            times: datetime64 time axis, shape (n_time,)
+            range_km: Range from radar in km, shape (n_range,)
+            reflectivity: dBZ, shape (n_time, n_range); any row-sliceable array
+            doppler_velocity: m/s, same shape, optional
+        """
+        range_km = np.asarray(range_km, dtype=np.float64)
+        bands = np.clip((range_km / _BAND_KM).astype(np.int64), 0, len(self._band_n['ref']) - 1)
+        for i0 in range(0, len(times), _ROW_CHUNK):
+            ref = np.asarray(reflectivity[i0:i0 + _ROW_CHUNK], dtype=np.float64)
+            dop = None if doppler_velocity is None else np.asarray(doppler_velocity[i0:i0 + _ROW_CHUNK],
+                                                                   dtype=np.float64)
+            self._update_chunk(np.asarray(times[i0:i0 + _ROW_CHUNK]), range_km, bands, ref, dop)
+        return self
+
+    def _update_chunk(self, times, range_km, bands, ref, dop):
+        if len(times) == 0:
+            return
+        t = times.astype('datetime64[ns]').astype(np.int64)
+        self._start_ns = int(t.min()) if self._start_ns is None else min(self._start_ns, int(t.min()))
+        self._end_ns = int(t.max()) if self._end_ns is None else max(self._end_ns, int(t.max()))
+        self.reflectivity.update(ref.ravel())
+        if dop is not None:
+            self.doppler_velocity.update(dop.ravel())
+
+        keys, row_bin = np.unique(t // self.bin_width_ns, return_inverse=True)
+        bins = np.zeros((len(keys), _N_COLUMNS))
+        bins[:, _REF_MAX] = np.nan
+        np.add.at(bins[:, _PROFILES], row_bin, 1)
+        for name, values in (('ref', ref), ('dop', dop)):
+            if values is None:
+                continue
+            valid = ~np.isnan(values)
+            filled = np.where(valid, values, 0.0)
+            np.add.at(bins[:, _COLUMNS[f'{name}_sum']], row_bin, filled.sum(axis=1))
+            np.add.at(bins[:, _COLUMNS[f'{name}_n']], row_bin, valid.sum(axis=1))
+            np.add.at(self._band_sum[name], bands, filled.sum(axis=0))
+            np.add.at(self._band_n[name], bands, valid.sum(axis=0))
+        with np.errstate(invalid='ignore'):
+            row_max = np.fmax.reduce(ref, axis=1)
+            echo = ref >= self.echo_threshold
+        ref_max = bins[:, _REF_MAX]
+        np.fmax.at(ref_max, row_bin, row_max)
+        bins[:, _REF_MAX] = ref_max
+
+        # Downward-looking radar: the echo top is the echo gate nearest the aircraft
+        order = np.argsort(range_km)
+        first = np.argmax(echo[:, order], axis=1)
+        has_echo = echo.any(axis=1)
+        top = np.where(has_echo, range_km[order][first], np.nan)
+        self.echo_top.update(top)
+        top_bin = np.clip(np.searchsorted(_TREND_TOP_BINS, top[has_echo], side='right') - 1,
+                          0, len(_TREND_TOP_BINS) - 2)
+        np.add.at(bins, (row_bin[has_echo], _ECHO_HIST + top_bin), 1)
+        self._fold(keys, bins, self.bin_width_ns)
+
+    def _fold(self, keys: np.ndarray, bins: np.ndarray, width_ns: int):
+        """Combine time bins of width width_ns into this builder's bins, coarsening as needed"""
+        # Widths are the base width times a power of two, so the finer grid nests in the coarser
+        target = max(width_ns, self.bin_width_ns)
+        keys = np.concatenate([self._bin_keys // (target // self.bin_width_ns), keys // (target // width_ns)])
+        width_ns = target
+        bins = np.concatenate([self._bins, bins])
+        while True:
+            unique, index = np.unique(keys, return_inverse=True)
+            if len(unique) <= MAX_TIME_BINS:
+                break
+            width_ns *= 2
+            keys = keys // 2
+        folded = np.zeros((len(unique), _N_COLUMNS))
+        np.add.at(folded, index, np.nan_to_num(bins))
+        ref_max = np.full(len(unique), np.nan)
+        np.fmax.at(ref_max, index, bins[:, _REF_MAX])
+        folded[:, _REF_MAX] = ref_max
+        self._bin_keys, self._bins, self.bin_width_ns = unique, folded, width_ns
+
+    def merge(self, other: 'DigestBuilder') -> 'DigestBuilder':
+        """Fold in another builder, e.g. the cached partial of a single file"""
+        if other.echo_threshold != self.echo_threshold:
+            raise ValueError("Cannot merge digests with different echo thresholds")
+        self.reflectivity.merge(other.reflectivity)
+        self.doppler_velocity.merge(other.doppler_velocity)
+        self.echo_top.merge(other.echo_top)
+        for name in self._band_sum:
+            self._band_sum[name] += other._band_sum[name]
+            self._band_n[name] += other._band_n[name]
+        if other._start_ns is not None:
+            self._start_ns = other._start_ns if self._start_ns is None else min(self._start_ns, other._start_ns)
+            self._end_ns = other._end_ns if self._end_ns is None else max(self._end_ns, other._end_ns)
+            self._fold(other._bin_keys, other._bins, other.bin_width_ns)
+        self.campaigns |= other.campaigns
+        self.n_files += other.n_files
+        return self
+
+    def build(self, budget_tokens: int = DEFAULT_TOKEN_BUDGET) -> RadarDigest:
+        """
+        Render the richest digest that fits the token budget
+
+        Time bins and height bands are coarsened step by step (and dropped
+        last) until the text fits, so the prompt size is bounded by the
+        budget whatever the amount of data. The overall statistics (about
+        120 tokens) are kept if at all possible; a budget too small even
+        for them cuts the text, so the budget is never exceeded.
+        """
+        if self._start_ns is None:
+            text = "CRS radar digest: no data"
+            return RadarDigest(text=text, data={}, tokens=estimate_tokens(text))
+
+        base = self._base_summary()
+        digest = None
+        for n_times, n_bands in _DETAIL_LEVELS:
+            data = dict(base)
+            if n_bands:
+                data['vertical_profile'] = self._profile(n_bands)
+            if n_times:
+                data['trend'] = self._trend(n_times)
+            text = _render(data)
+            digest = RadarDigest(text=text, data=data, tokens=estimate_tokens(text))
+            if digest.tokens <= budget_tokens:
+                return digest
+        text = truncate_to_budget(digest.text, budget_tokens)
+        return RadarDigest(text=text, data=digest.data, tokens=estimate_tokens(text))
+
+    def _base_summary(self) -> Dict[str, Any]:
+        start = to_datetime(np.datetime64(self._start_ns, 'ns'))
+        end = to_datetime(np.datetime64(self._end_ns, 'ns'))
+        tops = histogram_percentiles(self.echo_top, (10, 50, 90))
+        profiles = self.profiles
+        summary = {
+            'campaigns': sorted(self.campaigns),
+            'files': self.n_files,
+            'start': start.isoformat(timespec='seconds'),
+            'end': end.isoformat(timespec='seconds'),
+            'duration_min': round((end - start).total_seconds() / 60, 1),
+            'profiles': profiles,
+            'reflectivity_dbz': _field_summary(self.reflectivity),
+            'doppler_velocity_ms': _field_summary(self.doppler_velocity),
+            'echo_top_km': {
+                'threshold_dbz': self.echo_threshold,
+                'echo_fraction': round(self.echo_top.count / profiles, 3) if profiles else 0.0,
+                **{key: None if value is None else _round(value) for key, value in tops.items()}
+            }
+        }
+        return summary
+
+    def _profile(self, n_bands: int) -> List[Dict[str, Any]]:
+        """Mean reflectivity and Doppler velocity in n_bands equal height bands"""
+        occupied = np.nonzero(self._band_n['ref'] + self._band_n['dop'])[0]
+        if len(occupied) == 0:
+            return []
+        edges = np.linspace(occupied[0], occupied[-1] + 1, min(n_bands, len(occupied)) + 1).astype(np.int64)
+        profile = []
+        for b0, b1 in zip(edges[:-1], edges[1:]):
+            entry = {'range_km': [round(b0 * _BAND_KM, 2), round(b1 * _BAND_KM, 2)]}
+            for name, key in (('ref', 'mean_dbz'), ('dop', 'mean_ms')):
+                n = self._band_n[name][b0:b1].sum()
+                entry[key] = _round(self._band_sum[name][b0:b1].sum() / n) if n else None
+            profile.append(entry)
+        return profile
+
+    def _trend(self, n_bins: int) -> List[Dict[str, Any]]:
+        """Per trend bin mean/max reflectivity, mean Doppler velocity and median echo top"""
+        starts = self._bin_keys * self.bin_width_ns
+        edges = np.linspace(self._start_ns, self._end_ns + 1, n_bins + 1)
+        bounds = np.searchsorted(np.maximum(starts, self._start_ns), edges)
+        label = '%H:%M:%S' if self._end_ns - self._start_ns < 86400 * 10**9 else '%Y-%m-%d %H:%M'
+        centres = (_TREND_TOP_BINS[:-1] + _TREND_TOP_BINS[1:]) / 2
+        trend = []
+        for i0, i1 in zip(bounds[:-1], bounds[1:]):
+            if i1 <= i0:
+                continue
+            group = self._bins[i0:i1]
+            ref_n, dop_n = group[:, _REF_N].sum(), group[:, _DOP_N].sum()
+            maxima = group[:, _REF_MAX]
+            tops = group[:, _ECHO_HIST:].sum(axis=0)
+            median_top = centres[np.searchsorted(np.cumsum(tops), tops.sum() / 2)] if tops.sum() else np.nan
+            trend.append({
+                'start': to_datetime(np.datetime64(max(int(starts[i0]), self._start_ns), 'ns')).strftime(label),
+                'mean_dbz': _round(group[:, _REF_SUM].sum() / ref_n) if ref_n else None,
+                'max_dbz': _round(np.nanmax(maxima)) if not np.isnan(maxima).all() else None,
+                'mean_ms': _round(group[:, _DOP_SUM].sum() / dop_n) if dop_n else None,
+                'echo_top_km': _round(median_top)
+            })
+        return trend
+
+def _round(value, digits: int = 1) -> Optional[float]:
+    value = float(value)
+    # + 0.0 turns -0.0 into 0.0
+    return None if math.isnan(value) else round(value, digits) + 0.0
+
+def _field_summary(stats: RunningStats) -> Dict[str, Any]:
+    total = stats.count + stats.nan_count
+    summary = {
+        'valid_fraction': round(stats.count / total, 3) if total else None,
+        'mean': _round(stats.mean),
+        'std': _round(stats.std),
+        'min': _round(stats.min),
+        'max': _round(stats.max)
+    }
+    summary.update({key: None if value is None else _round(value)
+                    for key, value in histogram_percentiles(stats).items()})
+    return summary
+
+def _fmt(value) -> str:
+    return 'na' if value is None else f'{value:g}'
+
+def _render(data: Dict[str, Any]) -> str:
+    """Compact text form of a digest"""
+    lines = [
+        "CRS radar digest{} {} to {} UTC ({} min, {} profiles, {} files)".format(
+            f" ({', '.join(data['campaigns'])})" if data['campaigns'] else '',
+            data['start'], data['end'], data['duration_min'], data['profiles'], data['files'])
+    ]
+    for key, label in (('reflectivity_dbz', 'Reflectivity dBZ'), ('doppler_velocity_ms', 'Doppler velocity m/s')):
+        field = data[key]
+        if field['valid_fraction'] is None:
+            continue
+        lines.append("{}: valid {:.0%}, mean {} std {} min {} max {}; {}".format(
+            label, field['valid_fraction'], _fmt(field['mean']), _fmt(field['std']), _fmt(field['min']),
+            _fmt(field['max']), ' '.join(f"{p} {_fmt(field[p])}" for p in (f'p{q}' for q in PERCENTILES))))
+    echo = data['echo_top_km']
+    lines.append("Echo top (first gate >= {:g} dBZ, km from radar): echo in {:.0%} of profiles; p10 {} p50 {} p90 {}".format(
+        echo['threshold_dbz'], echo['echo_fraction'], _fmt(echo['p10']), _fmt(echo['p50']), _fmt(echo['p90'])))
+    if data.get('vertical_profile'):
+        lines.append("Vertical profile (km from radar: mean dBZ/mean m/s): " + '; '.join(
+            "{:g}-{:g}: {}/{}".format(*band['range_km'], _fmt(band['mean_dbz']), _fmt(band['mean_ms']))
+            for band in data['vertical_profile']))
+    if data.get('trend'):
+        lines.append("Trend (UTC bin start: mean/max dBZ, mean m/s, echo top km): " + '; '.join(
+            "{} {}/{} {} {}".format(b['start'], _fmt(b['mean_dbz']), _fmt(b['max_dbz']), _fmt(b['mean_ms']),
+                                    _fmt(b['echo_top_km']))
+            for b in data['trend']))
+    return '\n'.join(lines)
+
+def build_digest(curtains=(), datasets=(), budget_tokens: int = DEFAULT_TOKEN_BUDGET,
+                 echo_threshold: float = ECHO_THRESHOLD_DBZ) -> RadarDigest:
+    """
+    Digest any number of CRSCurtains and/or standardized datasets into one
+    summary that fits budget_tokens
+
+    Args:
+        curtains: CRSCurtain objects (e.g. from NASADataConnector)
+        datasets: Datasets or subsets from open_crs_dataset
+        budget_tokens: Maximum size of the digest text in (estimated) tokens
+        echo_threshold: Reflectivity threshold for echo tops in dBZ
+
+    Returns:
+        RadarDigest with the prompt text and the same content as a dict
+    """
+    builder = DigestBuilder(echo_threshold)
+    for curtain in curtains:
+        builder.add_curtain(curtain)
+    for ds in datasets:
+        builder.add_dataset(ds)
+    return builder.build(budget_tokens)
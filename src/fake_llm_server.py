@@ -0,0 +1,165 @@
+"""
+Local stand-in for the Groq chat completions API that enforces its own
+requests/tokens-per-minute limits, for exercising the rate-limit scheduler
+without spending real quota
+
+    python fake_llm_server.py --rpm 20 --tpm 4000 --latency 0.3
+    GROQ_BASE_URL=http://127.0.0.1:8765 GROQ_API_KEY=fake python deepseek.py
+
+Responses carry the same x-ratelimit-* headers as Groq; requests beyond the
+limits get a 429 with retry-after. --fail-rate adds random 503s. Requests
+with stream=true are answered word by word as server-sent chunks, with the
+latency spent before the first one.
+"""
+import json
+import time
+import random
+import argparse
+import threading
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+class FakeLimits:
+    """Sliding one-minute window of request times and token counts"""
+
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.events = deque()
+        self.lock = threading.Lock()
+        self.accepted = 0
+        self.rejected = 0
+
+    def admit(self, tokens: int):
+        """(accepted, headers) for a request of the given size"""
+        now = time.time()
+        with self.lock:
+            while self.events and now - self.events[0][0] >= 60:
+                self.events.popleft()
+            used_tokens = sum(t for _, t in self.events)
+            accepted = len(self.events) < self.rpm and used_tokens + tokens <= self.tpm
+            if accepted:
+                self.events.append((now, tokens))
+                used_tokens += tokens
+                self.accepted += 1
+            else:
+                self.rejected += 1
+            oldest = self.events[0][0] if self.events else now
+            reset = max(0.0, 60 - (now - oldest))
+            headers = {
+                'x-ratelimit-limit-requests': str(self.rpm),
+                'x-ratelimit-limit-tokens': str(self.tpm),
+                'x-ratelimit-remaining-requests': str(max(0, self.rpm - len(self.events))),
+                'x-ratelimit-remaining-tokens': str(max(0, self.tpm - used_tokens)),
+                'x-ratelimit-reset-requests': f'{reset:.2f}s',
+                'x-ratelimit-reset-tokens': f'{reset:.2f}s'
+            }
+            if not accepted:
+                headers['retry-after'] = str(max(1, int(reset) + 1))
+            return accepted, headers
+
+def make_handler(limits: FakeLimits, latency: float, fail_rate: float):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status: int, payload: dict, headers: dict):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _stream(self, request: dict, text: str, prompt_tokens: int, completion_tokens: int,
+                    headers: dict):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Connection', 'close')
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.close_connection = True
+            words = text.split(' ')
+            for i, word in enumerate(words):
+                chunk = {
+                    'id': f'fake-{limits.accepted}', 'object': 'chat.completion.chunk',
+                    'created': int(time.time()), 'model': request.get('model', ''),
+                    'choices': [{'index': 0, 'delta': {'content': word if i == 0 else ' ' + word},
+                                 'finish_reason': None}]
+                }
+                if i == len(words) - 1:
+                    chunk['choices'][0]['finish_reason'] = 'stop'
+                    chunk['x_groq'] = {'usage': {'prompt_tokens': prompt_tokens,
+                                                 'completion_tokens': completion_tokens,
+                                                 'total_tokens': prompt_tokens + completion_tokens}}
+                self.wfile.write(f'data: {json.dumps(chunk)}\n\n'.encode('utf-8'))
+                self.wfile.flush()
+                time.sleep(0.05)
+            self.wfile.write(b'data: [DONE]\n\n')
+            self.wfile.flush()
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            prompt = ' '.join(str(m.get('content', '')) for m in request.get('messages', []))
+            prompt_tokens = max(1, len(prompt) // 4)
+            completion_tokens = 40
+            accepted, headers = limits.admit(prompt_tokens + completion_tokens)
+            if not accepted:
+                self._send(429, {'error': {'message': 'Rate limit reached', 'type': 'tokens',
+                                           'code': 'rate_limit_exceeded'}}, headers)
+                return
+            if random.random() < fail_rate:
+                self._send(503, {'error': {'message': 'Service unavailable'}}, headers)
+                return
+            time.sleep(latency)
+            text = f'Fake analysis of {prompt_tokens} prompt tokens.'
+            if request.get('stream'):
+                self._stream(request, text, prompt_tokens, completion_tokens, headers)
+                return
+            self._send(200, {
+                'id': f'fake-{limits.accepted}',
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': request.get('model', ''),
+                'choices': [{'index': 0, 'finish_reason': 'stop',
+                             'message': {'role': 'assistant', 'content': text}}],
+                'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                          'total_tokens': prompt_tokens + completion_tokens}
+            }, headers)
+
+    return Handler
+
+def serve(port: int = 8765, rpm: int = 30, tpm: int = 6000, latency: float = 0.3,
+          fail_rate: float = 0.0) -> ThreadingHTTPServer:
+    """Start the fake server in a background thread; server.limits holds its counters"""
+    limits = FakeLimits(rpm, tpm)
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(limits, latency, fail_rate))
+    server.limits = limits
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake rate-limited Groq endpoint')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--rpm', type=int, default=30, help='Requests per minute before 429s')
+    parser.add_argument('--tpm', type=int, default=6000, help='Tokens per minute before 429s')
+    parser.add_argument('--latency', type=float, default=0.3, help='Seconds per successful response')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='Fraction of requests answered with 503')
+    args = parser.parse_args()
+
+    server = serve(args.port, args.rpm, args.tpm, args.latency, args.fail_rate)
+    print(f"Fake LLM server on http://127.0.0.1:{args.port} ({args.rpm} RPM, {args.tpm} TPM)")
+    try:
+        while True:
+            time.sleep(10)
+            print(f"accepted={server.limits.accepted} rejected={server.limits.rejected}")
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from pydantic import BaseModel, Field
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+# Finished jobs kept for /jobs/{id} lookups before the oldest are dropped
+DEFAULT_RETENTION = 200
+
+class Job(BaseModel):
+    """State of a background job as returned by /jobs/{id}"""
+    id: str
+    kind: str
+    key: str
+    status: str = QUEUED
+    stage: Optional[str] = None
+    progress: Dict[str, Any] = Field(default_factory=dict)
+    created: datetime = Field(default_factory=datetime.now)
+    started: Optional[datetime] = None
+    finished: Optional[datetime] = None
+    result: Optional[Any] = None
+    error: Optional[str] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+class JobManager:
+    """
+    Runs blocking work (report generation) on a worker pool off the event loop
+
+    Each job has a deduplication key; submitting a key that already has a
+    queued or running job returns that job instead of starting another one,
+    so concurrent requests for the same report week share one computation.
+    Workers are threads: the work is mostly HDF5 reads and LLM calls, and
+    progress updates go straight into the shared job state.
+    """
+
+    def __init__(self, max_workers: int = 2, retention: int = DEFAULT_RETENTION):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="jobs")
+        self.retention = retention
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._in_flight: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, key: str,
+               fn: Callable[[Callable[[str, Dict[str, Any]], None]], Any]) -> Job:
+        """
+        Queue fn(progress) unless a job with the same key is in flight
+
+        Args:
+            kind: Job type, e.g. "report"
+            key: Deduplication key, e.g. "report:2025-W07"
+            fn: Work to run; receives a progress(stage, details) callback, returns the result
+
+        Returns:
+            The new job, or the in-flight job with the same key
+        """
+        with self._lock:
+            job_id = self._in_flight.get(key)
+            if job_id is not None:
+                return self._jobs[job_id]
+            job = Job(id=uuid.uuid4().hex, kind=kind, key=key)
+            self._jobs[job.id] = job
+            self._in_flight[key] = job.id
+            self._prune()
+        self.executor.submit(self._run, job, fn)
+        return job
+
+    def _run(self, job: Job, fn):
+        def progress(stage: str, details: Dict[str, Any]):
+            with self._lock:
+                job.stage = stage
+                job.progress = dict(details)
+
+        with self._lock:
+            job.status = RUNNING
+            job.started = datetime.now()
+        try:
+            result = fn(progress)
+            with self._lock:
+                job.result = result
+                job.status = SUCCEEDED
+        except Exception as e:
+            logging.error(f"Job {job.id} ({job.key}) failed: {str(e)}")
+            with self._lock:
+                job.error = str(e)
+                job.status = FAILED
+        finally:
+            with self._lock:
+                job.finished = datetime.now()
+                self._in_flight.pop(job.key, None)
+
+    def _prune(self):
+        """Drop the oldest finished jobs beyond the retention limit"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[:max(0, len(finished) - self.retention)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Snapshot of a job, or None if unknown"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.model_copy(deep=True) if job else None
+
+    def list(self, limit: int = 50) -> List[Job]:
+        """Most recent jobs first"""
+        with self._lock:
+            jobs = list(self._jobs.values())[-limit:]
+            return [job.model_copy(deep=True) for job in reversed(jobs)]
+
+    def shutdown(self, wait: bool = True):
+        self.executor.shutdown(wait=wait)
+
+def report_week_key(now: Optional[datetime] = None) -> str:
+    """Deduplication key of the weekly report covering the given time (ISO week)"""
+    return (now or datetime.now()).strftime("report:%G-W%V")
@@ -0,0 +1,270 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from llm_scheduler import LLMScheduler, INTERACTIVE, BATCH
+
+# Default location and limits; LLM_CACHE_PATH / LLM_CACHE_MAX_MB / LLM_CACHE_TTL
+# override them and LLM_CACHE=0 disables caching
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'llm_responses', 'responses.sqlite')
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (name, value) VALUES ('total_size', 0);
+"""
+
+def cache_key(model: str, temperature: float, messages: List[Dict[str, Any]]) -> str:
+    """SHA-256 of the request parameters that determine the response"""
+    payload = json.dumps({'model': model, 'temperature': temperature, 'messages': messages},
+                         sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class ResponseCache:
+    """
+    Persistent SQLite cache of LLM responses keyed by request hash
+
+    Lookups are a primary-key read plus an access-time update in WAL mode.
+    The total size of the stored responses is kept in a meta row so that
+    eviction never needs a table scan: when it exceeds max_bytes the least
+    recently used entries are dropped through the access-time index.
+    Entries older than ttl seconds (if set) are treated as misses.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES,
+                 ttl: Optional[float] = None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # One connection shared by the threads of a server, serialized by a lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached response for a key, or None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl is not None and now - row[1] > self.ttl:
+                self._delete(key)
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, model: str, response: str):
+        """Store a response, evicting least recently used entries beyond max_bytes"""
+        now = time.time()
+        size = len(response.encode('utf-8'))
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                old = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, model, response, size, created, accessed) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", (key, model, response, size, now, now))
+                total = self._add_size(size - (old[0] if old else 0))
+                if total > self.max_bytes:
+                    self._evict(total)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _add_size(self, delta: int) -> int:
+        self._conn.execute("UPDATE meta SET value = value + ? WHERE name = 'total_size'", (delta,))
+        return self._conn.execute("SELECT value FROM meta WHERE name = 'total_size'").fetchone()[0]
+
+    def _delete(self, key: str):
+        row = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._add_size(-row[0])
+
+    def _evict(self, total: int):
+        """Drop least recently used entries until the cache is back under 90% of max_bytes"""
+        target = int(self.max_bytes * 0.9)
+        while total > target:
+            rows = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed LIMIT 256").fetchall()
+            if not rows:
+                break
+            freed = 0
+            for key, size in rows:
+                if total - freed <= target:
+                    break
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                freed += size
+                self.evictions += 1
+            total = self._add_size(-freed)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.execute("UPDATE meta SET value = 0 WHERE name = 'total_size'")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters of this process and the size of the cache"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            total = self._conn.execute("SELECT value FROM meta WHERE name = 'total_size'").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+            'evictions': self.evictions,
+            'entries': entries,
+            'total_bytes': total,
+            'max_bytes': self.max_bytes
+        }
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+def get_cache() -> Optional[ResponseCache]:
+    """Shared cache configured from the environment, or None if LLM_CACHE=0"""
+    global _cache
+    if os.getenv('LLM_CACHE', '1') == '0':
+        return None
+    with _cache_lock:
+        if _cache is None:
+            ttl = os.getenv('LLM_CACHE_TTL')
+            _cache = ResponseCache(
+                path=os.getenv('LLM_CACHE_PATH', DEFAULT_CACHE_PATH),
+                max_bytes=int(float(os.getenv('LLM_CACHE_MAX_MB', DEFAULT_MAX_BYTES / 2**20)) * 2**20),
+                ttl=float(ttl) if ttl else None
+            )
+    return _cache
+
+def _cached(cache: Optional[ResponseCache], model: str, temperature: float,
+            messages: List[Dict[str, Any]]):
+    """(key, cached response) for a request; key is None without a cache"""
+    if cache is None:
+        return None, None
+    key = cache_key(model, temperature, messages)
+    return key, cache.get(key)
+
+def cached_chat_completion(client, messages: List[Dict[str, Any]], model: str, temperature: float,
+                           cache: Optional[ResponseCache] = None, priority: int = INTERACTIVE) -> str:
+    """
+    Content of a chat completion, served from the response cache when the
+    same (model, temperature, messages) was requested before
+
+    Args:
+        client: LLMScheduler (rate-limited), groq.Client or any OpenAI-compatible client
+        messages: Chat messages
+        model: Model name
+        temperature: Sampling temperature
+        cache: Cache to use; defaults to get_cache()
+        priority: Scheduler priority (INTERACTIVE or BATCH) when client is an LLMScheduler
+
+    Returns:
+        Response text
+    """
+    cache = cache or get_cache()
+    key, cached = _cached(cache, model, temperature, messages)
+    if cached is not None:
+        return cached
+
+    # Cache hits never spend rate-limit budget; only misses go through the scheduler
+    if isinstance(client, LLMScheduler):
+        content = client.complete(messages, model, temperature, priority=priority)
+    else:
+        chat_completion = client.chat.completions.create(
+            messages=messages,
+            model=model,
+            temperature=temperature,
+        )
+        content = chat_completion.choices[0].message.content
+    if key and content is not None:
+        cache.put(key, model, content)
+    return content
+
+async def cached_chat_completion_async(client, messages: List[Dict[str, Any]], model: str, temperature: float,
+                                       cache: Optional[ResponseCache] = None, priority: int = BATCH) -> str:
+    """Async counterpart of cached_chat_completion for LLMScheduler or groq.AsyncGroq clients"""
+    cache = cache or get_cache()
+    # Cache reads/writes are sub-millisecond SQLite calls, fine to run on the event loop
+    key, cached = _cached(cache, model, temperature, messages)
+    if cached is not None:
+        return cached
+
+    if isinstance(client, LLMScheduler):
+        content = await client.acomplete(messages, model, temperature, priority=priority)
+    else:
+        chat_completion = await client.chat.completions.create(
+            messages=messages,
+            model=model,
+            temperature=temperature,
+        )
+        content = chat_completion.choices[0].message.content
+    if key and content is not None:
+        cache.put(key, model, content)
+    return content
+
+def cached_chat_stream(scheduler: LLMScheduler, messages: List[Dict[str, Any]], model: str, temperature: float,
+                       cache: Optional[ResponseCache] = None, priority: int = INTERACTIVE) -> Iterator[str]:
+    """
+    Text deltas of a streamed chat completion
+
+    A cached response is yielded as a single chunk; a streamed response is
+    cached once it has completed (an interrupted stream is not cached).
+    """
+    cache = cache or get_cache()
+    key, cached = _cached(cache, model, temperature, messages)
+    if cached is not None:
+        yield cached
+        return
+
+    parts = []
+    for delta in scheduler.stream(messages, model, temperature, priority=priority):
+        parts.append(delta)
+        yield delta
+    if key:
+        cache.put(key, model, ''.join(parts))
+
+async def cached_chat_stream_async(scheduler: LLMScheduler, messages: List[Dict[str, Any]], model: str,
+                                   temperature: float, cache: Optional[ResponseCache] = None,
+                                   priority: int = INTERACTIVE) -> AsyncIterator[str]:
+    """Async counterpart of cached_chat_stream"""
+    cache = cache or get_cache()
+    key, cached = _cached(cache, model, temperature, messages)
+    if cached is not None:
+        yield cached
+        return
+
+    parts = []
+    async for delta in scheduler.astream(messages, model, temperature, priority=priority):
+        parts.append(delta)
+        yield delta
+    if key:
+        cache.put(key, model, ''.join(parts))
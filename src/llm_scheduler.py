@@ -0,0 +1,341 @@
+import re
+import random
+import asyncio
+import logging
+import threading
+import time
+import queue
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+import groq
+import httpx
+
+from digest import estimate_tokens
+
+# Priorities: lower runs first
+INTERACTIVE = 0
+BATCH = 1
+
+# Tokens reserved for the completion until the real usage is known
+DEFAULT_COMPLETION_TOKENS = 512
+
+# Number of recent time-to-first-token samples kept for stats()
+TTFT_SAMPLES = 256
+
+_END = object()
+
+# Failures that say nothing about the request itself: the connection or the service
+_TRANSPORT_ERRORS = (groq.APIConnectionError, groq.APITimeoutError, httpx.TransportError)
+
+def is_retryable(error: Exception) -> bool:
+    """Whether a failed request is worth retrying: 429, 5xx or a transport error"""
+    status = getattr(error, 'status_code', None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    return isinstance(error, _TRANSPORT_ERRORS)
+
+_DURATION_RE = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Seconds in a rate-limit header value ('7.66s', '2m59.56s', '120ms' or plain seconds)"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    units = {'h': 3600.0, 'm': 60.0, 's': 1.0, 'ms': 0.001}
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * units[unit] for amount, unit in parts)
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at capacity per period
+
+    The level can be lowered from the provider's rate-limit headers, and the
+    bucket can be paused until a reset time when the provider reports zero
+    remaining.
+    """
+
+    def __init__(self, capacity: float, period: float = 60.0):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / period
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount can be taken (0 if available now)"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        wait = max(0.0, self.paused_until - now)
+        if self.level < amount:
+            wait = max(wait, (amount - self.level) / self.rate)
+        return wait
+
+    def take(self, amount: float):
+        self.level -= min(amount, self.capacity)
+
+    def give_back(self, amount: float):
+        self.level = min(self.capacity, self.level + amount)
+
+    def sync(self, remaining: Optional[float], reset: Optional[float], now: float):
+        """Align with the provider's view of this limit"""
+        if remaining is None:
+            return
+        self._refill(now)
+        self.level = min(self.level, remaining)
+        if remaining <= 0 and reset:
+            self.paused_until = max(self.paused_until, now + reset)
+
+class LLMScheduler:
+    """
+    Paces LLM requests under requests-per-minute and tokens-per-minute budgets
+
+    All requests run on one background event loop with a client created
+    there (client_factory), so synchronous callers (CLI, web handlers) and
+    async batch jobs share the same budgets and connection pool. Before a
+    request is sent it must obtain one request and its estimated tokens from
+    the buckets; interactive requests are served before any waiting batch
+    request. Rate-limit headers of every response keep the buckets in line
+    with the provider, and 429s / transient errors are retried with jittered
+    exponential backoff (never shorter than the provider's retry-after).
+    """
+
+    def __init__(self, client_factory: Callable[[], Any], rpm: float = 30, tpm: float = 6000,
+                 max_retries: int = 6, base_delay: float = 1.0, max_delay: float = 60.0):
+        """
+        Args:
+            client_factory: Creates the async OpenAI-compatible client (e.g. groq.AsyncGroq
+                with max_retries=0); called on the scheduler's event loop
+            rpm: Requests per minute budget
+            tpm: Tokens per minute budget
+            max_retries: Retries of a rate-limited or failed request before giving up
+            base_delay: First backoff delay in seconds
+            max_delay: Longest backoff delay in seconds
+        """
+        self.client_factory = client_factory
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.counters = {'requests': 0, 'retries': 0, 'rate_limited': 0, 'failed': 0}
+        self.ttft = deque(maxlen=TTFT_SAMPLES)
+        self._waiting = {INTERACTIVE: 0, BATCH: 0}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client = None
+        self._cond: Optional[asyncio.Condition] = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='llm-scheduler', daemon=True).start()
+                self._loop = loop
+        return self._loop
+
+    def submit(self, messages: List[Dict[str, Any]], model: str, temperature: float,
+               priority: int = BATCH, completion_tokens: int = DEFAULT_COMPLETION_TOKENS) -> Future:
+        """Schedule a chat completion; returns a concurrent Future of the response text"""
+        return asyncio.run_coroutine_threadsafe(
+            self._complete(messages, model, temperature, priority, completion_tokens), self._ensure_loop())
+
+    def complete(self, messages: List[Dict[str, Any]], model: str, temperature: float,
+                 priority: int = INTERACTIVE, completion_tokens: int = DEFAULT_COMPLETION_TOKENS) -> str:
+        """Blocking chat completion (interactive priority by default)"""
+        return self.submit(messages, model, temperature, priority, completion_tokens).result()
+
+    async def acomplete(self, messages: List[Dict[str, Any]], model: str, temperature: float,
+                        priority: int = BATCH, completion_tokens: int = DEFAULT_COMPLETION_TOKENS) -> str:
+        """Chat completion awaitable from any event loop (batch priority by default)"""
+        return await asyncio.wrap_future(self.submit(messages, model, temperature, priority, completion_tokens))
+
+    async def _complete(self, messages, model, temperature, priority, completion_tokens) -> str:
+        estimate = self._estimate(messages, completion_tokens)
+        raw = await self._send(estimate, priority, messages=messages, model=model, temperature=temperature)
+        completion = await raw.parse()
+        self._settle(estimate, getattr(completion, 'usage', None))
+        return completion.choices[0].message.content
+
+    async def _stream(self, messages, model, temperature, priority, completion_tokens, emit: Callable[[Any], None]):
+        """Send a streaming request and pass each text delta to emit, then _END (or the exception)"""
+        try:
+            started = time.monotonic()
+            estimate = self._estimate(messages, completion_tokens)
+            raw = await self._send(estimate, priority, messages=messages, model=model,
+                                   temperature=temperature, stream=True)
+            first = True
+            usage = None
+            async for chunk in await raw.parse():
+                extra = getattr(chunk, 'x_groq', None)
+                if extra is not None and getattr(extra, 'usage', None) is not None:
+                    usage = extra.usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    if first:
+                        # Measured from submission, so queueing and backoff count too
+                        ttft = time.monotonic() - started
+                        self.ttft.append(ttft)
+                        logging.info(f"LLM time to first token: {ttft:.2f}s")
+                        first = False
+                    emit(delta)
+            self._settle(estimate, usage)
+            emit(_END)
+        except Exception as e:
+            emit(e)
+
+    def _estimate(self, messages, completion_tokens) -> float:
+        if self._client is None:
+            self._client = self.client_factory()
+            self._cond = asyncio.Condition()
+        return sum(estimate_tokens(str(m.get('content', ''))) for m in messages) + completion_tokens
+
+    def _settle(self, estimate: float, usage):
+        """Correct the token bucket by the difference between estimated and reported usage"""
+        if usage is not None and getattr(usage, 'total_tokens', None):
+            difference = estimate - usage.total_tokens
+            if difference > 0:
+                self.tokens.give_back(difference)
+            else:
+                self.tokens.take(-difference)
+
+    async def _send(self, estimate: float, priority: int, **request):
+        """Raw response of a chat completion request, paced and retried"""
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(estimate, priority)
+            self.counters['requests'] += 1
+            try:
+                raw = await self._client.chat.completions.with_raw_response.create(**request)
+            except Exception as e:
+                status = getattr(e, 'status_code', None)
+                if not is_retryable(e) or attempt == self.max_retries:
+                    self.counters['failed'] += 1
+                    raise
+                # The attempt produced no completion: return its estimate before the
+                # retry takes it again (the provider's headers below still cap the level)
+                self.tokens.give_back(estimate)
+                response = getattr(e, 'response', None)
+                retry_after = None
+                if response is not None:
+                    self._sync(response.headers)
+                    retry_after = parse_duration(response.headers.get('retry-after'))
+                if status == 429:
+                    self.counters['rate_limited'] += 1
+                self.counters['retries'] += 1
+                delay = self._backoff(attempt, retry_after)
+                logging.warning(f"LLM request failed ({status or type(e).__name__}), retrying in {delay:.1f}s")
+                if retry_after:
+                    # The whole account is limited, not just this request
+                    self.requests.paused_until = max(self.requests.paused_until, time.monotonic() + retry_after)
+                await asyncio.sleep(delay)
+                continue
+            self._sync(raw.headers)
+            return raw
+
+    def stream(self, messages: List[Dict[str, Any]], model: str, temperature: float,
+               priority: int = INTERACTIVE, completion_tokens: int = DEFAULT_COMPLETION_TOKENS) -> Iterator[str]:
+        """Blocking iterator over the text deltas of a streamed chat completion"""
+        deltas = queue.Queue()
+        future = asyncio.run_coroutine_threadsafe(
+            self._stream(messages, model, temperature, priority, completion_tokens, deltas.put), self._ensure_loop())
+        try:
+            while True:
+                item = deltas.get()
+                if item is _END:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            future.cancel()
+
+    async def astream(self, messages: List[Dict[str, Any]], model: str, temperature: float,
+                      priority: int = INTERACTIVE,
+                      completion_tokens: int = DEFAULT_COMPLETION_TOKENS) -> AsyncIterator[str]:
+        """Text deltas of a streamed chat completion, consumable from any event loop"""
+        loop = asyncio.get_running_loop()
+        deltas = asyncio.Queue()
+
+        def emit(item):
+            loop.call_soon_threadsafe(deltas.put_nowait, item)
+
+        future = asyncio.run_coroutine_threadsafe(
+            self._stream(messages, model, temperature, priority, completion_tokens, emit), self._ensure_loop())
+        try:
+            while True:
+                item = await deltas.get()
+                if item is _END:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # A client that disconnects mid-stream stops the upstream request too
+            future.cancel()
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        """Full-jitter exponential backoff, at least the provider's retry-after"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        return max(delay, retry_after or 0.0)
+
+    def _sync(self, headers):
+        now = time.monotonic()
+
+        def number(name):
+            try:
+                return float(headers.get(name))
+            except (TypeError, ValueError):
+                return None
+
+        self.requests.sync(number('x-ratelimit-remaining-requests'),
+                           parse_duration(headers.get('x-ratelimit-reset-requests')), now)
+        self.tokens.sync(number('x-ratelimit-remaining-tokens'),
+                         parse_duration(headers.get('x-ratelimit-reset-tokens')), now)
+
+    async def _acquire(self, tokens: float, priority: int):
+        """Wait until both buckets allow the request and no higher priority request is waiting"""
+        self._waiting[priority] += 1
+        try:
+            async with self._cond:
+                while True:
+                    now = time.monotonic()
+                    blocked = any(self._waiting[p] for p in self._waiting if p < priority)
+                    if blocked:
+                        wait = None
+                    else:
+                        wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+                        if wait <= 0:
+                            self.requests.take(1)
+                            self.tokens.take(tokens)
+                            return
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), timeout=wait)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            self._waiting[priority] -= 1
+            async with self._cond:
+                self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        ttft = sorted(self.ttft)
+        return {
+            **self.counters,
+            'request_budget_left': round(self.requests.level, 1),
+            'token_budget_left': round(self.tokens.level, 1),
+            'ttft_samples': len(ttft),
+            'ttft_p50': round(ttft[len(ttft) // 2], 3) if ttft else None,
+            'ttft_p95': round(ttft[min(len(ttft) - 1, int(len(ttft) * 0.95))], 3) if ttft else None
+        }
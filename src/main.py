@@ -1,9 +1,20 @@
 import os
+import json
+import time
+import asyncio
 import logging
 from dotenv import load_dotenv
 from report_generator import ReportGenerator
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel
 from datetime import datetime
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional
+from deepseek import scheduler, stream_weather_analysis_async
+from llm_cache import get_cache
+from jobs import JobManager, report_week_key, SUCCEEDED, FAILED
+from report_store import ReportRecord, get_report_store
 import uvicorn
 
 # Load environment variables
@@ -26,6 +37,13 @@ app = FastAPI(
 # Initialize report generator
 report_generator = ReportGenerator()
 
+# Index of saved reports; keeps the latest one in memory
+report_store = get_report_store(os.getenv("REPORTS_DIR", "reports"))
+
+# Report generation runs on background workers so the event loop stays responsive
+jobs = JobManager(max_workers=int(os.getenv("REPORT_WORKERS", "2")))
+JOB_POLL_INTERVAL = 0.25
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -35,55 +53,170 @@ async def root():
         "status": "active"
     }
 
-@app.post("/generate-report")
+def _build_report(progress):
+    """Generate and save a report; runs on a job worker thread"""
+    report = report_generator.generate_report(progress=progress)
+    record = report_store.save(report)
+    return {"report": report, "report_id": record.id, "filepath": report_store.path(record)}
+
+def _submit_report_job():
+    # Requests for the same report week join the job already in flight
+    return jobs.submit("report", report_week_key(), _build_report)
+
+@app.post("/generate-report", status_code=202)
 async def generate_report():
-    """Generate a new intelligence report"""
+    """Start generating a new intelligence report; poll /jobs/{job_id} for the result"""
+    job = _submit_report_job()
+    return {
+        "status": job.status,
+        "message": "Report generation started",
+        "job_id": job.id,
+        "status_url": f"/jobs/{job.id}"
+    }
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status, progress and (once finished) result or error of a background job"""
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    return job
+
+@app.get("/jobs")
+async def list_jobs(limit: int = 50):
+    """Most recent background jobs, without their results"""
+    return [job.model_dump(exclude={"result"}) for job in jobs.list(limit)]
+
+class AnalysisRequest(BaseModel):
+    """Weather data to analyze"""
+    data: str
+
+# Disable proxy buffering so events reach the client as soon as they are sent
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+def sse_event(event: str, data) -> str:
+    """Format one Server-Sent Event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+async def _analysis_events(data: str):
+    started = time.monotonic()
+    ttft = None
     try:
-        # Generate the report
-        report = report_generator.generate_report()
-        
-        # Save the report
-        filepath = report_generator.save_report(report)
-        
-        return {
-            "status": "success",
-            "message": "Report generated successfully",
-            "report": report,
-            "filepath": filepath
-        }
+        async for chunk in stream_weather_analysis_async(data):
+            if ttft is None:
+                ttft = time.monotonic() - started
+            yield sse_event("token", {"text": chunk})
+        yield sse_event("done", {
+            "ttft": round(ttft, 3) if ttft is not None else None,
+            "elapsed": round(time.monotonic() - started, 3)
+        })
     except Exception as e:
-        logger.error(f"Error generating report: {str(e)}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error generating report: {str(e)}"
-        )
+        logger.error(f"Error streaming analysis: {str(e)}")
+        yield sse_event("error", {"detail": str(e)})
+
+@app.post("/analyze/stream")
+async def analyze_stream(request: AnalysisRequest):
+    """Stream a weather analysis as Server-Sent Events (token events, then done or error)"""
+    return StreamingResponse(_analysis_events(request.data), media_type="text/event-stream",
+                             headers=SSE_HEADERS)
+
+@app.get("/analyze/stream")
+async def analyze_stream_get(data: str):
+    """Same as POST /analyze/stream for EventSource clients, which can only send GET"""
+    return StreamingResponse(_analysis_events(data), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@app.get("/generate-report/stream")
+async def generate_report_stream():
+    """Generate a report, streaming progress events followed by a report (or error) event"""
+    job = _submit_report_job()
+
+    async def stream():
+        # Follows the shared job, so a stream opened while the week's report is
+        # already being generated reports on that run instead of starting another
+        last = None
+        while True:
+            state = jobs.get(job.id)
+            if state.stage and (state.stage, state.progress) != last:
+                last = (state.stage, state.progress)
+                yield sse_event("progress", {"job_id": job.id, "stage": state.stage, **state.progress})
+            if state.status == SUCCEEDED:
+                yield sse_event("report", {"job_id": job.id, **state.result})
+                return
+            if state.status == FAILED:
+                yield sse_event("error", {"job_id": job.id, "detail": state.error})
+                return
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@app.get("/metrics")
+async def metrics():
+    """LLM scheduler counters (incl. time-to-first-token percentiles) and response cache stats"""
+    cache = get_cache()
+    return {
+        "llm": scheduler.stats(),
+        "cache": cache.stats() if cache else None
+    }
+
+def _report_response(request: Request, record: ReportRecord, blob: bytes) -> Response:
+    """
+    Report JSON with ETag / Last-Modified validators, or 304 Not Modified when
+    the client's If-None-Match / If-Modified-Since still matches
+    """
+    headers = {
+        "ETag": record.etag,
+        "Last-Modified": formatdate(record.created, usegmt=True),
+        "Cache-Control": "no-cache"
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_none_match is not None:
+        if record.matches(if_none_match):
+            return Response(status_code=304, headers=headers)
+    elif if_modified_since is not None:
+        try:
+            if int(record.created) <= parsedate_to_datetime(if_modified_since).timestamp():
+                return Response(status_code=304, headers=headers)
+        except (TypeError, ValueError):
+            pass
+    # The stored JSON is embedded as is rather than parsed and re-serialized
+    body = b'{"status": "success", "id": %d, "report": %s}' % (record.id, blob)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @app.get("/reports/latest")
-async def get_latest_report():
-    """Get the most recent report"""
+async def get_latest_report(request: Request):
+    """Get the most recent report (supports conditional GET)"""
+    latest = report_store.latest()
+    if latest is None:
+        return {"status": "no_reports", "message": "No reports generated yet"}
+    return _report_response(request, *latest)
+
+@app.get("/reports")
+async def list_reports(start: Optional[str] = None, end: Optional[str] = None, limit: int = 20,
+                       before: Optional[int] = None):
+    """
+    Saved reports newest first, optionally between start and end dates (YYYY-MM-DD)
+    Pass the returned next_before as before to get the next page
+    """
+    limit = max(1, min(limit, 200))
+    records = report_store.list(start=start, end=end, limit=limit, before=before)
+    return {
+        "reports": records,
+        "next_before": records[-1].id if len(records) == limit else None
+    }
+
+@app.get("/reports/{report_id}")
+async def get_report(report_id: int, request: Request):
+    """Get a report by id (supports conditional GET)"""
+    record = report_store.get(report_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"Unknown report {report_id}")
     try:
-        # Get list of reports
-        reports_dir = "reports"
-        if not os.path.exists(reports_dir):
-            return {"status": "no_reports", "message": "No reports generated yet"}
-            
-        reports = [f for f in os.listdir(reports_dir) if f.endswith('.json')]
-        if not reports:
-            return {"status": "no_reports", "message": "No reports generated yet"}
-            
-        # Get the most recent report
-        latest_report = max(reports, key=lambda x: os.path.getctime(os.path.join(reports_dir, x)))
-        
-        # Read and return the report
-        with open(os.path.join(reports_dir, latest_report), 'r') as f:
-            return {"status": "success", "report": f.read()}
-            
-    except Exception as e:
-        logger.error(f"Error retrieving latest report: {str(e)}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error retrieving latest report: {str(e)}"
-        )
+        blob = report_store.load(record)
+    except OSError as e:
+        logger.error(f"Error retrieving report {report_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error retrieving report: {str(e)}")
+    return _report_response(request, record, blob)
 
 def main():
     """Main entry point"""
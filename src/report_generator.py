@@ -1,16 +1,23 @@
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
-import json
-from pathlib import Path
-from data_sources.nasa_connector import NASADataConnector, SatelliteData
+from typing import Any, Callable, Dict, List, Optional
+from data_sources.nasa_connector import NASADataConnector, CRSCurtain
+from digest import build_digest, RadarDigest, DEFAULT_TOKEN_BUDGET
+from report_store import get_report_store
+from report_partials import PartialStore, incremental_digest, analysis_key
 from crewai import Agent, Task, Crew, Process
 import logging
 
 class ReportGenerator:
     """Generates the Geoengineering Weekly Intelligence Report"""
     
-    def __init__(self):
+    def __init__(self, digest_tokens: int = DEFAULT_TOKEN_BUDGET, incremental: bool = True,
+                 partial_store: Optional[PartialStore] = None):
         self.nasa_connector = NASADataConnector()
+        self.digest_tokens = digest_tokens
+        # Incremental mode reuses per-file partials and memoized analyses, so a
+        # refresh only reads the files that arrived since the last run
+        self.incremental = incremental
+        self.partial_store = partial_store or (PartialStore() if incremental else None)
         self.report_template = {
             "title": "Geoengineering Weekly Intelligence Report",
             "date": "",
@@ -64,12 +71,14 @@ class ReportGenerator:
             process=Process.sequential
         )
 
-    def analyze_satellite_data(self, data: List[SatelliteData]) -> Dict[str, Any]:
+    def analyze_satellite_data(self, data: List[CRSCurtain],
+                               progress: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> Dict[str, Any]:
         """
         Analyze the satellite data for patterns and insights
         
         Args:
-            data: List of SatelliteData objects
+            data: List of CRSCurtain objects, one per CRS file
+            progress: Optional callback(stage, details) for progress updates
             
         Returns:
             Dictionary containing analysis results
@@ -81,26 +90,63 @@ class ReportGenerator:
                 "recommendations": []
             }
             
+        # Prepare data for analysis: all curtains are reduced to one digest of
+        # bounded size (percentiles, vertical profile, echo tops, time trend), so
+        # the prompt does not grow with the number of files or gates
+        digest = build_digest(curtains=data, budget_tokens=self.digest_tokens)
+        return self.analyze_digest(digest, len(data), progress)
+
+    def analyze_digest(self, digest: RadarDigest, n_files: int,
+                       progress: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Run the crew's analysis of a radar digest
+        
+        In incremental mode the result is memoized by digest text and report
+        week, so a refresh with no new data in the same week does not run
+        the crew again.
+        
+        Args:
+            digest: Digest of the satellite data
+            n_files: Number of files behind the digest
+            progress: Optional callback(stage, details) for progress updates
+            
+        Returns:
+            Dictionary containing analysis results
+        """
+        if progress:
+            progress("analyzing", {"files": n_files, "digest_tokens": digest.tokens})
+        key = analysis_key(digest.text)
+        if self.partial_store is not None:
+            cached = self.partial_store.get_analysis(key)
+            if cached is not None:
+                logging.info("Reusing the analysis of an identical digest")
+                return cached
+            
         # Create analysis crew
         crew = self.create_analysis_crew()
-        
-        # Prepare data for analysis
         analysis_data = {
-            "raw_data": [d.dict() for d in data],
+            "radar_digest": digest.text,
+            "files": n_files,
             "time_range": {
-                "start": min(d.timestamp for d in data),
-                "end": max(d.timestamp for d in data)
+                "start": digest.data.get("start"),
+                "end": digest.data.get("end")
             }
         }
         
         # Run the crew's analysis
         result = crew.run(analysis_data)
+        if self.partial_store is not None:
+            self.partial_store.put_analysis(key, result)
         return result
 
-    def generate_report(self) -> Dict[str, Any]:
+    def generate_report(self, progress: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> Dict[str, Any]:
         """
         Generate the weekly intelligence report
         
+        Args:
+            progress: Optional callback(stage, details), called as the run moves through
+                collecting_data, analyzing and writing_report
+            
         Returns:
             Dictionary containing the complete report
         """
@@ -110,19 +156,39 @@ class ReportGenerator:
         report["date"] = current_time.strftime("%Y-%m-%d")
         
         # Collect data from sources
-        satellite_data = self.nasa_connector.get_latest_data()
+        if progress:
+            progress("collecting_data", {})
+        if self.incremental:
+            # Same trailing week as get_latest_data, but only new files are read
+            start_date = current_time - timedelta(days=7)
+            builder, ingest = incremental_digest(self.nasa_connector, start_date, current_time,
+                                                 self.partial_store, progress=progress)
+            has_data = ingest["files"] > 0
+            self.partial_store.prune(start_date)
+        else:
+            satellite_data = self.nasa_connector.get_latest_data()
+            has_data = bool(satellite_data)
         
         # Record data sources and their timestamps
         report["data_sources"] = [{
             "name": "NASA Cloud Radar System",
             "last_updated": current_time.isoformat(),
-            "status": "Active" if satellite_data else "No Data Available"
+            "status": "Active" if has_data else "No Data Available"
         }]
+        if self.incremental:
+            report["data_sources"][0]["ingest"] = ingest
         
         # Analyze data and generate insights
-        analysis_results = self.analyze_satellite_data(satellite_data)
+        if not self.incremental:
+            analysis_results = self.analyze_satellite_data(satellite_data, progress)
+        elif has_data:
+            analysis_results = self.analyze_digest(builder.build(self.digest_tokens), ingest["files"], progress)
+        else:
+            analysis_results = self.analyze_satellite_data([], progress)
         
         # Update report sections
+        if progress:
+            progress("writing_report", {})
         report["executive_summary"] = analysis_results.get("executive_summary", "No summary available")
         report["key_data_updates"] = {
             "satellite_observations": analysis_results.get("satellite_analysis", {}),
@@ -139,28 +205,18 @@ class ReportGenerator:
     
     def save_report(self, report: Dict[str, Any], output_dir: str = "reports") -> str:
         """
-        Save the report to a file
+        Save the report to the report store
         
         Args:
             report: Report dictionary
-            output_dir: Directory to save the report
+            output_dir: Directory of the report store
             
         Returns:
             Path to the saved report file
         """
-        # Create output directory if it doesn't exist
-        Path(output_dir).mkdir(parents=True, exist_ok=True)
-        
-        # Generate filename with timestamp
-        filename = f"geoengineering_report_{report['date']}.json"
-        filepath = Path(output_dir) / filename
-        
-        # Save report as JSON
-        with open(filepath, 'w') as f:
-            json.dump(report, f, indent=2)
-            
-        logging.info(f"Report saved to {filepath}")
-        return str(filepath)
+        # Each report gets its own file, so reports from the same day are all kept
+        store = get_report_store(output_dir)
+        return store.path(store.save(report))
     
     def _generate_references(self, analysis_results: Dict[str, Any]) -> List[str]:
         """Generate references from analysis results"""
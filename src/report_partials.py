@@ -0,0 +1,247 @@
+import os
+import json
+import time
+import pickle
+import sqlite3
+import hashlib
+import logging
+from contextlib import closing
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from digest import DigestBuilder, ECHO_THRESHOLD_DBZ, STATE_VERSION
+from data_sources.crs_catalog import CRSGranule, get_catalog
+from data_sources.pyramid import source_hash
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS partials (
+    path TEXT NOT NULL,
+    echo_threshold REAL NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    sha1 TEXT NOT NULL,
+    end_time TEXT,
+    blob TEXT NOT NULL,
+    PRIMARY KEY (path, echo_threshold)
+);
+CREATE INDEX IF NOT EXISTS partials_sha1 ON partials (sha1, echo_threshold);
+CREATE TABLE IF NOT EXISTS analyses (
+    key TEXT PRIMARY KEY,
+    result TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS watermark (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Memoized analyses older than this are dropped by prune()
+ANALYSIS_TTL = timedelta(days=14)
+
+def default_cache_dir() -> str:
+    return os.path.join(os.path.expanduser('~'), '.cache', 'report_partials')
+
+class PartialStore:
+    """
+    Per-granule digest partials, memoized analyses and the ingest watermark
+
+    A partial is the DigestBuilder state of one whole CRS file. It is stored
+    as a pickle named after the file's SHA-1 and indexed by path. A lookup
+    hits when the path, size and mtime are unchanged. It also hits when the
+    file was touched or moved but its content hash still matches.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.cache_dir = cache_dir or default_cache_dir()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.db_path = os.path.join(self.cache_dir, 'index.sqlite')
+        with closing(self._connect()) as conn, conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def get(self, granule: CRSGranule, echo_threshold: float = ECHO_THRESHOLD_DBZ) -> Optional[DigestBuilder]:
+        """Cached partial of a granule, or None if the file is new or its content changed"""
+        path = os.path.abspath(granule.path)
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute("SELECT size, mtime, blob FROM partials WHERE path = ? AND echo_threshold = ?",
+                               (path, echo_threshold)).fetchone()
+            if row is None or row[0] != granule.size or row[1] != granule.mtime:
+                # Touched, copied or renamed files keep their partial if the content is the same.
+                # Same content means same size, so a file of a new size is not hashed at all
+                candidates = conn.execute("SELECT sha1, blob FROM partials WHERE size = ? AND echo_threshold = ?",
+                                          (granule.size, echo_threshold)).fetchall()
+                if not candidates:
+                    return None
+                sha1 = source_hash(path, self.cache_dir)
+                match = next((blob for digest, blob in candidates if digest == sha1), None)
+                if match is None:
+                    return None
+                conn.execute(
+                    "INSERT OR REPLACE INTO partials (path, echo_threshold, size, mtime, sha1, end_time, blob) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (path, echo_threshold, granule.size, granule.mtime, sha1,
+                     granule.end_time.isoformat() if granule.end_time else None, match))
+                row = (granule.size, granule.mtime, match)
+        try:
+            with open(os.path.join(self.cache_dir, row[2]), 'rb') as f:
+                partial = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            logging.warning(f"Discarding unreadable partial of {path}: {str(e)}")
+            return None
+        # Partials written by an older DigestBuilder are rebuilt
+        return partial if getattr(partial, 'state_version', 1) == STATE_VERSION else None
+
+    def put(self, granule: CRSGranule, partial: DigestBuilder):
+        """Store the partial of a whole granule"""
+        path = os.path.abspath(granule.path)
+        sha1 = source_hash(path, self.cache_dir)
+        blob = f"{sha1}-{partial.echo_threshold:g}.pkl"
+        tmp_path = os.path.join(self.cache_dir, blob + '.part')
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(partial, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, os.path.join(self.cache_dir, blob))
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO partials (path, echo_threshold, size, mtime, sha1, end_time, blob) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (path, partial.echo_threshold, granule.size, granule.mtime, sha1,
+                 granule.end_time.isoformat() if granule.end_time else None, blob))
+
+    def prune(self, before: datetime, analysis_ttl: timedelta = ANALYSIS_TTL) -> int:
+        """
+        Drop partials of granules that ended before a time (out of every future
+        window) and memoized analyses older than analysis_ttl
+
+        Returns:
+            Number of partials dropped
+        """
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM analyses WHERE created < ?",
+                         ((datetime.now() - analysis_ttl).timestamp(),))
+            rows = conn.execute("SELECT path, echo_threshold, blob FROM partials WHERE end_time < ?",
+                                (before.isoformat(),)).fetchall()
+            for path, echo_threshold, _ in rows:
+                conn.execute("DELETE FROM partials WHERE path = ? AND echo_threshold = ?", (path, echo_threshold))
+            in_use = {row[0] for row in conn.execute("SELECT blob FROM partials")}
+        for blob in {row[2] for row in rows} - in_use:
+            try:
+                os.remove(os.path.join(self.cache_dir, blob))
+            except OSError:
+                pass
+        return len(rows)
+
+    def get_analysis(self, key: str) -> Optional[Any]:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT result FROM analyses WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_analysis(self, key: str, result: Any):
+        try:
+            payload = json.dumps(result)
+        except (TypeError, ValueError):
+            # Results that are not plain JSON are simply not memoized
+            return
+        with closing(self._connect()) as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO analyses (key, result, created) VALUES (?, ?, ?)",
+                         (key, payload, time.time()))
+
+    def watermark(self) -> Dict[str, str]:
+        """What has been ingested so far: latest granule end time and file mtime"""
+        with closing(self._connect()) as conn:
+            return dict(conn.execute("SELECT name, value FROM watermark").fetchall())
+
+    def advance_watermark(self, end_time: Optional[datetime], mtime: Optional[float]):
+        current = self.watermark()
+        values = {}
+        if end_time is not None and end_time.isoformat() > current.get('ingested_until', ''):
+            values['ingested_until'] = end_time.isoformat()
+        if mtime is not None and mtime > float(current.get('ingested_mtime', 0)):
+            values['ingested_mtime'] = repr(mtime)
+        if values:
+            with closing(self._connect()) as conn, conn:
+                conn.executemany("INSERT OR REPLACE INTO watermark (name, value) VALUES (?, ?)", values.items())
+
+def analysis_key(digest_text: str, now: Optional[datetime] = None) -> str:
+    """
+    Memoization key of an analysis of a digest
+
+    The report week (ISO week of now) is part of the key: the crew also
+    researches new developments, which change even when the radar data
+    does not, so an analysis is only reused within the same week.
+    """
+    week = (now or datetime.now()).strftime('%G-W%V')
+    return hashlib.sha256(f"{week}\n{digest_text}".encode('utf-8')).hexdigest()
+
+def incremental_digest(connector, start: datetime, end: datetime, store: PartialStore,
+                       echo_threshold: float = ECHO_THRESHOLD_DBZ,
+                       progress: Optional[Callable[[str, Dict[str, Any]], None]] = None
+                       ) -> Tuple[DigestBuilder, Dict[str, Any]]:
+    """
+    Digest statistics of the IMPACTS granules in a window, reading only new files
+
+    Granules lying wholly inside the window reuse their cached partial.
+    Only new or changed granules are read and reduced, and their partials
+    are then stored for later runs. Granules past the watermark (ending
+    after, or modified after, anything ingested so far) have arrived since
+    the last run and are read without a cache lookup. A granule that
+    straddles the start of the window contributes only the rows inside the
+    window, so it is always read fresh and never cached.
+
+    Args:
+        connector: NASADataConnector whose data_dir holds the granules
+        start: Window start
+        end: Window end
+        store: Partial store
+        echo_threshold: Reflectivity threshold for echo tops in dBZ
+        progress: Optional callback(stage, details)
+
+    Returns:
+        Merged DigestBuilder and an ingest summary (files, new, reused, edge, watermark)
+    """
+    granules = get_catalog(connector.data_dir).query('impacts', start, end)
+    previous = store.watermark()
+    ingested_until = previous.get('ingested_until', '')
+    ingested_mtime = float(previous.get('ingested_mtime', '-inf'))
+    builder = DigestBuilder(echo_threshold)
+    counts = {'files': 0, 'new': 0, 'reused': 0, 'edge': 0}
+    newest_end, newest_mtime = None, None
+
+    for granule in granules:
+        inside = (granule.start_time is not None and granule.end_time is not None
+                  and granule.start_time >= start and granule.end_time <= end)
+        if not inside:
+            curtain = connector.read_crs_file(granule.path, start, end)
+            if curtain is not None:
+                builder.add_curtain(curtain, 'impacts')
+                counts['edge'] += 1
+                counts['files'] += 1
+            continue
+
+        arrived = granule.end_time.isoformat() > ingested_until or granule.mtime > ingested_mtime
+        partial = None if arrived else store.get(granule, echo_threshold)
+        if partial is None:
+            if progress:
+                progress("reading_new_data", {"file": os.path.basename(granule.path)})
+            curtain = connector.read_crs_file(granule.path)
+            if curtain is None:
+                continue
+            partial = DigestBuilder(echo_threshold).add_curtain(curtain, 'impacts')
+            store.put(granule, partial)
+            counts['new'] += 1
+        else:
+            counts['reused'] += 1
+        builder.merge(partial)
+        counts['files'] += 1
+        if newest_end is None or granule.end_time > newest_end:
+            newest_end = granule.end_time
+        newest_mtime = max(newest_mtime or 0.0, granule.mtime)
+
+    store.advance_watermark(newest_end, newest_mtime)
+    summary = {**counts, 'previous_watermark': previous.get('ingested_until'),
+               'watermark': store.watermark().get('ingested_until')}
+    logging.info(f"Incremental ingest: {counts['new']} new, {counts['reused']} cached, "
+                 f"{counts['edge']} window-edge files")
+    return builder, summary
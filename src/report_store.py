@@ -0,0 +1,221 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from pydantic import BaseModel
+
+DEFAULT_REPORTS_DIR = "reports"
+INDEX_NAME = "index.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    report_date TEXT NOT NULL,
+    created REAL NOT NULL,
+    filename TEXT NOT NULL UNIQUE,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reports_date ON reports (report_date, id);
+"""
+
+class ReportRecord(BaseModel):
+    """Index entry of a stored report"""
+    id: int
+    report_date: str
+    created: float
+    filename: str
+    size: int
+    sha256: str
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.sha256}"'
+
+    def matches(self, if_none_match: str) -> bool:
+        """Whether an If-None-Match header value (a list of tags or *) matches this report"""
+        if if_none_match.strip() == "*":
+            return True
+        # Weak comparison (RFC 9110): W/"x" matches "x"
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return self.etag in [tag[2:] if tag.startswith("W/") else tag for tag in tags]
+
+class ReportStore:
+    """
+    Reports as JSON blobs in a directory, indexed by SQLite
+
+    Every save gets its own blob and index row, so several reports on the
+    same day no longer overwrite each other. Listing by date range is an
+    index scan with keyset pagination. The latest report's record and bytes
+    are kept in memory, so fetching it does not touch the disk. The pointer
+    is refreshed only when SQLite's data_version shows that another
+    connection or process has written to the index.
+    """
+
+    def __init__(self, directory: str = DEFAULT_REPORTS_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(directory, INDEX_NAME), timeout=30,
+                                     check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._latest: Optional[Tuple[ReportRecord, bytes]] = None
+        self._data_version = None
+        self._import_existing()
+
+    def _import_existing(self):
+        """Index report files written before the store existed"""
+        with self._lock:
+            known = {row[0] for row in self._conn.execute("SELECT filename FROM reports")}
+        new = [name for name in os.listdir(self.directory)
+               if name.endswith(".json") and name not in known]
+        for name in sorted(new, key=lambda n: os.path.getmtime(os.path.join(self.directory, n))):
+            path = os.path.join(self.directory, name)
+            with open(path, "rb") as f:
+                blob = f.read()
+            try:
+                report_date = json.loads(blob).get("date") or ""
+            except ValueError:
+                logging.warning(f"Skipping unreadable report {path}")
+                continue
+            # Another store (worker process) may be importing the same file right now
+            if self._insert(report_date, os.path.getmtime(path), name, blob, if_new=True) is not None:
+                logging.info(f"Indexed existing report {path}")
+
+    def _insert(self, report_date: str, created: float, filename: str, blob: bytes,
+                if_new: bool = False) -> Optional[ReportRecord]:
+        """Index a blob; with if_new, a filename that is already indexed is left alone and None returned"""
+        digest = hashlib.sha256(blob).hexdigest()
+        with self._lock:
+            cursor = self._conn.execute(
+                f"INSERT {'OR IGNORE ' if if_new else ''}INTO reports "
+                "(report_date, created, filename, size, sha256) VALUES (?, ?, ?, ?, ?)",
+                (report_date, created, filename, len(blob), digest))
+            if cursor.rowcount == 0:
+                return None
+            record = ReportRecord(id=cursor.lastrowid, report_date=report_date, created=created,
+                                  filename=filename, size=len(blob), sha256=digest)
+            if self._latest is None or record.id > self._latest[0].id:
+                self._latest = (record, blob)
+            self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        return record
+
+    def save(self, report: Dict[str, Any]) -> ReportRecord:
+        """
+        Store a report under a new id
+
+        Args:
+            report: Report dictionary (its "date" is indexed)
+
+        Returns:
+            Index record of the stored report
+        """
+        blob = json.dumps(report, indent=2, default=str).encode("utf-8")
+        now = time.time()
+        report_date = report.get("date") or datetime.fromtimestamp(now).strftime("%Y-%m-%d")
+        filename = f"geoengineering_report_{report_date}_{datetime.fromtimestamp(now):%H%M%S%f}.json"
+        path = os.path.join(self.directory, filename)
+        # Write then rename, so readers never see a partial blob
+        with open(path + ".part", "wb") as f:
+            f.write(blob)
+        os.replace(path + ".part", path)
+        record = self._insert(report_date, now, filename, blob)
+        logging.info(f"Report {record.id} saved to {path}")
+        return record
+
+    def path(self, record: ReportRecord) -> str:
+        return os.path.join(self.directory, record.filename)
+
+    def load(self, record: ReportRecord) -> bytes:
+        """JSON bytes of a stored report"""
+        with self._lock:
+            if self._latest is not None and self._latest[0].id == record.id:
+                return self._latest[1]
+        with open(self.path(record), "rb") as f:
+            return f.read()
+
+    def get(self, report_id: int) -> Optional[ReportRecord]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, report_date, created, filename, size, sha256 FROM reports WHERE id = ?",
+                (report_id,)).fetchone()
+        return self._record(row)
+
+    def latest(self) -> Optional[Tuple[ReportRecord, bytes]]:
+        """(record, JSON bytes) of the most recent report, or None if there are none"""
+        with self._lock:
+            version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if self._latest is not None and version == self._data_version:
+                return self._latest
+            self._data_version = version
+            while True:
+                row = self._conn.execute(
+                    "SELECT id, report_date, created, filename, size, sha256 FROM reports "
+                    "ORDER BY id DESC LIMIT 1").fetchone()
+                record = self._record(row)
+                if record is None:
+                    self._latest = None
+                    return None
+                try:
+                    with open(self.path(record), "rb") as f:
+                        self._latest = (record, f.read())
+                    return self._latest
+                except FileNotFoundError:
+                    # The blob was deleted by hand: drop its row and fall back to the previous report
+                    logging.warning(f"Report {record.id} is missing {self.path(record)}, removing it from the index")
+                    self._conn.execute("DELETE FROM reports WHERE id = ?", (record.id,))
+
+    def list(self, start: Optional[str] = None, end: Optional[str] = None, limit: int = 20,
+             before: Optional[int] = None) -> List[ReportRecord]:
+        """
+        Reports newest first, optionally limited to a date range
+
+        Args:
+            start: First report date (YYYY-MM-DD), inclusive
+            end: Last report date (YYYY-MM-DD), inclusive
+            limit: Page size
+            before: Only reports with an id below this (the last id of the previous page)
+
+        Returns:
+            List of index records
+        """
+        conditions, params = [], []
+        if start:
+            conditions.append("report_date >= ?")
+            params.append(start)
+        if end:
+            conditions.append("report_date <= ?")
+            params.append(end)
+        if before is not None:
+            conditions.append("id < ?")
+            params.append(before)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, report_date, created, filename, size, sha256 FROM reports {where} "
+                "ORDER BY id DESC LIMIT ?", (*params, limit)).fetchall()
+        return [self._record(row) for row in rows]
+
+    @staticmethod
+    def _record(row) -> Optional[ReportRecord]:
+        if row is None:
+            return None
+        return ReportRecord(id=row[0], report_date=row[1], created=row[2], filename=row[3],
+                            size=row[4], sha256=row[5])
+
+_stores: Dict[str, ReportStore] = {}
+_stores_lock = threading.Lock()
+
+def get_report_store(directory: str = DEFAULT_REPORTS_DIR) -> ReportStore:
+    """Shared store of a reports directory, so the directory is scanned once per process"""
+    key = os.path.abspath(directory)
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = ReportStore(directory)
+        return _stores[key]
@@ -0,0 +1,75 @@
+import os
+import sys
+from datetime import datetime
+
+import h5py
+import numpy as np
+import pytest
+import xarray as xr
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from data_sources.impacts_reader import TIME_PATH, RANGE_PATH, REFLECTIVITY_PATH, VELOCITY_PATH
+
+EPOCH = datetime(1970, 1, 1)
+
+@pytest.fixture(autouse=True)
+def isolated_home(tmp_path, monkeypatch):
+    """Keep every ~/.cache store (catalog, partials, array cache, LLM cache) inside the test's tmp dir"""
+    home = tmp_path / 'home'
+    home.mkdir()
+    monkeypatch.setenv('HOME', str(home))
+    monkeypatch.delenv('CRS_ARRAY_CACHE', raising=False)
+    monkeypatch.setenv('LLM_CACHE', '0')
+    return home
+
+def synthetic_fields(n_time: int, n_range: int, seed: int = 0):
+    """Reflectivity with NaN gaps and a clear echo layer, plus Doppler velocity"""
+    rng = np.random.default_rng(seed)
+    reflectivity = rng.normal(0.0, 10.0, (n_time, n_range)).astype(np.float32)
+    reflectivity[:, n_range // 2:n_range // 2 + 3] += 30.0
+    reflectivity[rng.random((n_time, n_range)) < 0.1] = np.nan
+    velocity = rng.normal(0.0, 2.0, (n_time, n_range)).astype(np.float32)
+    return reflectivity, velocity
+
+@pytest.fixture
+def make_impacts():
+    """
+    Factory for small IMPACTS CRS HDF5 files
+
+    make_impacts(path, start, n_time, ...) writes TimeUTC at rate_hz from
+    start plus Range, dBZe and Velocity_corrected, chunked+gzip or contiguous.
+    """
+    def make(path, start: datetime, n_time: int = 600, n_range: int = 40, rate_hz: float = 2.0,
+             contiguous: bool = False, range_offset_m: float = 0.0, seed: int = 0) -> str:
+        seconds = (start - EPOCH).total_seconds() + np.arange(n_time) / rate_hz
+        reflectivity, velocity = synthetic_fields(n_time, n_range, seed)
+        options = {} if contiguous else {'chunks': (min(64, n_time), n_range), 'compression': 'gzip'}
+        with h5py.File(path, 'w') as f:
+            f.create_dataset(TIME_PATH, data=seconds)
+            f.create_dataset(RANGE_PATH, data=np.arange(n_range) * 30.0 + range_offset_m)
+            f.create_dataset(REFLECTIVITY_PATH, data=reflectivity, **options)
+            f.create_dataset(VELOCITY_PATH, data=velocity, **options)
+        return str(path)
+    return make
+
+@pytest.fixture
+def make_goesrplt():
+    """Factory for small GOES-R PLT CRS netCDF files (time in hours after the flight date)"""
+    def make(path, start_hours: float = 18.0, n_time: int = 300, n_range: int = 40, seed: int = 0) -> str:
+        reflectivity, velocity = synthetic_fields(n_time, n_range, seed)
+        ds = xr.Dataset(
+            {
+                'ref': (('range', 'time'), reflectivity.T),
+                'dop': (('range', 'time'), velocity.T)
+            },
+            coords={
+                'time': ('time', start_hours + np.arange(n_time) / 3600.0),
+                'range': ('range', np.arange(n_range) * 30.0)
+            }
+        )
+        ds.to_netcdf(path)
+        return str(path)
+    return make
@@ -0,0 +1,86 @@
+import os
+import multiprocessing
+from datetime import datetime
+
+import numpy as np
+import pytest
+import xarray as xr
+
+from data_sources import array_cache
+from data_sources.array_cache import ArrayCache, get_array_cache, open_cached_crs_dataset
+from data_sources.crs_dataset import open_crs_dataset
+
+START = datetime(2020, 1, 25, 6, 0)
+
+@pytest.fixture
+def granule(tmp_path, make_impacts):
+    return make_impacts(tmp_path / f'IMPACTS_CRS_L1B_RevA_{START:%Y%m%dT%H%M%S}.h5', START, n_time=300)
+
+def test_cache_is_opt_in(tmp_path, monkeypatch):
+    assert get_array_cache() is None
+    monkeypatch.setattr(array_cache, '_caches', {})
+    monkeypatch.setenv('CRS_ARRAY_CACHE', '1')
+    monkeypatch.setenv('CRS_ARRAY_CACHE_DIR', str(tmp_path / 'arrays'))
+    monkeypatch.setenv('CRS_ARRAY_CACHE_MAX_GB', '0.5')
+    cache = get_array_cache()
+    assert cache.cache_dir == str(tmp_path / 'arrays')
+    assert cache.max_bytes == 2**29
+    assert get_array_cache() is cache
+
+def test_open_maps_decoded_arrays(tmp_path, granule):
+    cache = ArrayCache(str(tmp_path / 'arrays'))
+    assert cache.get(granule) is None
+    arrays = cache.open(granule)
+    assert isinstance(arrays['reflectivity'], np.memmap)
+    assert arrays['meta']['n_time'] == 300
+    with open_crs_dataset(granule) as ds:
+        np.testing.assert_array_equal(arrays['reflectivity'], ds['reflectivity'].values)
+        np.testing.assert_array_equal(arrays['times'], ds['time'].values)
+
+def test_cached_dataset_equals_source(tmp_path, granule):
+    cache = ArrayCache(str(tmp_path / 'arrays'))
+    with open_cached_crs_dataset(granule, cache=cache) as cached, open_crs_dataset(granule) as ds:
+        xr.testing.assert_identical(cached, ds)
+
+def test_changed_source_is_rebuilt(tmp_path, granule, make_impacts):
+    cache = ArrayCache(str(tmp_path / 'arrays'))
+    cache.open(granule)
+    make_impacts(granule, START, n_time=300, seed=5)
+    os.utime(granule, (1e9, 1e9))
+    assert cache.get(granule) is None
+    with open_crs_dataset(granule) as ds:
+        np.testing.assert_array_equal(cache.open(granule)['reflectivity'], ds['reflectivity'].values)
+
+def test_refill_swaps_the_entry(tmp_path, granule):
+    cache = ArrayCache(str(tmp_path / 'arrays'))
+    cache.fill(granule)
+    cache.fill(granule)
+    assert cache.get(granule) is not None
+    assert sorted(os.listdir(cache.cache_dir)) == sorted(['index.sqlite', cache.key(granule)])
+
+def test_least_recently_opened_entries_are_evicted(tmp_path, make_impacts):
+    paths = [make_impacts(tmp_path / f'IMPACTS_CRS_L1B_RevA_2020012{i}T060000.h5', START, n_time=300)
+             for i in range(3)]
+    cache = ArrayCache(str(tmp_path / 'arrays'))
+    cache.open(paths[0])
+    entry_bytes = sum(os.path.getsize(os.path.join(cache.cache_dir, cache.key(paths[0]), name))
+                      for name in os.listdir(os.path.join(cache.cache_dir, cache.key(paths[0]))))
+    cache.max_bytes = int(entry_bytes * 2.5)
+    cache.open(paths[1])
+    cache.open(paths[0])
+    cache.open(paths[2])
+    assert cache.get(paths[1]) is None
+    assert cache.get(paths[0]) is not None and cache.get(paths[2]) is not None
+
+def test_fill_in_a_forked_worker_after_dask_ran_here(tmp_path, granule):
+    with open_crs_dataset(granule) as ds:
+        ds['reflectivity'].values
+    cache = ArrayCache(str(tmp_path / 'arrays'))
+    worker = multiprocessing.get_context('fork').Process(target=cache.fill, args=(granule,))
+    worker.start()
+    worker.join(30)
+    if worker.is_alive():
+        worker.terminate()
+        pytest.fail("fill hung in a forked worker")
+    assert worker.exitcode == 0
+    assert cache.get(granule) is not None
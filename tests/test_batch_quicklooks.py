@@ -0,0 +1,78 @@
+import os
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip('ipynb')
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.figure import Figure
+
+import batch_quicklooks
+from batch_quicklooks import plan_quicklooks, render_quicklook, run_batch
+
+@pytest.fixture
+def granules(tmp_path, make_impacts):
+    data = tmp_path / 'data'
+    data.mkdir()
+    paths = [make_impacts(data / 'IMPACTS_CRS_L1B_RevA_20200125T{:02d}0000.h5'.format(hour),
+                          datetime(2020, 1, 25, hour), seed=hour)
+             for hour in (12, 13)]
+    return str(data), paths
+
+def pngs(out_dir):
+    return sorted(name for _, _, names in os.walk(out_dir) for name in names)
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_renders_every_granule_once(tmp_path, granules, workers):
+    data_dir, paths = granules
+    out_dir = str(tmp_path / 'out')
+
+    assert run_batch(data_dir, out_dir, workers=workers) == 0
+    assert pngs(out_dir) == ['IMPACTS_CRS_L1B_RevA_20200125T120000.png', 'IMPACTS_CRS_L1B_RevA_20200125T130000.png']
+
+    todo, skipped = plan_quicklooks(data_dir, out_dir)
+    assert (todo, skipped) == ([], 2)
+
+def test_rewritten_granule_is_rendered_again(tmp_path, granules):
+    data_dir, paths = granules
+    out_dir = str(tmp_path / 'out')
+    run_batch(data_dir, out_dir, workers=1)
+
+    newer = os.path.getmtime(paths[1]) + 60
+    os.utime(paths[1], (newer, newer))
+    todo, skipped = plan_quicklooks(data_dir, out_dir)
+    assert [granule.path for granule, _ in todo] == [paths[1]] and skipped == 1
+    assert len(plan_quicklooks(data_dir, out_dir, force=True)[0]) == 2
+
+def test_failed_save_keeps_the_previous_image(tmp_path, granules, monkeypatch):
+    data_dir, paths = granules
+    out_path = str(tmp_path / 'out' / 'impacts' / 'ql.png')
+    render_quicklook(paths[0], 'impacts', out_path)
+    with open(out_path, 'rb') as f:
+        previous = f.read()
+
+    def broken_savefig(self, fname, **kwargs):
+        with open(fname, 'wb') as f:
+            f.write(b'partial')
+        raise OSError('disk full')
+
+    monkeypatch.setattr(Figure, 'savefig', broken_savefig)
+    with pytest.raises(OSError):
+        render_quicklook(paths[0], 'impacts', out_path)
+    with open(out_path, 'rb') as f:
+        assert f.read() == previous
+    assert os.listdir(os.path.dirname(out_path)) == ['ql.png']  # No temporary file left behind
+
+def test_failures_are_counted_not_raised(tmp_path, granules, monkeypatch):
+    data_dir, _ = granules
+    def fail(path, *args):
+        raise RuntimeError('bad granule')
+    monkeypatch.setattr(batch_quicklooks, 'render_quicklook', fail)
+    assert run_batch(data_dir, str(tmp_path / 'out'), workers=1) == 2
+
+def test_empty_window_writes_nothing(tmp_path, granules):
+    _, paths = granules
+    out_path = str(tmp_path / 'out' / 'ql.png')
+    assert render_quicklook(paths[0], 'impacts', out_path, datetime(2020, 1, 26), datetime(2020, 1, 27)) is None
+    assert not os.path.exists(out_path)
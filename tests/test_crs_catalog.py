@@ -0,0 +1,75 @@
+import os
+from datetime import datetime
+
+from data_sources.crs_catalog import CRSCatalog, campaign_for_filename, flight_date_from_filename, get_catalog
+
+def test_filename_helpers():
+    assert campaign_for_filename('IMPACTS2023_CRS_L1B_RevA_20230125T120000.h5') == 'impacts'
+    assert campaign_for_filename('GOESR_CRS_L1B_20170321.nc') == 'goesrplt'
+    assert campaign_for_filename('notes.txt') is None
+    assert flight_date_from_filename('IMPACTS_CRS_L1B_20230125_a.h5').isoformat() == '2023-01-25'
+
+def test_indexes_campaigns_and_queries_by_time(tmp_path, make_impacts, make_goesrplt):
+    data = tmp_path / 'data'
+    (data / 'sub').mkdir(parents=True)
+    make_impacts(data / 'IMPACTS_CRS_L1B_20230120_a.h5', datetime(2023, 1, 20, 12), n_time=600)
+    make_impacts(data / 'sub' / 'IMPACTS_CRS_L1B_20230121_b.h5', datetime(2023, 1, 21, 12), n_time=600)
+    make_goesrplt(data / 'GOESR_CRS_L1B_20170321.nc', start_hours=18.0)
+    catalog = CRSCatalog(str(data), str(tmp_path / 'catalog.sqlite'))
+
+    assert catalog.refresh() == 3
+    assert catalog.refresh() == 0
+
+    window = catalog.query('impacts', datetime(2023, 1, 20, 12, 3), datetime(2023, 1, 20, 13))
+    assert [os.path.basename(g.path) for g in window] == ['IMPACTS_CRS_L1B_20230120_a.h5']
+    assert window[0].start_time == datetime(2023, 1, 20, 12)
+    assert window[0].n_times == 600 and window[0].n_range == 40
+    goesr = catalog.query('goesrplt')[0]
+    assert goesr.start_time == datetime(2017, 3, 21, 18)
+    assert catalog.flight_dates('impacts') == ['2023-01-20', '2023-01-21']
+
+def test_removed_files_are_dropped(tmp_path, make_impacts):
+    path = make_impacts(tmp_path / 'IMPACTS_CRS_L1B_20230120_a.h5', datetime(2023, 1, 20, 12))
+    catalog = CRSCatalog(str(tmp_path), str(tmp_path / 'catalog.sqlite'))
+    catalog.refresh()
+    os.remove(path)
+    catalog.refresh()
+    assert catalog.query('impacts') == []
+
+def test_unreadable_file_is_retried_until_it_reads(tmp_path, make_impacts):
+    path = tmp_path / 'IMPACTS_CRS_L1B_20230120_a.h5'
+    path.write_bytes(b'not hdf5')
+    catalog = CRSCatalog(str(tmp_path), str(tmp_path / 'catalog.sqlite'))
+    catalog.refresh()
+    assert catalog.query('impacts')[0].n_times is None
+
+    # Rewritten in place: the directory listing (and its mtime) does not change
+    dir_mtime = os.stat(tmp_path).st_mtime
+    make_impacts(path, datetime(2023, 1, 20, 12))
+    assert os.stat(tmp_path).st_mtime == dir_mtime
+    catalog.refresh()
+    found = catalog.query('impacts', datetime(2023, 1, 20), datetime(2023, 1, 21))
+    assert len(found) == 1 and found[0].n_times == 600
+
+def test_file_rewritten_in_place_is_reindexed(tmp_path, make_impacts):
+    data = tmp_path / 'data'
+    data.mkdir()
+    path = make_impacts(data / 'IMPACTS_CRS_L1B_20230120_a.h5', datetime(2023, 1, 20, 12), n_time=600)
+    catalog = CRSCatalog(str(data), str(tmp_path / 'catalog.sqlite'))
+    catalog.refresh()
+    make_impacts(path, datetime(2023, 1, 20, 14), n_time=800)
+    os.utime(path, (1e9, 1e9))
+    # The directory did not change, so only a full refresh looks at the file again
+    assert catalog.refresh() == 0
+    assert catalog.refresh(full=True) == 1
+    granule = catalog.query('impacts')[0]
+    assert granule.start_time == datetime(2023, 1, 20, 14) and granule.n_times == 800
+
+def test_get_catalog_refreshes_at_most_once_per_interval(tmp_path, make_impacts):
+    data = tmp_path / 'data'
+    data.mkdir()
+    make_impacts(data / 'IMPACTS_CRS_L1B_20230120_a.h5', datetime(2023, 1, 20, 12))
+    assert len(get_catalog(str(data)).query('impacts')) == 1
+    make_impacts(data / 'IMPACTS_CRS_L1B_20230121_a.h5', datetime(2023, 1, 21, 12))
+    assert len(get_catalog(str(data)).query('impacts')) == 1
+    assert len(get_catalog(str(data), max_age=0).query('impacts')) == 2
@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+
+import h5py
+import numpy as np
+import pytest
+
+from data_sources.crs_dataset import open_crs_dataset, open_crs_flight
+
+START = datetime(2020, 1, 25, 6, 0)
+
+def impacts_name(start):
+    return f'IMPACTS_CRS_L1B_RevA_{start:%Y%m%dT%H%M%S}.h5'
+
+def test_impacts_layout(tmp_path, make_impacts):
+    path = make_impacts(tmp_path / impacts_name(START), START, n_time=100, n_range=20)
+    with open_crs_dataset(path, time_chunk=32) as ds:
+        assert ds.attrs['campaign'] == 'impacts'
+        assert ds['reflectivity'].dims == ('time', 'range')
+        assert ds['reflectivity'].shape == (100, 20)
+        assert ds['reflectivity'].data.chunks[0][0] == 32
+        assert ds['time'].values[0] == np.datetime64(START, 'ns')
+        assert ds['range'].values[1] == pytest.approx(0.03)
+
+def test_goesrplt_layout(tmp_path, make_goesrplt):
+    path = make_goesrplt(tmp_path / 'GOESR_CRS_L1B_20170321.nc', start_hours=18.0, n_time=50, n_range=20)
+    with open_crs_dataset(path) as ds:
+        assert ds.attrs['campaign'] == 'goesrplt'
+        assert ds['reflectivity'].dims == ('time', 'range')
+        assert ds['reflectivity'].shape == (50, 20)
+        assert ds['time'].values[0] == np.datetime64('2017-03-21T18:00', 'ns')
+
+def open_h5_files():
+    return h5py.h5f.get_obj_count(h5py.h5f.OBJ_ALL, h5py.h5f.OBJ_FILE)
+
+def test_failed_flight_open_closes_its_files(tmp_path, make_impacts):
+    later = START + timedelta(minutes=5)
+    paths = [make_impacts(tmp_path / impacts_name(START), START, n_time=50),
+             make_impacts(tmp_path / impacts_name(later), later, n_time=50, n_range=30)]
+    before = open_h5_files()
+    # The traceback keeps the opened segments referenced, so only an explicit close releases them
+    with pytest.raises(ValueError) as excinfo:
+        open_crs_flight(paths)
+    assert open_h5_files() == before
+    assert excinfo.traceback
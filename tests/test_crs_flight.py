@@ -0,0 +1,75 @@
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+import xarray as xr
+
+from data_sources.array_cache import ArrayCache, open_cached_crs_flight
+from data_sources.crs_dataset import open_crs_dataset, open_crs_flight, stitch_segments
+
+START = datetime(2020, 1, 25, 6, 0)
+
+def impacts_name(start):
+    return f'IMPACTS_CRS_L1B_RevA_{start:%Y%m%dT%H%M%S}.h5'
+
+def split_flight(tmp_path, make_impacts, overlap=10, range_offset_m=0.0):
+    """Two 2 Hz segments, the second starting `overlap` rows before the first ends; later segment first"""
+    first = make_impacts(tmp_path / impacts_name(START), START, n_time=200)
+    later = START + timedelta(seconds=(200 - overlap) / 2.0)
+    second = make_impacts(tmp_path / impacts_name(later), later, n_time=200 + overlap, seed=1,
+                          range_offset_m=range_offset_m)
+    return [second, first]
+
+def test_stitch_trims_overlap_and_keeps_order(tmp_path, make_impacts):
+    paths = split_flight(tmp_path, make_impacts, overlap=10)
+    with open_crs_flight(paths) as flight:
+        times = flight['time'].values
+        assert len(times) == 400
+        assert np.all(np.diff(times) > np.timedelta64(0))
+        assert flight.attrs['segment_starts'] == [0, 200]
+        assert flight.attrs['source_files'] == [os.path.basename(p) for p in reversed(paths)]
+        with open_crs_dataset(paths[0]) as second:
+            np.testing.assert_array_equal(flight['reflectivity'].values[200:],
+                                          second['reflectivity'].values[10:])
+
+def test_single_segment_matches_the_file(tmp_path, make_impacts):
+    path = make_impacts(tmp_path / impacts_name(START), START, n_time=120)
+    with open_crs_flight([path]) as flight, open_crs_dataset(path) as ds:
+        xr.testing.assert_equal(flight[['reflectivity', 'doppler_velocity']],
+                                ds[['reflectivity', 'doppler_velocity']])
+        assert flight.attrs['segment_starts'] == [0]
+
+def test_rounded_gates_are_snapped(tmp_path, make_impacts):
+    paths = split_flight(tmp_path, make_impacts, range_offset_m=0.5)
+    with open_crs_flight(paths) as flight:
+        assert flight.sizes['range'] == 40
+        assert not np.isnan(flight['range'].values).any()
+        assert np.isfinite(flight['reflectivity'].values[200:]).mean() > 0.8
+
+def test_mismatched_gates_raise(tmp_path, make_impacts):
+    paths = split_flight(tmp_path, make_impacts, range_offset_m=50.0)
+    with pytest.raises(ValueError, match='Range gates'):
+        open_crs_flight(paths)
+
+def test_different_gate_counts_raise(tmp_path, make_impacts):
+    first = make_impacts(tmp_path / impacts_name(START), START, n_time=50)
+    later = START + timedelta(minutes=5)
+    second = make_impacts(tmp_path / impacts_name(later), later, n_time=50, n_range=30)
+    with pytest.raises(ValueError):
+        stitch_segments([open_crs_dataset(first), open_crs_dataset(second)])
+
+def test_cold_cached_flight_does_not_fill_the_cache(tmp_path, make_impacts):
+    paths = split_flight(tmp_path, make_impacts)
+    cache = ArrayCache(str(tmp_path / 'arrays'))
+    with open_cached_crs_flight(paths, cache=cache) as flight:
+        assert len(flight['time']) == 400
+    assert all(cache.get(path) is None for path in paths)
+    assert not [name for name in os.listdir(cache.cache_dir) if name != 'index.sqlite']
+
+def test_cached_flight_maps_filled_segments(tmp_path, make_impacts):
+    paths = split_flight(tmp_path, make_impacts)
+    cache = ArrayCache(str(tmp_path / 'arrays'))
+    cache.fill(paths[0])
+    with open_cached_crs_flight(paths, cache=cache) as cached, open_crs_flight(paths) as plain:
+        xr.testing.assert_equal(cached[['reflectivity']], plain[['reflectivity']])
@@ -0,0 +1,38 @@
+import numpy as np
+import xarray as xr
+
+from data_sources.crs_subset import clock_to_hours, subset_by_time, time_index_window
+
+def test_time_index_window_is_closed_interval():
+    times = np.arange(10.0)
+    assert time_index_window(times, 2.0, 5.0) == slice(2, 6)
+    assert time_index_window(times) == slice(0, 10)
+    assert time_index_window(times, 20.0, 30.0) == slice(10, 10)
+
+def test_clock_to_hours():
+    assert clock_to_hours('01:30:00') == 1.5
+
+def test_subset_by_clock_on_datetime_axis():
+    times = np.datetime64('2023-01-20T12:00', 'ns') + np.arange(0, 3600, 60).astype('timedelta64[s]')
+    ds = xr.Dataset({'reflectivity': (('time', 'range'), np.zeros((60, 3)))}, coords={'time': times})
+    subset = subset_by_time(ds, '12:10:00', '12:19:59', time_name='time')
+    assert subset.sizes['time'] == 10
+    assert subset['time'].values[0] == np.datetime64('2023-01-20T12:10', 'ns')
+
+def test_subset_by_hours_on_raw_axis():
+    ds = xr.Dataset({'zku': (('timed',), np.arange(5.0))}, coords={'timed': [18.0, 18.5, 19.0, 19.5, 20.0]})
+    assert subset_by_time(ds, 18.5, 19.5).sizes['timed'] == 3
+
+def test_clock_bounds_after_midnight_roll_to_the_next_day():
+    times = np.datetime64('2023-01-20T23:30', 'ns') + np.arange(0, 3600, 60).astype('timedelta64[s]')
+    ds = xr.Dataset({'reflectivity': (('time', 'range'), np.zeros((60, 3)))}, coords={'time': times})
+    subset = subset_by_time(ds, '00:05:00', '00:14:59', time_name='time')
+    assert subset.sizes['time'] == 10
+    assert subset['time'].values[0] == np.datetime64('2023-01-21T00:05', 'ns')
+    assert subset_by_time(ds, '23:50:00', '00:09:59', time_name='time').sizes['time'] == 20
+    # Before the first sample on a flight that stays within one day: still empty
+    assert subset_by_time(ds.isel(time=slice(0, 20)), '00:05:00', '00:14:59', time_name='time').sizes['time'] == 0
+
+def test_hour_bounds_after_midnight_on_raw_axis():
+    ds = xr.Dataset({'zku': (('timed',), np.arange(5.0))}, coords={'timed': [23.5, 24.0, 24.5, 25.0, 25.5]})
+    assert subset_by_time(ds, '00:00:00', '01:00:00').sizes['timed'] == 3
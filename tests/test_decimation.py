@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from data_sources.decimation import bin_edges, decimate_curtain
+
+def test_bin_edges_cover_every_sample():
+    edges = bin_edges(10, 3)
+    np.testing.assert_array_equal(edges, [0, 3, 6, 10])  # The last bin takes the remainder
+    assert np.all(np.diff(bin_edges(1001, 7)) >= 1001 // 7)
+    assert bin_edges(1001, 7)[-1] == 1001
+
+@pytest.mark.parametrize('method, reduce', [('mean', np.nanmean), ('max', np.nanmax), ('min', np.nanmin)])
+def test_reductions_match_numpy_per_bin(method, reduce):
+    rng = np.random.default_rng(2)
+    times = np.arange(10)
+    field = rng.normal(0.0, 10.0, (10, 4))
+    field[1, 0] = np.nan  # NaNs are ignored within a bin
+
+    centers, binned = decimate_curtain(times, field, 3, method)
+
+    assert binned.shape == (3, 4)
+    for i, (i0, i1) in enumerate([(0, 3), (3, 6), (6, 10)]):
+        np.testing.assert_allclose(binned[i], reduce(field[i0:i1], axis=0))
+    np.testing.assert_array_equal(centers, [1, 4, 7])
+
+@pytest.mark.parametrize('method', ['mean', 'max', 'min'])
+def test_all_nan_bin_stays_nan(method):
+    field = np.ones((6, 2))
+    field[4:, 1] = np.nan
+    with np.errstate(all='raise'):
+        _, binned = decimate_curtain(np.arange(6), field, 3, method)
+    np.testing.assert_array_equal(np.isnan(binned), [[False, False], [False, False], [False, True]])
+
+def test_small_curtains_are_returned_unchanged():
+    times, field = np.arange(5), np.zeros((5, 2))
+    assert decimate_curtain(times, field, 5)[1] is field
+    assert decimate_curtain(times, field, 0)[1] is field
+    with pytest.raises(ValueError):
+        decimate_curtain(times, field, 2, 'median')
@@ -0,0 +1,56 @@
+import pickle
+
+import numpy as np
+
+from data_sources.nasa_connector import CRSCurtain
+from digest import (MAX_TIME_BINS, DigestBuilder, build_digest, estimate_tokens, truncate_to_budget)
+
+def curtain(start: str, n_time: int, seed: int):
+    rng = np.random.default_rng(seed)
+    times = np.datetime64(start, 'ns') + (np.arange(n_time) * 1e8).astype('timedelta64[ns]')
+    reflectivity = rng.normal(0.0, 10.0, (n_time, 30))
+    reflectivity[reflectivity < -15] = np.nan
+    return times, np.linspace(0.0, 9.0, 30), reflectivity, rng.normal(0.0, 2.0, (n_time, 30))
+
+def test_merged_partials_equal_single_pass():
+    parts = [curtain('2023-01-20T12:00', 20000, 0), curtain('2023-01-20T15:00', 30000, 1)]
+    whole = DigestBuilder()
+    for part in parts:
+        whole.update(*part)
+    merged = DigestBuilder()
+    for part in parts:
+        merged.merge(DigestBuilder().update(*part))
+    assert merged.build().text == whole.build().text
+    assert whole.profiles == 50000
+
+def test_state_size_does_not_grow_with_flight_length():
+    short = DigestBuilder().update(*curtain('2023-01-20T12:00', 5000, 0))
+    long = DigestBuilder().update(*curtain('2023-01-20T12:00', 400000, 0))
+    assert len(long._bins) <= MAX_TIME_BINS
+    assert len(pickle.dumps(long)) <= len(pickle.dumps(short)) * 1.5
+
+def test_digest_never_exceeds_budget():
+    builder = DigestBuilder().update(*curtain('2023-01-20T12:00', 10000, 0))
+    for budget in (600, 200, 40, 5):
+        assert builder.build(budget).tokens <= budget
+
+def test_empty_digest():
+    assert build_digest().text == "CRS radar digest: no data"
+
+def test_truncate_to_budget_counts_its_note():
+    text = truncate_to_budget('x' * 1000, 10)
+    assert estimate_tokens(text) <= 10
+    assert text.endswith('more characters omitted]')
+    assert truncate_to_budget('short', 10) == 'short'
+
+def test_curtain_campaign_is_kept_through_merge():
+    times, range_km, reflectivity, velocity = curtain('2023-01-20T12:00', 1000, 0)
+    named = CRSCurtain(times=times, range_km=range_km, reflectivity=reflectivity, doppler_velocity=velocity,
+                       filepath='/data/IMPACTS_CRS_L1B_RevA_20230120T120000.h5')
+    partial = DigestBuilder().add_curtain(named)
+    assert partial.campaigns == {'impacts'}
+
+    merged = DigestBuilder().merge(partial).merge(pickle.loads(pickle.dumps(partial)))
+    merged.add_curtain(CRSCurtain(times=times, range_km=range_km, reflectivity=reflectivity), 'goesrplt')
+    assert merged.campaigns == {'impacts', 'goesrplt'}
+    assert merged.build().text.startswith("CRS radar digest (goesrplt, impacts)")
@@ -0,0 +1,34 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_sources.crs_dataset import open_crs_dataset
+from data_sources.export import export_format, export_gates, gate_columns
+
+def test_gate_columns_flatten_and_drop_empty_gates():
+    times = np.array(['2023-01-20T12:00', '2023-01-20T12:01'], dtype='datetime64[ns]')
+    reflectivity = np.array([[1.0, np.nan], [3.0, 4.0]])
+    velocity = np.array([[0.5, np.nan], [np.nan, 1.0]])
+    columns = gate_columns(times, np.array([0.1, 0.2]), reflectivity, velocity)
+    assert columns['reflectivity'].tolist() == [1.0, 3.0, 4.0]
+    assert columns['range_km'].tolist() == [0.1, 0.1, 0.2]
+    assert len(gate_columns(times, np.array([0.1, 0.2]), reflectivity, velocity, dropna=False)['time']) == 4
+
+def test_export_format_from_extension():
+    assert export_format('out.parquet') == 'parquet'
+    assert export_format('out.feather') == 'arrow'
+    with pytest.raises(ValueError):
+        export_format('out.xyz')
+
+@pytest.mark.parametrize('name', ['gates.parquet', 'gates.csv'])
+def test_export_round_trip(tmp_path, make_impacts, name):
+    path = make_impacts(tmp_path / 'IMPACTS_CRS_L1B_20230120_a.h5', datetime(2023, 1, 20, 12), n_time=100)
+    out = str(tmp_path / name)
+    with open_crs_dataset(path) as ds:
+        rows = export_gates(ds, out, chunk_rows=30)
+        expected = int((~(np.isnan(ds['reflectivity'].values) & np.isnan(ds['doppler_velocity'].values))).sum())
+    table = pd.read_parquet(out) if name.endswith('.parquet') else pd.read_csv(out)
+    assert rows == expected == len(table)
+    assert set(table.columns) >= {'time', 'range_km', 'reflectivity', 'doppler_velocity'}
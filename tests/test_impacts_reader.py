@@ -0,0 +1,38 @@
+from datetime import datetime
+
+import h5py
+import numpy as np
+
+from data_sources.impacts_reader import (REFLECTIVITY_PATH, TIME_PATH, find_time_window, memmap_dataset,
+                                         read_impacts_window)
+
+def test_find_time_window_binary_search(tmp_path, make_impacts):
+    path = make_impacts(tmp_path / 'IMPACTS_CRS_L1B_20230120_a.h5', datetime(2023, 1, 20, 12), n_time=600)
+    with h5py.File(path, 'r') as f:
+        window = find_time_window(f[TIME_PATH], datetime(2023, 1, 20, 12, 1), datetime(2023, 1, 20, 12, 2))
+        assert window == slice(120, 241)
+        assert find_time_window(f[TIME_PATH], datetime(2024, 1, 1)) == slice(600, 600)
+
+def test_window_read_matches_full_read(tmp_path, make_impacts):
+    path = make_impacts(tmp_path / 'IMPACTS_CRS_L1B_20230120_a.h5', datetime(2023, 1, 20, 12))
+    with h5py.File(path, 'r') as f:
+        full = f[REFLECTIVITY_PATH][()]
+        rows = read_impacts_window(f, datetime(2023, 1, 20, 12, 1), datetime(2023, 1, 20, 12, 2))
+    np.testing.assert_array_equal(rows['dBZe'], full[rows['window']])
+
+def test_contiguous_dataset_is_memory_mapped(tmp_path, make_impacts):
+    path = make_impacts(tmp_path / 'IMPACTS_CRS_L1B_20230120_a.h5', datetime(2023, 1, 20, 12), contiguous=True)
+    with h5py.File(path, 'r') as f:
+        mapped = memmap_dataset(f[REFLECTIVITY_PATH])
+        assert isinstance(mapped, np.memmap)
+        np.testing.assert_array_equal(mapped, f[REFLECTIVITY_PATH][()])
+        rows = read_impacts_window(f, mmap=True)
+    assert isinstance(rows['dBZe'], np.memmap)
+    assert not rows['dBZe'].flags.writeable
+
+def test_chunked_or_compressed_dataset_is_not_mapped(tmp_path, make_impacts):
+    path = make_impacts(tmp_path / 'IMPACTS_CRS_L1B_20230120_a.h5', datetime(2023, 1, 20, 12))
+    with h5py.File(path, 'r') as f:
+        assert memmap_dataset(f[REFLECTIVITY_PATH]) is None
+        rows = read_impacts_window(f, mmap=True)
+    assert not isinstance(rows['dBZe'], np.memmap)
@@ -0,0 +1,65 @@
+import threading
+from datetime import datetime
+
+from jobs import FAILED, SUCCEEDED, JobManager, report_week_key
+
+def wait(manager, job_id):
+    manager.executor.shutdown(wait=True)
+    return manager.get(job_id)
+
+def test_same_key_shares_one_job():
+    manager = JobManager(max_workers=2)
+    release = threading.Event()
+    runs = []
+
+    def work(progress):
+        runs.append(1)
+        progress('reading', {'files': 1})
+        release.wait(5)
+        return 'report'
+
+    first = manager.submit('report', 'report:2025-W07', work)
+    second = manager.submit('report', 'report:2025-W07', work)
+    other = manager.submit('report', 'report:2025-W08', work)
+    assert second.id == first.id
+    assert other.id != first.id
+    release.set()
+    job = wait(manager, first.id)
+    assert job.status == SUCCEEDED
+    assert job.result == 'report'
+    assert job.stage == 'reading' and job.progress == {'files': 1}
+    assert len(runs) == 2
+
+def test_finished_key_can_run_again():
+    manager = JobManager(max_workers=1)
+    first = manager.submit('report', 'k', lambda progress: 1)
+    manager.executor.submit(lambda: None).result()
+    second = manager.submit('report', 'k', lambda progress: 2)
+    assert second.id != first.id
+    assert wait(manager, second.id).result == 2
+
+def test_failures_are_recorded():
+    manager = JobManager(max_workers=1)
+
+    def work(progress):
+        raise RuntimeError('no granules')
+
+    job = wait(manager, manager.submit('report', 'k', work).id)
+    assert job.status == FAILED
+    assert job.error == 'no granules'
+    assert job.finished is not None
+
+def test_retention_drops_oldest_finished_jobs():
+    manager = JobManager(max_workers=1, retention=2)
+    ids = []
+    for i in range(4):
+        ids.append(manager.submit('report', f'k{i}', lambda progress: None).id)
+        manager.executor.submit(lambda: None).result()
+    manager.submit('report', 'last', lambda progress: None)
+    assert manager.get(ids[0]) is None
+    assert manager.get(ids[-1]) is not None
+
+def test_report_week_key_uses_iso_weeks():
+    assert report_week_key(datetime(2025, 2, 12)) == 'report:2025-W07'
+    # 2024-12-30 belongs to ISO week 1 of 2025
+    assert report_week_key(datetime(2024, 12, 30)) == 'report:2025-W01'
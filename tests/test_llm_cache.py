@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+
+from llm_cache import ResponseCache, cache_key, cached_chat_completion
+
+MESSAGES = [{'role': 'user', 'content': 'Summarize the flight'}]
+
+class FakeClient:
+    """groq.Client stand-in that counts completions"""
+
+    def __init__(self, content='Echo tops near 8 km'):
+        self.content = content
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, messages, model, temperature):
+        self.calls += 1
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=self.content))])
+
+def test_cache_key_depends_on_every_parameter():
+    key = cache_key('model-a', 0.1, MESSAGES)
+    assert key == cache_key('model-a', 0.1, [dict(m) for m in MESSAGES])
+    assert key != cache_key('model-b', 0.1, MESSAGES)
+    assert key != cache_key('model-a', 0.2, MESSAGES)
+    assert key != cache_key('model-a', 0.1, [{'role': 'user', 'content': 'Other'}])
+
+def test_get_put_and_stats(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'responses.sqlite'))
+    assert cache.get('k') is None
+    cache.put('k', 'model-a', 'response')
+    assert cache.get('k') == 'response'
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 1, 1)
+    assert stats['total_bytes'] == len('response')
+
+def test_replacing_an_entry_keeps_the_size_total(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'responses.sqlite'))
+    cache.put('k', 'model-a', 'x' * 100)
+    cache.put('k', 'model-a', 'x' * 10)
+    assert cache.stats()['total_bytes'] == 10
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'responses.sqlite'), max_bytes=300)
+    for i in range(3):
+        cache.put(f'k{i}', 'model-a', 'x' * 100)
+    cache.get('k0')
+    cache.put('k3', 'model-a', 'x' * 100)
+    assert cache.get('k1') is None
+    assert cache.get('k0') is not None
+    assert cache.stats()['total_bytes'] <= 300
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'responses.sqlite'), ttl=-1)
+    cache.put('k', 'model-a', 'response')
+    assert cache.get('k') is None
+    assert cache.stats()['entries'] == 0
+
+def test_cached_chat_completion_calls_the_client_once(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'responses.sqlite'))
+    client = FakeClient()
+    first = cached_chat_completion(client, MESSAGES, 'model-a', 0.1, cache=cache)
+    second = cached_chat_completion(client, MESSAGES, 'model-a', 0.1, cache=cache)
+    assert first == second == client.content
+    assert client.calls == 1
+    cached_chat_completion(client, MESSAGES, 'model-a', 0.7, cache=cache)
+    assert client.calls == 2
+
+def test_cache_persists_across_instances(tmp_path):
+    path = str(tmp_path / 'responses.sqlite')
+    ResponseCache(path).put('k', 'model-a', 'response')
+    assert ResponseCache(path).get('k') == 'response'
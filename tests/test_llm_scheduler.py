@@ -0,0 +1,104 @@
+from types import SimpleNamespace
+
+import groq
+import httpx
+import pytest
+
+from llm_scheduler import LLMScheduler, TokenBucket, is_retryable, parse_duration
+
+MESSAGES = [{'role': 'user', 'content': 'hi'}]
+REQUEST = httpx.Request('POST', 'http://llm.test/v1/chat/completions')
+
+class RawResponse:
+    def __init__(self, content, headers=None):
+        self.headers = headers or {}
+        self._completion = SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(total_tokens=20))
+
+    async def parse(self):
+        return self._completion
+
+class FakeAsyncClient:
+    """Raises the queued errors in turn, then answers"""
+
+    def __init__(self, *errors, content='ok'):
+        self.errors = list(errors)
+        self.content = content
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(with_raw_response=self))
+
+    async def create(self, **request):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return RawResponse(self.content, {'x-ratelimit-remaining-requests': '100'})
+
+def status_error(status):
+    response = httpx.Response(status, request=REQUEST, headers={'retry-after': '0'})
+    cls = groq.RateLimitError if status == 429 else groq.InternalServerError if status >= 500 \
+        else groq.BadRequestError
+    return cls(f"HTTP {status}", response=response, body=None)
+
+def scheduler(client, max_retries=3):
+    return LLMScheduler(lambda: client, rpm=10_000, tpm=10**7, max_retries=max_retries,
+                        base_delay=0.001, max_delay=0.01)
+
+@pytest.mark.parametrize('value, seconds', [
+    ('7.66s', 7.66), ('2m59.56s', 179.56), ('120ms', 0.12), ('1h', 3600.0), ('3', 3.0)])
+def test_parse_duration(value, seconds):
+    assert parse_duration(value) == pytest.approx(seconds)
+
+@pytest.mark.parametrize('value', [None, '', 'soon'])
+def test_parse_duration_without_a_duration(value):
+    assert parse_duration(value) is None
+
+def test_token_bucket_waits_for_refill_and_pauses():
+    bucket = TokenBucket(60, period=60.0)
+    now = bucket.updated
+    assert bucket.wait_time(60, now) == 0
+    bucket.take(60)
+    assert bucket.wait_time(30, now) == pytest.approx(30.0)
+    bucket.sync(remaining=0, reset=5.0, now=now + 40)
+    assert bucket.level == 0
+    assert bucket.wait_time(1, now + 40) == pytest.approx(5.0)
+
+def test_is_retryable():
+    assert is_retryable(status_error(429))
+    assert is_retryable(status_error(503))
+    assert not is_retryable(status_error(400))
+    assert is_retryable(httpx.ConnectError('down'))
+    assert is_retryable(groq.APIConnectionError(request=REQUEST))
+    assert not is_retryable(TypeError('bad argument'))
+    assert not is_retryable(KeyError('choices'))
+
+def test_transient_failures_are_retried():
+    client = FakeAsyncClient(status_error(429), status_error(502), httpx.ReadTimeout('slow'))
+    llm = scheduler(client)
+    assert llm.complete(MESSAGES, 'model-a', 0.1) == 'ok'
+    assert client.calls == 4
+    assert llm.counters['retries'] == 3
+    assert llm.counters['rate_limited'] == 1
+
+def test_failed_attempts_do_not_keep_their_tokens():
+    client = FakeAsyncClient(status_error(502), status_error(502))
+    llm = LLMScheduler(lambda: client, rpm=10_000, tpm=6000, max_retries=3, base_delay=0.001, max_delay=0.01)
+    assert llm.complete(MESSAGES, 'model-a', 0.1) == 'ok'
+    # Only the successful attempt's reported usage (20 tokens) is charged, not three estimates
+    assert llm.tokens.level >= 6000 - 20 - 10
+
+@pytest.mark.parametrize('error', [TypeError('bad argument'), status_error(400)])
+def test_request_errors_are_not_retried(error):
+    client = FakeAsyncClient(error)
+    llm = scheduler(client)
+    with pytest.raises(type(error)):
+        llm.complete(MESSAGES, 'model-a', 0.1)
+    assert client.calls == 1
+    assert llm.counters['failed'] == 1
+
+def test_gives_up_after_max_retries():
+    client = FakeAsyncClient(*[status_error(503)] * 5)
+    llm = scheduler(client, max_retries=2)
+    with pytest.raises(groq.InternalServerError):
+        llm.complete(MESSAGES, 'model-a', 0.1)
+    assert client.calls == 3
@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from data_sources.array_cache import ArrayCache
+from data_sources.nasa_connector import NASADataConnector
+
+START = datetime(2020, 1, 25, 6, 0)
+WINDOW = (START + timedelta(minutes=1), START + timedelta(hours=3))
+
+@pytest.fixture
+def data_dir(tmp_path, make_impacts):
+    """Three granules an hour apart: compressed, contiguous (mappable), compressed"""
+    data_dir = tmp_path / 'crs'
+    data_dir.mkdir()
+    for i in range(3):
+        start = START + timedelta(hours=i)
+        make_impacts(data_dir / f'IMPACTS_CRS_L1B_RevA_{start:%Y%m%dT%H%M%S}.h5', start,
+                     n_time=600, seed=i, contiguous=i == 1)
+    return str(data_dir)
+
+def assert_same_curtains(left, right):
+    assert [c.filepath for c in left] == [c.filepath for c in right]
+    for a, b in zip(left, right):
+        np.testing.assert_array_equal(a.times, b.times)
+        np.testing.assert_array_equal(a.reflectivity, b.reflectivity)
+        np.testing.assert_array_equal(a.doppler_velocity, b.doppler_velocity)
+
+def test_parallel_read_matches_serial_read(data_dir):
+    serial = NASADataConnector(data_dir).get_cloud_radar_data(*WINDOW)
+    parallel = NASADataConnector(data_dir, max_workers=2).get_cloud_radar_data(*WINDOW)
+    assert len(serial) == 3
+    assert [c.times[0] for c in serial] == sorted(c.times[0] for c in serial)
+    assert serial[0].times[0] == np.datetime64(WINDOW[0], 'ns')
+    assert_same_curtains(serial, parallel)
+
+def test_parallel_read_maps_contiguous_fields(data_dir):
+    curtains = NASADataConnector(data_dir, max_workers=2).get_cloud_radar_data(*WINDOW)
+    assert isinstance(curtains[1].reflectivity, np.memmap)
+    assert curtains[1].reflectivity.filename == curtains[1].filepath
+
+def test_array_cache_skips_mappable_files(data_dir, tmp_path):
+    cache = ArrayCache(str(tmp_path / 'arrays'))
+    cached = NASADataConnector(data_dir, max_workers=2, array_cache=cache).get_cloud_radar_data(*WINDOW)
+    assert_same_curtains(cached, NASADataConnector(data_dir).get_cloud_radar_data(*WINDOW))
+    assert [cache.get(c.filepath) is not None for c in cached] == [True, False, True]
@@ -0,0 +1,40 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+pytest.importorskip('ipynb')
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from ipynb.fs.full.CRS_Recipe_Functions import plot_CRS2D
+
+def curtain(n_time=3000, n_range=40):
+    times = np.datetime64('2020-01-25T12:00:00', 'ns') + np.arange(n_time) * np.timedelta64(500, 'ms')
+    rng = np.random.default_rng(3)
+    datap = {'Ref': rng.uniform(-20, 40, (n_time, n_range)), 'DopV': rng.uniform(-20, 20, (n_time, n_range))}
+    return datap, times, np.linspace(5, 20, n_range)
+
+@pytest.mark.parametrize('render', ['contour', 'raster'])
+def test_both_renderers_draw_two_panels(render, capsys):
+    datap, times, range_km = curtain()
+    fig = plot_CRS2D(datap, times, range_km, datetime(2020, 1, 25, 12), datetime(2020, 1, 25, 12, 25),
+                     render=render, show=False)
+    try:
+        assert len(fig.axes) == 4  # Two panels and their colorbars
+        fig.canvas.draw()
+    finally:
+        plt.close(fig)
+    assert capsys.readouterr().out == ''  # Batch renders stay quiet
+
+def test_raster_is_decimated_to_the_axes_width():
+    datap, times, range_km = curtain()
+    fig = plot_CRS2D(datap, times, range_km, datetime(2020, 1, 25, 12), datetime(2020, 1, 25, 12, 25),
+                     render='raster', show=False)
+    try:
+        mesh = fig.axes[0].collections[0]
+        # Sized before the colorbar narrows the axes, so bounded by the figure
+        assert mesh.get_array().shape[1] <= fig.get_figwidth() * fig.dpi < len(times)
+    finally:
+        plt.close(fig)
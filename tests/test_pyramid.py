@@ -0,0 +1,34 @@
+import os
+import shutil
+from datetime import datetime
+
+import numpy as np
+
+from data_sources.pyramid import build_pyramid
+
+def test_coarse_levels_match_the_source(tmp_path, make_impacts):
+    path = make_impacts(tmp_path / 'IMPACTS_CRS_L1B_RevA_20200125T120000.h5', datetime(2020, 1, 25, 12), n_time=4100)
+    pyramid = build_pyramid(path, 'impacts', str(tmp_path / 'pyramids'), 'max')
+    assert pyramid.factors == [1, 2, 4]
+
+    times, full = pyramid.read('reflectivity', level=0)
+    _, coarse = pyramid.read('reflectivity', level=2)
+    assert len(times) == 4100 and len(coarse) == 1025
+    with np.errstate(invalid='ignore'):
+        np.testing.assert_allclose(coarse[:-1], np.fmax.reduce(full[:4096].reshape(1024, 4, -1), axis=1))
+    assert pyramid.level_for(pixel_width=1000) == 2 and pyramid.level_for(pixel_width=3000) == 0
+
+def test_full_resolution_is_read_from_the_callers_copy(tmp_path, make_impacts):
+    original = make_impacts(tmp_path / 'IMPACTS_CRS_L1B_RevA_20200125T120000.h5', datetime(2020, 1, 25, 12),
+                            n_time=2048)
+    cache_dir = str(tmp_path / 'pyramids')
+    expected = build_pyramid(original, 'impacts', cache_dir).read('doppler_velocity', level=0)[1]
+
+    moved = str(tmp_path / 'moved' / os.path.basename(original))
+    os.makedirs(os.path.dirname(moved))
+    shutil.copy2(original, moved)
+    os.remove(original)
+
+    pyramid = build_pyramid(moved, 'impacts', cache_dir)  # Same contents: the pyramid is reused
+    assert pyramid.source == moved
+    np.testing.assert_array_equal(pyramid.read('doppler_velocity', level=0)[1], expected)
@@ -0,0 +1,111 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from digest import build_digest
+from data_sources.crs_catalog import get_catalog
+from data_sources.nasa_connector import NASADataConnector
+import report_partials
+from report_partials import PartialStore, analysis_key, incremental_digest
+
+START = datetime(2020, 1, 25, 6, 0)
+
+@pytest.fixture
+def flights(tmp_path, make_impacts):
+    """Three 10-minute granules an hour apart"""
+    data_dir = tmp_path / 'crs'
+    data_dir.mkdir()
+    for i in range(3):
+        start = START + timedelta(hours=i)
+        make_impacts(data_dir / f'IMPACTS_CRS_L1B_RevA_{start:%Y%m%dT%H%M%S}.h5', start,
+                     n_time=1200, seed=i)
+    return NASADataConnector(str(data_dir))
+
+def full_rebuild(connector, start, end):
+    return build_digest(curtains=connector.get_cloud_radar_data(start, end)).text
+
+@pytest.mark.parametrize('start', [START - timedelta(minutes=1), START + timedelta(minutes=5)])
+def test_incremental_digest_equals_full_rebuild(flights, tmp_path, start):
+    end = START + timedelta(hours=3)
+    store = PartialStore(str(tmp_path / 'partials'))
+    builder, summary = incremental_digest(flights, start, end, store)
+    assert builder.build().text == full_rebuild(flights, start, end)
+    assert summary['files'] == 3
+
+def test_second_run_reuses_partials(flights, tmp_path):
+    start, end = START - timedelta(minutes=1), START + timedelta(hours=3)
+    store = PartialStore(str(tmp_path / 'partials'))
+    first, summary = incremental_digest(flights, start, end, store)
+    assert (summary['new'], summary['reused']) == (3, 0)
+    second, summary = incremental_digest(flights, start, end, store)
+    assert (summary['new'], summary['reused']) == (0, 3)
+    assert second.build().text == first.build().text
+    assert summary['watermark'] == (START + timedelta(hours=2, minutes=10) - timedelta(seconds=0.5)).isoformat()
+
+def test_rewritten_granule_is_read_again(flights, tmp_path, make_impacts):
+    start, end = START - timedelta(minutes=1), START + timedelta(hours=3)
+    store = PartialStore(str(tmp_path / 'partials'))
+    incremental_digest(flights, start, end, store)
+    path = sorted(os.listdir(flights.data_dir))[0]
+    make_impacts(os.path.join(flights.data_dir, path), START, n_time=1200, seed=7)
+    os.utime(os.path.join(flights.data_dir, path), (1e9, 1e9))
+    get_catalog(flights.data_dir).refresh(full=True)
+    builder, summary = incremental_digest(flights, start, end, store)
+    assert (summary['new'], summary['reused']) == (1, 2)
+    assert builder.build().text == full_rebuild(flights, start, end)
+
+def test_granules_past_the_watermark_skip_the_cache_lookup(flights, tmp_path, make_impacts, monkeypatch):
+    start, end = START - timedelta(minutes=1), START + timedelta(hours=4)
+    store = PartialStore(str(tmp_path / 'partials'))
+    incremental_digest(flights, start, end, store)
+    arrived = START + timedelta(hours=3)
+    make_impacts(os.path.join(flights.data_dir, f'IMPACTS_CRS_L1B_RevA_{arrived:%Y%m%dT%H%M%S}.h5'), arrived,
+                 n_time=1200, seed=3)
+    get_catalog(flights.data_dir).refresh(full=True)
+
+    looked_up = []
+    get = PartialStore.get
+    monkeypatch.setattr(PartialStore, 'get', lambda self, granule, *args: looked_up.append(granule.path)
+                        or get(self, granule, *args))
+    builder, summary = incremental_digest(flights, start, end, store)
+    assert (summary['new'], summary['reused']) == (1, 3)
+    assert len(looked_up) == 3 and not any(path.endswith('T090000.h5') for path in looked_up)
+    assert summary['watermark'] == (arrived + timedelta(minutes=10) - timedelta(seconds=0.5)).isoformat()
+    assert builder.build().text == full_rebuild(flights, start, end)
+
+def test_lookup_hashes_only_files_that_could_match(flights, tmp_path, make_impacts, monkeypatch):
+    store = PartialStore(str(tmp_path / 'partials'))
+    incremental_digest(flights, START - timedelta(minutes=1), START + timedelta(hours=3), store)
+    hashed = []
+    source_hash = report_partials.source_hash
+    monkeypatch.setattr(report_partials, 'source_hash', lambda path, *args: hashed.append(path)
+                        or source_hash(path, *args))
+    touched = sorted(os.listdir(flights.data_dir))[0]
+    os.utime(os.path.join(flights.data_dir, touched), (2e9, 2e9))
+    make_impacts(os.path.join(flights.data_dir, 'IMPACTS_CRS_L1B_RevA_20200125T120000.h5'), START, n_time=600)
+    catalog = get_catalog(flights.data_dir)
+    catalog.refresh(full=True)
+    granules = {os.path.basename(granule.path): granule for granule in catalog.query('impacts')}
+
+    assert store.get(granules['IMPACTS_CRS_L1B_RevA_20200125T120000.h5']) is None
+    assert hashed == []  # No stored partial has that size
+    assert store.get(granules[touched]) is not None
+    assert hashed == [granules[touched].path]
+
+def test_analysis_key_changes_with_digest_and_week():
+    monday = datetime(2025, 2, 10)
+    key = analysis_key('digest', monday)
+    assert analysis_key('digest', monday + timedelta(days=6)) == key
+    assert analysis_key('digest', monday + timedelta(days=7)) != key
+    assert analysis_key('other digest', monday) != key
+
+def test_prune_drops_old_partials_and_analyses(flights, tmp_path):
+    store = PartialStore(str(tmp_path / 'partials'))
+    incremental_digest(flights, START - timedelta(minutes=1), START + timedelta(hours=3), store)
+    store.put_analysis('fresh', {'summary': 'ok'})
+    assert store.prune(START + timedelta(hours=1, minutes=30)) == 2
+    assert store.get_analysis('fresh') == {'summary': 'ok'}
+    assert len([name for name in os.listdir(store.cache_dir) if name.endswith('.pkl')]) == 1
+    store.prune(START, analysis_ttl=timedelta(seconds=-1))
+    assert store.get_analysis('fresh') is None
@@ -0,0 +1,125 @@
+import json
+import os
+import sqlite3
+import threading
+
+import pytest
+
+from report_store import INDEX_NAME, ReportStore, get_report_store
+
+def report(date, summary='Quiet week'):
+    return {'date': date, 'summary': summary}
+
+def test_save_get_and_load(tmp_path):
+    store = ReportStore(str(tmp_path))
+    record = store.save(report('2025-02-10'))
+    assert store.get(record.id) == record
+    assert json.loads(store.load(record)) == report('2025-02-10')
+    assert os.path.exists(store.path(record))
+    assert store.get(record.id + 1) is None
+
+def test_same_day_reports_do_not_overwrite(tmp_path):
+    store = ReportStore(str(tmp_path))
+    first = store.save(report('2025-02-10', 'first'))
+    second = store.save(report('2025-02-10', 'second'))
+    assert first.filename != second.filename
+    assert json.loads(store.load(first))['summary'] == 'first'
+    assert [r.id for r in store.list()] == [second.id, first.id]
+
+def test_list_filters_by_date_and_pages(tmp_path):
+    store = ReportStore(str(tmp_path))
+    ids = [store.save(report(f'2025-02-{day:02d}')).id for day in range(1, 8)]
+    assert [r.report_date for r in store.list(start='2025-02-03', end='2025-02-05')] == \
+        ['2025-02-05', '2025-02-04', '2025-02-03']
+    page = store.list(limit=3)
+    assert [r.id for r in page] == ids[:-4:-1]
+    assert [r.id for r in store.list(limit=3, before=page[-1].id)] == ids[-4:-7:-1]
+
+def test_latest_sees_writes_of_another_store(tmp_path):
+    store = ReportStore(str(tmp_path))
+    assert store.latest() is None
+    store.save(report('2025-02-10', 'mine'))
+    other = ReportStore(str(tmp_path))
+    record = other.save(report('2025-02-11', 'theirs'))
+    latest, blob = store.latest()
+    assert latest.id == record.id
+    assert json.loads(blob)['summary'] == 'theirs'
+
+def test_existing_report_files_are_imported_once(tmp_path):
+    for day in ('09', '10'):
+        (tmp_path / f'geoengineering_report_2025-02-{day}.json').write_text(json.dumps(report(f'2025-02-{day}')))
+    (tmp_path / 'broken.json').write_text('{not json')
+    store = ReportStore(str(tmp_path))
+    assert sorted(r.report_date for r in store.list()) == ['2025-02-09', '2025-02-10']
+    ReportStore(str(tmp_path))
+    with sqlite3.connect(str(tmp_path / INDEX_NAME)) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM reports").fetchone()[0] == 2
+
+def test_import_of_an_already_indexed_file_is_ignored(tmp_path):
+    store = ReportStore(str(tmp_path))
+    record = store.save(report('2025-02-10'))
+    blob = store.load(record)
+    assert store._insert(record.report_date, record.created, record.filename, blob, if_new=True) is None
+    with pytest.raises(sqlite3.IntegrityError):
+        store._insert(record.report_date, record.created, record.filename, blob)
+
+def test_concurrent_stores_import_without_errors(tmp_path):
+    for day in range(1, 21):
+        (tmp_path / f'geoengineering_report_2025-02-{day:02d}.json').write_text(
+            json.dumps(report(f'2025-02-{day:02d}')))
+    errors = []
+
+    def open_store():
+        try:
+            ReportStore(str(tmp_path))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=open_store) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(ReportStore(str(tmp_path)).list(limit=100)) == 20
+
+def test_get_report_store_is_shared_per_directory(tmp_path):
+    store = get_report_store(str(tmp_path / 'a'))
+    assert get_report_store(str(tmp_path / 'a' / '.')) is store
+    assert get_report_store(str(tmp_path / 'b')) is not store
+
+def test_conditional_get_returns_304(tmp_path, monkeypatch):
+    pytest.importorskip('crewai')
+    from fastapi.testclient import TestClient
+    monkeypatch.setenv('REPORTS_DIR', str(tmp_path))
+    import main
+
+    record = main.report_store.save(report('2025-02-10'))
+    client = TestClient(main.app)
+    response = client.get(f'/reports/{record.id}')
+    assert response.status_code == 200
+    assert response.headers['etag'] == record.etag
+    assert client.get(f'/reports/{record.id}', headers={'If-None-Match': record.etag}).status_code == 304
+    assert client.get('/reports/latest', headers={'If-None-Match': '"stale"'}).status_code == 200
+    last_modified = response.headers['last-modified']
+    assert client.get('/reports/latest', headers={'If-Modified-Since': last_modified}).status_code == 304
+
+def test_latest_skips_reports_whose_blob_was_deleted(tmp_path):
+    store = ReportStore(str(tmp_path))
+    first = store.save(report('2025-02-10', 'first'))
+    second = store.save(report('2025-02-11', 'second'))
+    os.remove(store.path(second))
+
+    reader = ReportStore(str(tmp_path))
+    record, blob = reader.latest()
+    assert record == first and json.loads(blob)['summary'] == 'first'
+    assert reader.get(second.id) is None
+    os.remove(store.path(first))
+    assert ReportStore(str(tmp_path)).latest() is None
+
+@pytest.mark.parametrize('header, matches', [
+    ('"{}"', True), ('W/"{}"', True), ('"other", W/"{}"', True), ('*', True), (' * ', True),
+    ('"other"', False), ('W/"other"', False), ('"{}-gzip"', False)])
+def test_if_none_match(tmp_path, header, matches):
+    record = ReportStore(str(tmp_path)).save(report('2025-02-10'))
+    assert record.matches(header.format(record.sha256)) is matches
@@ -0,0 +1,26 @@
+import numpy as np
+
+from data_sources.stats import REFLECTIVITY_BINS, RunningStats
+
+def test_merged_chunks_match_whole_array():
+    rng = np.random.default_rng(1)
+    data = rng.normal(5.0, 8.0, (1000, 20))
+    data[rng.random(data.shape) < 0.05] = np.nan
+
+    whole = RunningStats(REFLECTIVITY_BINS).update(data)
+    merged = RunningStats(REFLECTIVITY_BINS)
+    for i0 in range(0, 1000, 137):
+        merged.merge(RunningStats(REFLECTIVITY_BINS).update(data[i0:i0 + 137]))
+
+    assert merged.count == whole.count == np.count_nonzero(~np.isnan(data))
+    assert merged.nan_count == whole.nan_count
+    np.testing.assert_allclose(merged.mean, np.nanmean(data))
+    np.testing.assert_allclose(merged.std, np.nanstd(data))
+    np.testing.assert_array_equal(merged.hist, whole.hist)
+    assert merged.min == np.nanmin(data) and merged.max == np.nanmax(data)
+
+def test_from_array_reads_in_chunks():
+    data = np.arange(100.0).reshape(50, 2)
+    stats = RunningStats.from_array(data, chunk_rows=7)
+    assert stats.count == 100
+    np.testing.assert_allclose(stats.mean, 49.5)
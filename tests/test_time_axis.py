@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from data_sources.time_axis import (campaign_time_axis, clock_and_date_strings, epoch_seconds_to_datetime64,
+                                    hours_after_to_datetime64, to_datetime)
+
+def test_epoch_seconds_match_per_sample_conversion():
+    seconds = 1674216000.0 + np.arange(0, 5000) * 0.1
+    expected = np.array([datetime(1970, 1, 1) + timedelta(seconds=float(s)) for s in seconds],
+                        dtype='datetime64[ns]')
+    result = epoch_seconds_to_datetime64(seconds)
+    assert result.dtype == np.dtype('datetime64[ns]')
+    assert np.abs(result - expected).max() <= np.timedelta64(1, 'us')
+
+def test_hours_after_base_date():
+    result = hours_after_to_datetime64([0.0, 1.5, 25.0], '20170321')
+    assert result.tolist() == np.array(['2017-03-21T00:00', '2017-03-21T01:30', '2017-03-22T01:00'],
+                                       dtype='datetime64[ns]').tolist()
+
+def test_non_finite_times_become_nat():
+    result = epoch_seconds_to_datetime64([0.0, np.nan, np.inf, -np.inf, 1.5])
+    assert np.isnat(result).tolist() == [False, True, True, True, False]
+    assert result[4] == np.datetime64('1970-01-01T00:00:01.5', 'ns')
+    assert np.isnat(hours_after_to_datetime64(np.array([[np.nan, 1.0]]), '20170321')).tolist() == [[True, False]]
+    assert np.isnat(epoch_seconds_to_datetime64(np.nan))
+
+def test_campaign_time_axis_dispatch():
+    assert to_datetime(campaign_time_axis('impacts', [0.0])[0]) == datetime(1970, 1, 1)
+    assert to_datetime(campaign_time_axis('olympex', [12.0], '20151112')[0]) == datetime(2015, 11, 12, 12)
+    with pytest.raises(ValueError):
+        campaign_time_axis('goesrplt', [1.0])
+    with pytest.raises(ValueError):
+        campaign_time_axis('unknown', [1.0])
+
+def test_clock_and_date_strings():
+    times = np.array(['2023-01-20T23:59:59.5', '2023-01-21T00:00:00.2'], dtype='datetime64[ns]')
+    clocks, dates = clock_and_date_strings(times)
+    assert clocks == {'23:59:59', '00:00:00'}
+    assert dates == {'2023-01-20', '2023-01-21'}
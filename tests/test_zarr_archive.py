@@ -0,0 +1,56 @@
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+pytest.importorskip('zarr')
+
+from data_sources.crs_dataset import open_crs_dataset
+from data_sources.zarr_archive import (archive_index, consolidate_archive, convert_granule, open_archive_granule,
+                                       read_archive_window)
+
+START = datetime(2020, 1, 25, 6, 0)
+
+@pytest.fixture
+def granules(tmp_path, make_impacts):
+    paths = []
+    for i in range(2):
+        start = START + timedelta(hours=i)
+        paths.append(make_impacts(tmp_path / f'IMPACTS_CRS_L1B_RevA_{start:%Y%m%dT%H%M%S}.h5', start,
+                                  n_time=500, seed=i))
+    return paths
+
+@pytest.mark.parametrize('codec', ['blosc-zstd', 'none'])
+def test_round_trip(tmp_path, granules, codec):
+    archive = str(tmp_path / 'crs.zarr')
+    summary = convert_granule(granules[0], archive, codec=codec, chunk_bytes=16 * 1024)
+    assert not summary['skipped']
+    with open_archive_granule(archive, summary['group']) as stored, open_crs_dataset(granules[0]) as ds:
+        np.testing.assert_array_equal(stored['reflectivity'].values, ds['reflectivity'].values)
+        np.testing.assert_array_equal(stored['time'].values, ds['time'].values)
+        assert stored['reflectivity'].encoding['chunks'][1] == ds.sizes['range']
+        assert stored.attrs['source_file'] == os.path.basename(granules[0])
+
+def test_unchanged_granules_are_skipped(tmp_path, granules):
+    archive = str(tmp_path / 'crs.zarr')
+    convert_granule(granules[0], archive)
+    assert convert_granule(granules[0], archive)['skipped']
+    os.utime(granules[0], (1e9, 1e9))
+    assert not convert_granule(granules[0], archive)['skipped']
+
+def test_index_and_window_read(tmp_path, granules):
+    archive = str(tmp_path / 'crs.zarr')
+    for path in reversed(granules):
+        convert_granule(path, archive)
+    consolidate_archive(archive)
+    index = archive_index(archive)
+    assert [granule['source_file'] for granule in index] == [os.path.basename(p) for p in granules]
+    assert archive_index(archive, campaign='goesrplt') == []
+
+    window_start = START + timedelta(seconds=100)
+    pieces = read_archive_window(archive, window_start, window_start + timedelta(seconds=50))
+    assert len(pieces) == 1
+    assert len(pieces[0]['time']) == 101
+    with open_crs_dataset(granules[0]) as ds:
+        np.testing.assert_array_equal(pieces[0].values, ds['reflectivity'].values[200:301])